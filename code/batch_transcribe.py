@@ -0,0 +1,195 @@
+"""Transcribe a directory or manifest of recordings with the fine-tuned checkpoint.
+
+    python batch_transcribe.py recordings/ --checkpoint whisper-vi-finetuned/checkpoint-2000 \\
+        --output transcripts.jsonl --workers 4 --threads 2
+    python batch_transcribe.py manifest.txt --checkpoint whisper-vi-int8 --output transcripts.jsonl
+
+A manifest is a text file with one audio path per line, or a .jsonl file
+with an "audio" (or "path") field per line. Relative paths are resolved
+against the manifest's directory. Files are sorted by duration, longest
+first, and cut into batches of similar length. The batches go to a pool
+of worker processes, each holding one WhisperTranscriber. Every finished
+batch is appended to --output as JSON lines and flushed. A restarted run
+skips files that already have a transcript there. Recordings longer than
+30 s are split at pauses (transcribe_segments) and get their segments in
+the record.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import librosa
+import torch
+
+from transcriber import PROCESSOR_NAME, SAMPLE_RATE, WhisperTranscriber, load_audio
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".mp3", ".ogg", ".m4a", ".opus")
+MAX_CLIP_S = 30.0
+
+_worker_transcriber = None
+
+
+def list_audio(source, extensions=AUDIO_EXTENSIONS):
+    """Audio paths under a directory (recursively) or listed in a manifest"""
+    if os.path.isdir(source):
+        paths = []
+        for dirpath, _, files in os.walk(source):
+            paths.extend(os.path.join(dirpath, f) for f in files if f.lower().endswith(extensions))
+        return sorted(os.path.abspath(p) for p in paths)
+
+    base = os.path.dirname(os.path.abspath(source))
+    paths = []
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if source.endswith(".jsonl"):
+                record = json.loads(line)
+                line = record.get("audio") or record.get("path")
+            paths.append(os.path.abspath(os.path.join(base, line)))
+    return paths
+
+
+def read_done(output_path):
+    """Paths that already have a transcript in `output_path` (failed files are retried)"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Last line cut short by a crash
+                continue
+            if "error" not in record:
+                done.add(record["audio"])
+    return done
+
+
+def make_batches(durations, batch_size):
+    """Lists of paths with similar durations, longest first so slow batches start early"""
+    order = sorted(durations, key=lambda p: durations[p], reverse=True)
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+def _init_worker(checkpoint, processor_name, language, device, threads, trim_silence, assistant):
+    global _worker_transcriber
+    if threads:
+        torch.set_num_threads(threads)
+    _worker_transcriber = WhisperTranscriber.from_pretrained(checkpoint, processor_name=processor_name,
+                                                             language=language, device=device,
+                                                             trim_silence=trim_silence, assistant=assistant)
+
+
+def _transcribe_paths(paths, durations, batch_size):
+    records, clips = [], []
+    for path in paths:
+        try:
+            clips.append((path, load_audio(path).numpy()))
+        except Exception as e:
+            records.append({"audio": path, "error": f"load: {e}"})
+
+    short = [(p, a) for p, a in clips if len(a) <= MAX_CLIP_S * SAMPLE_RATE]
+    if short:
+        try:
+            texts = _worker_transcriber.transcribe_batch([a for _, a in short])
+            records.extend({"audio": p, "duration": durations[p], "text": t} for (p, _), t in zip(short, texts))
+        except Exception as e:
+            records.extend({"audio": p, "error": str(e)} for p, _ in short)
+    for path, audio in clips:
+        if len(audio) > MAX_CLIP_S * SAMPLE_RATE:
+            try:
+                segments = _worker_transcriber.transcribe_segments(audio, batch_size=batch_size)
+                records.append({"audio": path, "duration": durations[path],
+                                "text": " ".join(s["text"] for s in segments if s["text"]), "segments": segments})
+            except Exception as e:
+                records.append({"audio": path, "error": str(e)})
+    return records
+
+
+def batch_transcribe(paths, output_path, checkpoint, processor_name=PROCESSOR_NAME, language="vi", device="cpu",
+                     num_workers=1, threads=None, batch_size=8, trim_silence=False, assistant=None,
+                     progress_callback=None):
+    """Transcribe `paths` into the JSONL file `output_path`, skipping files already in it.
+
+    Returns (transcribed, failed, skipped).
+    """
+    done = read_done(output_path)
+    unique = list(dict.fromkeys(paths))
+    todo = [p for p in unique if p not in done]
+    skipped = len(unique) - len(todo)
+
+    # Don't glue the first new record onto a line cut short by a crash
+    if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+        with open(output_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                with open(output_path, "a", encoding="utf-8") as out:
+                    out.write("\n")
+
+    durations, failed = {}, 0
+    with open(output_path, "a", encoding="utf-8") as out:
+        for path in todo:
+            try:
+                durations[path] = librosa.get_duration(path=path)
+            except Exception as e:
+                record = {"audio": path, "error": f"duration: {str(e) or type(e).__name__}"}
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                failed += 1
+        out.flush()
+
+        batches = make_batches(durations, batch_size)
+        finished = 0
+        initargs = (checkpoint, processor_name, language, device, threads, trim_silence, assistant)
+        with ProcessPoolExecutor(num_workers, initializer=_init_worker, initargs=initargs) as pool:
+            futures = [pool.submit(_transcribe_paths, batch, {p: durations[p] for p in batch}, batch_size)
+                       for batch in batches]
+            for future in as_completed(futures):
+                records = future.result()
+                for record in records:
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                failed += sum("error" in r for r in records)
+                finished += len(records)
+                if progress_callback is not None:
+                    progress_callback(finished, len(durations))
+    return len(todo) - failed, failed, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="directory of recordings or a manifest (.txt / .jsonl)")
+    parser.add_argument("--checkpoint", required=True, help="fine-tuned (or quantize.py int8) checkpoint")
+    parser.add_argument("--output", required=True, help="JSONL file to append transcripts to")
+    parser.add_argument("--processor", default=PROCESSOR_NAME)
+    parser.add_argument("--language", default="vi")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes, one model each")
+    parser.add_argument("--threads", type=int, help="torch intra-op threads per worker")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--trim-silence", action="store_true")
+    parser.add_argument("--assistant", help="draft model for assisted decoding, e.g. openai/whisper-tiny")
+    args = parser.parse_args()
+
+    paths = list_audio(args.source)
+    print(f"{len(paths)} files in {args.source}")
+    start = time.perf_counter()
+
+    def progress(finished, total):
+        elapsed = time.perf_counter() - start
+        print(f"\r{finished}/{total} files  {finished / elapsed:.1f} files/s", end="", flush=True)
+
+    transcribed, failed, skipped = batch_transcribe(
+        paths, args.output, args.checkpoint, processor_name=args.processor, language=args.language,
+        device=args.device, num_workers=args.workers, threads=args.threads, batch_size=args.batch_size,
+        trim_silence=args.trim_silence, assistant=args.assistant, progress_callback=progress)
+    print(f"\n✓ {transcribed} transcribed, {failed} failed, {skipped} already done "
+          f"in {time.perf_counter() - start:.1f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """Collect concurrent single requests into batches for one batched call.
+
+    Callers use submit(item) and block on the returned Future. A background
+    thread takes the first waiting item, then keeps collecting until either
+    `max_batch_size` items are queued or `max_wait_ms` has passed since that
+    first item, and calls `process_batch(items)`, which must return one result
+    per item in the same order. Results (or the exception) go back to each
+    caller's Future. stop() lets queued items finish; submit() after stop()
+    raises, and any Future still pending when the thread exits is failed.
+    """
+
+    def __init__(self, process_batch, max_batch_size=8, max_wait_ms=20, name="batcher"):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._stopped = False
+        # Makes the _stopped check and the enqueue in submit() atomic with stop()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        future = Future()
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError("batcher is stopped")
+            self._queue.put((item, future))
+        return future
+
+    def __call__(self, item):
+        return self.submit(item).result()
+
+    def stop(self):
+        with self._lock:
+            if not self._stopped:
+                self._stopped = True
+                self._queue.put(None)
+        self._thread.join()
+        # Nothing can be queued behind the sentinel any more, but never leave a caller waiting
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not None and not entry[1].done():
+                entry[1].set_exception(RuntimeError("batcher is stopped"))
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if entry is None:
+                # Finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+            try:
+                results = self.process_batch(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"process_batch returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, result in zip(futures, results):
+                future.set_result(result)
@@ -0,0 +1,106 @@
+"""Latency, memory and WER of the int8 model against the fp32 checkpoint.
+
+    python bench_quantize.py --fp32 whisper-vi-finetuned/checkpoint-2000 \\
+        --int8 whisper-vi-int8 --h5 commonVoice_21.h5 --num-samples 100
+"""
+import argparse
+import io
+import time
+
+import jiwer
+import librosa
+import numpy as np
+import torch
+
+from h5_dataset import H5AudioDataset
+from transcriber import SAMPLE_RATE, WhisperTranscriber
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def state_dict_mb(model):
+    buf = io.BytesIO()
+    torch.save(model.state_dict(), buf)
+    return buf.tell() / 2 ** 20
+
+
+def load_eval_set(h5_path, num_samples):
+    ds = H5AudioDataset(h5_path)
+    ds = ds.select(range(min(num_samples, len(ds))))
+    audios, references = [], []
+    for sample in ds:
+        arr = sample["audio"]["array"]
+        if sample["audio"]["sampling_rate"] != SAMPLE_RATE:
+            arr = librosa.resample(arr, orig_sr=sample["audio"]["sampling_rate"], target_sr=SAMPLE_RATE)
+        audios.append(arr.astype(np.float32))
+        references.append(sample["sentence"])
+    return audios, references
+
+
+def run(name, checkpoint, processor_name, audios, references):
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    transcriber = WhisperTranscriber.from_pretrained(checkpoint, processor_name=processor_name, device="cpu")
+    load_s = time.perf_counter() - start
+    rss_after = rss_mb()
+
+    transcriber.transcribe(audios[0])  # warm-up
+    latencies, hypotheses = [], []
+    for audio in audios:
+        start = time.perf_counter()
+        hypotheses.append(transcriber.transcribe(audio))
+        latencies.append(time.perf_counter() - start)
+
+    wer = jiwer.wer([r.lower() for r in references], [h.lower() for h in hypotheses])
+    stats = {
+        "name": name,
+        "load_s": load_s,
+        "weights_mb": state_dict_mb(transcriber.model),
+        "rss_delta_mb": rss_after - rss_before,
+        "latency_mean_ms": 1000 * np.mean(latencies),
+        "latency_p50_ms": 1000 * np.percentile(latencies, 50),
+        "latency_p90_ms": 1000 * np.percentile(latencies, 90),
+        "wer": wer,
+    }
+    del transcriber
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fp32", required=True, help="fine-tuned checkpoint directory")
+    parser.add_argument("--int8", required=True, help="directory written by quantize.py")
+    parser.add_argument("--h5", required=True, help="h5 dump with reference sentences")
+    parser.add_argument("--num-samples", type=int, default=50)
+    parser.add_argument("--processor", default="openai/whisper-small")
+    parser.add_argument("--threads", type=int, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    audios, references = load_eval_set(args.h5, args.num_samples)
+    print(f"{len(audios)} utterances, {sum(len(a) for a in audios) / SAMPLE_RATE:.1f} s of audio")
+
+    # int8 first: RSS only grows, so loading the smaller model first keeps its delta honest
+    results = [run("int8", args.int8, args.processor, audios, references),
+               run("fp32", args.fp32, args.processor, audios, references)]
+
+    print(f"\n{'model':6} {'load s':>7} {'weights MB':>10} {'RSS +MB':>8} "
+          f"{'mean ms':>8} {'p50 ms':>8} {'p90 ms':>8} {'WER':>7}")
+    for r in results:
+        print(f"{r['name']:6} {r['load_s']:7.1f} {r['weights_mb']:10.1f} {r['rss_delta_mb']:8.1f} "
+              f"{r['latency_mean_ms']:8.1f} {r['latency_p50_ms']:8.1f} {r['latency_p90_ms']:8.1f} {r['wer']:7.4f}")
+    int8, fp32 = results
+    print(f"\nspeedup: {fp32['latency_mean_ms'] / int8['latency_mean_ms']:.2f}x   "
+          f"size: {int8['weights_mb'] / fp32['weights_mb']:.2f}x   "
+          f"WER delta: {int8['wer'] - fp32['wer']:+.4f}")
+
+
+if __name__ == "__main__":
+    main()
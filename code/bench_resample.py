@@ -0,0 +1,84 @@
+"""Compare the notebook's per-clip librosa loop with the batched resample_h5 stage.
+
+    python bench_resample.py --h5 commonVoice_21.h5
+    python bench_resample.py --num-clips 2000          # synthetic clips
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import h5py
+import librosa
+import numpy as np
+
+from h5_dataset import H5AudioDataset
+from resample import TARGET_SR, resample_h5
+
+
+def make_synthetic_h5(path, num_clips, rates=(32000, 44100, 48000), seed=0):
+    rng = np.random.default_rng(seed)
+    with h5py.File(path, "w") as f:
+        audio = f.create_dataset("audio", (num_clips,), dtype=h5py.vlen_dtype(np.float32))
+        srs = rng.choice(rates, num_clips)
+        for i in range(num_clips):
+            seconds = rng.uniform(2.0, 8.0)
+            audio[i] = (0.1 * rng.standard_normal(int(seconds * srs[i]))).astype(np.float32)
+        f.create_dataset("sentence", data=[f"clip {i}".encode() for i in range(num_clips)])
+        f.create_dataset("sampling_rate", data=srs)
+
+
+def per_clip_loop(h5_path):
+    # Same work as the original whisper_dataset cell
+    out = []
+    for sample in H5AudioDataset(h5_path):
+        arr = sample["audio"]["array"]
+        orig_sr = sample["audio"]["sampling_rate"]
+        if orig_sr != TARGET_SR:
+            arr = librosa.resample(arr, orig_sr=orig_sr, target_sr=TARGET_SR)
+        arr = arr.astype(np.float32)
+        max_val = np.max(np.abs(arr))
+        if max_val > 0:
+            arr = arr / max_val
+        out.append(arr)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--h5", help="CommonVoice h5 dump (default: generate synthetic clips)")
+    parser.add_argument("--num-clips", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = args.h5
+        if src is None:
+            src = os.path.join(tmp, "synthetic.h5")
+            make_synthetic_h5(src, args.num_clips)
+        num_clips = len(H5AudioDataset(src))
+        audio_seconds = sum(len(s["audio"]["array"]) / s["audio"]["sampling_rate"] for s in H5AudioDataset(src))
+
+        start = time.perf_counter()
+        baseline = per_clip_loop(src)
+        t_loop = time.perf_counter() - start
+
+        dst = os.path.join(tmp, "resampled.h5")
+        start = time.perf_counter()
+        resample_h5(src, dst, batch_size=args.batch_size, num_workers=args.workers)
+        t_stage = time.perf_counter() - start
+
+        # Different resampling filters (soxr vs polyphase), so compare loosely
+        batched = H5AudioDataset(dst)
+        max_len_diff = max(abs(len(a) - len(batched[i]["audio"]["array"])) for i, a in enumerate(baseline))
+
+    print(f"clips: {num_clips}  audio: {audio_seconds / 3600:.2f} h  workers: {args.workers}")
+    print(f"per-clip loop : {t_loop:8.2f} s  {num_clips / t_loop:8.1f} clips/s")
+    print(f"resample_h5   : {t_stage:8.2f} s  {num_clips / t_stage:8.1f} clips/s")
+    print(f"speedup       : {t_loop / t_stage:8.2f}x")
+    print(f"max output length difference: {max_len_diff} samples")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Greedy vs assisted (speculative) decoding of the fine-tuned checkpoint.
+
+    python bench_speculative.py --checkpoint whisper-vi-finetuned/checkpoint-2000 \\
+        --assistant openai/whisper-tiny --h5 commonVoice_21.h5 --num-samples 100
+
+Both runs decode one utterance at a time on the same clips, as a kiosk
+query would. Reports per-utterance latency and decoder tokens/s, and counts
+utterances whose token ids differ between the two modes (should be 0).
+"""
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from bench_quantize import load_eval_set
+from transcriber import PROCESSOR_NAME, SAMPLE_RATE, WhisperTranscriber
+
+
+def run(transcriber, audios):
+    transcriber.generate([audios[0]])  # warm-up
+    latencies, outputs = [], []
+    for audio in audios:
+        start = time.perf_counter()
+        outputs.append(transcriber.generate([audio])[0])
+        latencies.append(time.perf_counter() - start)
+    tokens = sum(len(ids) for ids in outputs)
+    return {
+        "outputs": outputs,
+        "tokens": tokens,
+        "tokens_per_s": tokens / sum(latencies),
+        "latency_mean_ms": 1000 * np.mean(latencies),
+        "latency_p50_ms": 1000 * np.percentile(latencies, 50),
+        "latency_p90_ms": 1000 * np.percentile(latencies, 90),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", required=True, help="fine-tuned checkpoint directory")
+    parser.add_argument("--assistant", default="openai/whisper-tiny", help="draft model sharing the tokenizer")
+    parser.add_argument("--num-assistant-tokens", type=int, help="initial draft length (adapted during decoding)")
+    parser.add_argument("--h5", required=True, help="h5 dump with evaluation clips")
+    parser.add_argument("--num-samples", type=int, default=50)
+    parser.add_argument("--processor", default=PROCESSOR_NAME)
+    parser.add_argument("--device", help="cpu or cuda (default: cuda if available)")
+    parser.add_argument("--threads", type=int, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    audios, _ = load_eval_set(args.h5, args.num_samples)
+    print(f"{len(audios)} utterances, {sum(len(a) for a in audios) / SAMPLE_RATE:.1f} s of audio")
+
+    transcriber = WhisperTranscriber.from_pretrained(args.checkpoint, processor_name=args.processor,
+                                                     device=args.device, assistant=args.assistant,
+                                                     num_assistant_tokens=args.num_assistant_tokens)
+    assistant_model = transcriber.assistant_model
+    transcriber.assistant_model = None
+    greedy = run(transcriber, audios)
+    transcriber.assistant_model = assistant_model
+    assisted = run(transcriber, audios)
+
+    print(f"\n{'mode':9} {'tokens':>7} {'tok/s':>8} {'mean ms':>8} {'p50 ms':>8} {'p90 ms':>8}")
+    for name, r in (("greedy", greedy), ("assisted", assisted)):
+        print(f"{name:9} {r['tokens']:7d} {r['tokens_per_s']:8.1f} {r['latency_mean_ms']:8.1f} "
+              f"{r['latency_p50_ms']:8.1f} {r['latency_p90_ms']:8.1f}")
+    mismatches = sum(not torch.equal(a.cpu(), b.cpu()) for a, b in zip(greedy["outputs"], assisted["outputs"]))
+    print(f"\nspeedup: {greedy['latency_mean_ms'] / assisted['latency_mean_ms']:.2f}x   "
+          f"outputs differing from greedy: {mismatches}/{len(audios)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Sampler
+from transformers import Trainer
+
+
+class BucketBatchSampler(Sampler):
+    """Batches of utterances with similar audio duration and label length.
+
+    Indices are shuffled, cut into buckets of `bucket_size` utterances, sorted
+    inside each bucket by (audio length, label length) and then chunked into
+    batches; the batch order is shuffled again so consecutive steps still see
+    different lengths. Labels in a batch therefore need little padding, which
+    is what the decoder spends its compute on.
+    """
+
+    def __init__(self, audio_lengths, label_lengths, batch_size, bucket_size=None,
+                 shuffle=True, drop_last=False, seed=0):
+        self.audio_lengths = np.asarray(audio_lengths)
+        self.label_lengths = np.asarray(label_lengths)
+        if len(self.audio_lengths) != len(self.label_lengths):
+            raise ValueError("audio_lengths and label_lengths must have the same size")
+        self.batch_size = batch_size
+        self.bucket_size = bucket_size or batch_size * 50
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def _batches(self):
+        n = len(self.audio_lengths)
+        rng = np.random.default_rng(self.seed + self.epoch)
+        order = rng.permutation(n) if self.shuffle else np.arange(n)
+
+        batches = []
+        for start in range(0, n, self.bucket_size):
+            bucket = order[start:start + self.bucket_size]
+            # lexsort sorts by the last key first
+            bucket = bucket[np.lexsort((self.label_lengths[bucket], self.audio_lengths[bucket]))]
+            for b in range(0, len(bucket), self.batch_size):
+                batch = bucket[b:b + self.batch_size]
+                if len(batch) < self.batch_size and self.drop_last:
+                    continue
+                batches.append(batch.tolist())
+
+        if self.shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        return batches
+
+    def __iter__(self):
+        batches = self._batches()
+        self.epoch += 1
+        return iter(batches)
+
+    def __len__(self):
+        n = len(self.audio_lengths)
+        if not self.drop_last:
+            return sum(-(-min(self.bucket_size, n - s) // self.batch_size)
+                       for s in range(0, n, self.bucket_size))
+        return sum(min(self.bucket_size, n - s) // self.batch_size
+                   for s in range(0, n, self.bucket_size))
+
+
+class PinnedWhisperCollator:
+    """Collate {"input_features", "labels"} items into preallocated buffers.
+
+    A small ring of (batch_size, num_mel_bins, num_frames) feature buffers and
+    label buffers is allocated once, in page-locked memory when CUDA is
+    available, and each batch is copied straight into the next free slot
+    instead of building per-example tensors and stacking them. Returned tensors
+    are views into the ring (on CPU, `.to(device)` keeps them views), so
+    `num_buffers` must be larger than the number of batches alive at once.
+    reserve() grows the ring to fit; BucketingTrainer calls it with its
+    gradient_accumulation_steps and DataLoader prefetch depth.
+    """
+
+    def __init__(self, pad_token_id, batch_size, num_mel_bins=80, num_frames=3000,
+                 max_label_length=448, num_buffers=4, pin_memory=None):
+        self.pad_token_id = pad_token_id
+        self.batch_size = batch_size
+        self.num_mel_bins = num_mel_bins
+        self.num_frames = num_frames
+        self.max_label_length = max_label_length
+        self.num_buffers = num_buffers
+        self.pin_memory = torch.cuda.is_available() if pin_memory is None else pin_memory
+        self._buffers = None
+        self._next = 0
+
+    def reserve(self, batches_alive):
+        """Make sure `batches_alive` returned batches plus the one being filled never share a slot"""
+        if batches_alive + 1 > self.num_buffers:
+            self.num_buffers = batches_alive + 1
+            self._buffers = None
+            self._next = 0
+
+    def _allocate(self):
+        # Allocated on first use so every DataLoader worker gets its own ring
+        self._buffers = [
+            (torch.empty((self.batch_size, self.num_mel_bins, self.num_frames),
+                         dtype=torch.float32, pin_memory=self.pin_memory),
+             torch.empty(self.batch_size * self.max_label_length,
+                         dtype=torch.long, pin_memory=self.pin_memory))
+            for _ in range(self.num_buffers)
+        ]
+
+    def __call__(self, batch):
+        if self._buffers is None:
+            self._allocate()
+        if len(batch) > self.batch_size:
+            raise ValueError(f"batch of {len(batch)} exceeds collator batch_size {self.batch_size}")
+        features_buf, labels_buf = self._buffers[self._next]
+        self._next = (self._next + 1) % self.num_buffers
+
+        batch_len = len(batch)
+        label_len = max(len(x["labels"]) for x in batch)
+        if label_len > self.max_label_length:
+            raise ValueError(f"label of length {label_len} exceeds max_label_length {self.max_label_length}")
+
+        input_features = features_buf[:batch_len]
+        # Contiguous (batch, label_len) view over the flat label buffer
+        labels = labels_buf[:batch_len * label_len].view(batch_len, label_len)
+        labels.fill_(self.pad_token_id)
+        for i, x in enumerate(batch):
+            input_features[i].copy_(torch.as_tensor(x["input_features"]))
+            example_labels = torch.as_tensor(x["labels"])
+            labels[i, :len(example_labels)].copy_(example_labels)
+        return {"input_features": input_features, "labels": labels}
+
+
+class BucketingTrainer(Trainer):
+    """Trainer that draws training batches from a BucketBatchSampler."""
+
+    def __init__(self, *args, batch_sampler=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_sampler = batch_sampler
+
+    def get_train_dataloader(self):
+        if self.batch_sampler is None:
+            return super().get_train_dataloader()
+        if isinstance(self.data_collator, PinnedWhisperCollator):
+            # The trainer fetches a whole accumulation step of batches before the first forward,
+            # accelerate reads one batch ahead, and each worker queues prefetch_factor more
+            workers = self.args.dataloader_num_workers
+            prefetch = 1 + (workers * (self.args.dataloader_prefetch_factor or 2) if workers else 0)
+            self.data_collator.reserve(self.args.gradient_accumulation_steps + prefetch)
+        dataloader = DataLoader(
+            self.train_dataset,
+            batch_sampler=self.batch_sampler,
+            collate_fn=self.data_collator,
+            num_workers=self.args.dataloader_num_workers,
+            # The collator already fills pinned buffers
+            pin_memory=False,
+        )
+        return self.accelerator.prepare(dataloader)
@@ -0,0 +1,166 @@
+import queue
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Results of these can change without the database changing, so they are never cached
+NONDETERMINISTIC = re.compile(r"\b(random|randomblob|changes|last_insert_rowid|total_changes)\s*\(|'now'",
+                              re.IGNORECASE)
+
+
+def enable_wal(db_path):
+    """Switch the catalogue to WAL so readers never block on (or block) the scrapers.
+
+    The journal mode is stored in the file, so this only has to succeed once;
+    it fails quietly if the file is not writable or another process holds a lock.
+    """
+    try:
+        conn = sqlite3.connect(db_path, timeout=1)
+        try:
+            return conn.execute("PRAGMA journal_mode=WAL").fetchone()[0] == "wal"
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+
+
+class CatalogPool:
+    """Read-only connections to the books catalogue, shared by threads, with a result cache.
+
+    Up to `size` connections are opened lazily and handed out one thread at a
+    time. Each one keeps `cached_statements` prepared statements, a
+    `cache_size_kb` page cache and a `mmap_size` memory map, so repeated
+    queries skip both the parse and the cold-page reads. `execute()` results
+    live in an LRU of `result_cache_size` entries. The LRU is cleared whenever
+    PRAGMA data_version on a sentinel connection changes, i.e. after any other
+    connection or process commits to the file. Thread-safe.
+    """
+
+    def __init__(self, db_path, size=4, cached_statements=256, cache_size_kb=65536, mmap_size=256 * 2 ** 20,
+                 result_cache_size=256, wal=True):
+        self.db_path = db_path
+        self.size = size
+        self.cached_statements = cached_statements
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.result_cache_size = result_cache_size
+        if wal:
+            enable_wal(db_path)
+
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+        self._sentinel = self._connect()
+        self._data_version = self._read_data_version()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kb)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute("PRAGMA query_only = 1")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection; blocks while all `size` connections are busy"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._opened < self.size:
+                    self._opened += 1
+                    conn = self._connect()
+            if conn is None:
+                conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def _read_data_version(self):
+        return self._sentinel.execute("PRAGMA data_version").fetchone()[0]
+
+    def _check_version(self):
+        # Called with self._lock held
+        version = self._read_data_version()
+        if version != self._data_version:
+            self._data_version = version
+            if self._results:
+                self.invalidations += 1
+            self._results.clear()
+
+    def execute(self, sql, params=(), max_rows=None, guard=None):
+        """Run a read-only query; returns (columns, rows) with at most `max_rows` rows
+
+        With a query_guard.QueryGuard, the query is plan-checked, limited and
+        time-boxed by it (results are cached under the original SQL).
+        """
+        cacheable = self.result_cache_size > 0 and not NONDETERMINISTIC.search(sql)
+        key = (sql, tuple(params), max_rows)
+        if cacheable:
+            with self._lock:
+                self._check_version()
+                if key in self._results:
+                    self._results.move_to_end(key)
+                    self.hits += 1
+                    columns, rows = self._results[key]
+                    return list(columns), list(rows)
+                self.misses += 1
+                version = self._data_version
+
+        with self.connection() as conn:
+            if guard is not None:
+                columns, rows = guard.execute(conn, sql, params, max_rows)
+            else:
+                cursor = conn.execute(sql, params)
+                columns = [d[0] for d in cursor.description or ()]
+                rows = cursor.fetchall() if max_rows is None else cursor.fetchmany(max_rows)
+                cursor.close()
+
+        if cacheable:
+            with self._lock:
+                # Don't store a result computed against data that changed meanwhile
+                if version == self._data_version:
+                    self._results[key] = (tuple(columns), tuple(rows))
+                    self._results.move_to_end(key)
+                    while len(self._results) > self.result_cache_size:
+                        self._results.popitem(last=False)
+        return columns, rows
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "connections": self._opened,
+                "max_connections": self.size,
+                "entries": len(self._results),
+                "max_entries": self.result_cache_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def close(self):
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+            self._sentinel.close()
+            self._opened = 0
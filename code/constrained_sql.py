@@ -0,0 +1,166 @@
+import sqlite3
+
+import torch
+from transformers import LogitsProcessor
+
+SQL_KEYWORDS = (
+    "select", "from", "where", "and", "or", "not", "like", "in", "between", "is", "null",
+    "order", "by", "asc", "desc", "limit", "offset", "group", "having", "distinct", "as",
+    "count", "avg", "sum", "min", "max", "lower", "upper",
+)
+QUOTES = ("'", '"')
+# PRAGMA table_xinfo "hidden": 0 ordinary, 2 generated VIRTUAL, 3 generated STORED
+# (1 is a hidden virtual-table column)
+VISIBLE_COLUMNS = (0, 2, 3)
+
+
+def table_columns(conn, table="books"):
+    """Column names of `table`, including generated ones (price_vnd, page_count, ...)."""
+    return [row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})") if row[6] in VISIBLE_COLUMNS]
+
+
+def read_schema(db_path, table="books"):
+    """Column names of `table` as the database actually has them."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return table_columns(conn, table)
+    finally:
+        conn.close()
+
+
+def schema_prompt(columns):
+    return " | ".join(columns)
+
+
+class SQLVocabularyConstraint(LogitsProcessor):
+    """Mask T5 logits so generated SQL only uses real names outside string literals.
+
+    Outside quotes, every identifier must be an SQL keyword, a table or a
+    column name from the live schema, or a number. Each row's state (open
+    quote, identifier typed so far, statement ended) is advanced by one token
+    per step and cached by prefix, so beams can be reordered freely. The
+    allowed next tokens are exactly those that continue the partial
+    identifier towards a real name, or that finish it and start a new one.
+    Inside a quoted literal every token is allowed. Once the statement ends
+    with ";" outside a literal, only EOS is allowed.
+    """
+
+    def __init__(self, tokenizer, columns, tables=("books",), keywords=SQL_KEYWORDS):
+        self.tokenizer = tokenizer
+        self.eos_token_id = tokenizer.eos_token_id
+        self.special_ids = set(tokenizer.all_special_ids)
+        self.words = {w.lower() for w in (*keywords, *tables, *columns)}
+        self.prefixes = {w[:i] for w in self.words for i in range(len(w) + 1)}
+
+        self.pieces = tokenizer.convert_ids_to_tokens(list(range(len(tokenizer))))
+        # Tokens without a word boundary continue the current identifier: text -> ids
+        self.continuations = {}
+        # Tokens with a boundary: identifier chars before it (the "lead") -> ids,
+        # kept only if every name they complete inside is valid and their tail can start one
+        self.by_lead = {}
+        for token_id, piece in enumerate(self.pieces):
+            if piece is None or token_id in self.special_ids:
+                continue
+            kind, lead, ok = self._analyse(piece)
+            if kind == "continuation":
+                self.continuations.setdefault(lead, []).append(token_id)
+            elif ok:
+                self.by_lead.setdefault(lead, []).append(token_id)
+        self.number_ids = [i for text, ids in self.continuations.items() if text.isdigit() for i in ids]
+        self.number_ids += [i for lead, ids in self.by_lead.items() if lead.isdigit() for i in ids]
+        self._states = {}
+        self._mask_cache = {}
+
+    def _complete(self, word):
+        return word == "" or word in self.words or word.isdigit()
+
+    def _prefix_ok(self, word):
+        return word in self.prefixes or word.isdigit()
+
+    def _analyse(self, piece):
+        """("continuation", text, True) or ("boundary", lead, ok) for one vocabulary piece"""
+        lead, current, boundary, ok = "", "", False, True
+        for c in piece.replace("▁", " "):
+            if c in QUOTES:
+                # The rest of the piece is inside a literal
+                if boundary:
+                    ok = ok and self._complete(current)
+                else:
+                    lead = current
+                return "boundary", lead, ok
+            if c.isalnum() or c == "_":
+                current += c.lower()
+            else:
+                if boundary:
+                    ok = ok and self._complete(current)
+                else:
+                    lead, boundary = current, True
+                current = ""
+        if not boundary:
+            return "continuation", current, True
+        return "boundary", lead, ok and self._prefix_ok(current)
+
+    def _advance(self, state, token_id):
+        quote, word, ended = state
+        if token_id in self.special_ids:
+            return state
+        for c in self.pieces[token_id].replace("▁", " "):
+            if quote:
+                if c == quote:
+                    quote = None
+            elif c in QUOTES:
+                quote, word = c, ""
+            elif c.isalnum() or c == "_":
+                word += c.lower()
+            else:
+                word = ""
+                ended = ended or c == ";"
+        return quote, word, ended
+
+    def _state(self, ids):
+        key = tuple(ids)
+        state = self._states.get(key)
+        if state is None:
+            state = (None, "", False) if len(key) <= 1 else self._advance(self._state(key[:-1]), key[-1])
+            self._states[key] = state
+        return state
+
+    def _allowed_ids(self, word):
+        ids = []
+        if self._complete(word):
+            ids += self.by_lead.get("", [])
+            ids.append(self.eos_token_id)
+        if word == "" or word.isdigit():
+            ids += self.number_ids
+        for w in self.words:
+            if len(w) > len(word) and w.startswith(word):
+                rest = w[len(word):]
+                ids += self.by_lead.get(rest, [])
+                for end in range(1, len(rest) + 1):
+                    ids += self.continuations.get(rest[:end], [])
+        # A dead end can't happen with a sentencepiece vocabulary, but never mask everything
+        return ids or [self.eos_token_id]
+
+    def _mask(self, word, vocab_size, device):
+        key = (word, vocab_size, device)
+        if key not in self._mask_cache:
+            mask = torch.full((vocab_size,), float("-inf"), device=device)
+            ids = torch.tensor(sorted(set(self._allowed_ids(word))), dtype=torch.long)
+            mask[ids[ids < vocab_size].to(device)] = 0.0
+            self._mask_cache[key] = mask
+        return self._mask_cache[key]
+
+    def __call__(self, input_ids, scores):
+        if input_ids.shape[1] <= 1:
+            # First step of a new generate() call
+            self._states.clear()
+        for row, ids in enumerate(input_ids.tolist()):
+            quote, word, ended = self._state(ids)
+            if quote:
+                continue  # inside a string literal
+            if ended:
+                scores[row] = float("-inf")
+                scores[row, self.eos_token_id] = 0.0
+            else:
+                scores[row] += self._mask(word, scores.shape[-1], scores.device)
+        return scores
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+from feature_cache import FeatureCacheDataset
+
+CACHE_VERSION = 1
+
+
+def encoder_fingerprint(encoder):
+    """Hash of the encoder weights; a different checkpoint gets a different cache."""
+    h = hashlib.sha256()
+    for name, tensor in sorted(encoder.state_dict().items()):
+        h.update(name.encode())
+        h.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return h.hexdigest()
+
+
+def build_encoder_cache(model, feature_dataset, cache_root, dtype=np.float16,
+                        batch_size=8, overwrite=False):
+    """Run the (frozen) Whisper encoder once per utterance and store its outputs.
+
+    `feature_dataset` is a FeatureCacheDataset. Hidden states of shape
+    (num_samples, max_source_positions, d_model) go into a memory-mappable .npy
+    file, by default as float16 to halve the disk and page-cache footprint.
+    The cache is keyed by the feature cache, the encoder weights and the dtype.
+    Returns the cache directory.
+    """
+    encoder = model.get_encoder()
+    dtype = np.dtype(dtype)
+    h = hashlib.sha256()
+    h.update(f"v{CACHE_VERSION}".encode())
+    h.update(os.path.basename(os.path.normpath(feature_dataset.cache_dir)).encode())
+    h.update(encoder_fingerprint(encoder).encode())
+    h.update(dtype.str.encode())
+    cache_dir = os.path.join(cache_root, h.hexdigest()[:16])
+    if os.path.exists(os.path.join(cache_dir, "meta.json")) and not overwrite:
+        return cache_dir
+
+    tmp_dir = cache_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    n = len(feature_dataset)
+    device = next(encoder.parameters()).device
+    encoder_dtype = next(encoder.parameters()).dtype
+    hidden = None
+    was_training = encoder.training
+    encoder.eval()
+    with torch.no_grad():
+        for start in range(0, n, batch_size):
+            features = torch.from_numpy(feature_dataset.input_features[start:start + batch_size])
+            out = encoder(features.to(device=device, dtype=encoder_dtype)).last_hidden_state
+            if hidden is None:
+                hidden = np.lib.format.open_memmap(
+                    os.path.join(tmp_dir, "encoder_hidden_states.npy"), mode="w+",
+                    dtype=dtype, shape=(n,) + tuple(out.shape[1:]))
+            hidden[start:start + len(out)] = out.float().cpu().numpy().astype(dtype)
+    encoder.train(was_training)
+    hidden.flush()
+    del hidden
+
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump({
+            "version": CACHE_VERSION,
+            "num_samples": n,
+            "dtype": dtype.name,
+            "feature_cache_dir": os.path.abspath(feature_dataset.cache_dir),
+            "model": getattr(model.config, "_name_or_path", ""),
+        }, f, indent=2)
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+    return cache_dir
+
+
+class EncoderCacheDataset(Dataset):
+    """Cached encoder_hidden_states plus labels from the matching feature cache."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self._open()
+
+    def _open(self):
+        with open(os.path.join(self.cache_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.hidden_states = np.load(os.path.join(self.cache_dir, "encoder_hidden_states.npy"), mmap_mode="c")
+        self.features = FeatureCacheDataset(self.meta["feature_cache_dir"])
+        self.audio_lengths = self.features.audio_lengths
+
+    def __getstate__(self):
+        return {"cache_dir": self.cache_dir}
+
+    def __setstate__(self, state):
+        self.cache_dir = state["cache_dir"]
+        self._open()
+
+    def __len__(self):
+        return len(self.hidden_states)
+
+    def label_lengths(self):
+        return self.features.label_lengths()
+
+    def __getitem__(self, idx):
+        offsets = self.features.label_offsets
+        return {
+            # Named after the model's forward() argument so the Trainer keeps it
+            "encoder_outputs": torch.from_numpy(self.hidden_states[idx]),
+            "labels": torch.from_numpy(self.features.labels[offsets[idx]:offsets[idx + 1]]),
+        }
+
+
+class EncoderCacheCollator:
+    """Batch cached hidden states as `encoder_outputs` so the model skips its encoder.
+
+    WhisperForConditionalGeneration accepts encoder_outputs in place of
+    input_features; with labels given it builds the decoder inputs itself, so
+    each training step only runs the decoder.
+    """
+
+    def __init__(self, pad_token_id, dtype=torch.float32):
+        self.pad_token_id = pad_token_id
+        self.dtype = dtype
+
+    def __call__(self, batch):
+        hidden = torch.stack([x["encoder_outputs"] for x in batch]).to(self.dtype)
+        labels = torch.nn.utils.rnn.pad_sequence(
+            [x["labels"] for x in batch],
+            batch_first=True,
+            padding_value=self.pad_token_id
+        )
+        return {"encoder_outputs": (hidden,), "labels": labels}
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import shutil
+
+import librosa
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+import vad
+
+TARGET_SR = 16000
+CACHE_VERSION = 1
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def processor_fingerprint(processor):
+    """Everything about the processor that changes input_features or labels."""
+    tokenizer = processor.tokenizer
+    config = {
+        "feature_extractor": processor.feature_extractor.to_dict(),
+        "tokenizer": tokenizer.name_or_path,
+        "vocab_size": len(tokenizer),
+        "prefix_tokens": getattr(tokenizer, "prefix_tokens", None),
+    }
+    return json.dumps(config, sort_keys=True, default=str)
+
+
+def cache_key(h5_path, processor, trim_silence=False):
+    h = hashlib.sha256()
+    h.update(f"v{CACHE_VERSION}".encode())
+    h.update(file_sha256(h5_path).encode())
+    h.update(processor_fingerprint(processor).encode())
+    if trim_silence:
+        h.update(b"vad-trim")
+    return h.hexdigest()[:16]
+
+
+def build_feature_cache(dataset, processor, cache_root, h5_path=None, overwrite=False,
+                        trim_silence=False):
+    """Extract log-mel input_features and tokenized labels once and store them on disk.
+
+    `dataset` is an H5AudioDataset (or anything yielding the same dicts).
+    The cache lives in `cache_root/<key>/` where the key combines the sha256 of
+    the h5 file with the processor config, so a new CommonVoice dump or a
+    different processor gets its own cache. With `trim_silence`, leading and
+    trailing silence found by vad.trim_silence is cut before feature
+    extraction (and the cache gets a separate key). Returns the cache directory.
+    """
+    h5_path = h5_path or dataset.h5_path
+    cache_dir = os.path.join(cache_root, cache_key(h5_path, processor, trim_silence))
+    if os.path.exists(os.path.join(cache_dir, "meta.json")) and not overwrite:
+        return cache_dir
+
+    # Build into a temporary directory so an interrupted run never leaves a
+    # half-written cache behind that later runs would pick up
+    tmp_dir = cache_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    fe = processor.feature_extractor
+    n = len(dataset)
+    n_frames = fe.nb_max_frames
+    features = np.lib.format.open_memmap(
+        os.path.join(tmp_dir, "input_features.npy"), mode="w+",
+        dtype=np.float32, shape=(n, fe.feature_size, n_frames))
+
+    labels = []
+    audio_lengths = np.zeros(n, dtype=np.int64)
+    for i in range(n):
+        sample = dataset[i]
+        arr = sample["audio"]["array"]
+        orig_sr = sample["audio"]["sampling_rate"]
+        if orig_sr != TARGET_SR:
+            arr = librosa.resample(arr, orig_sr=orig_sr, target_sr=TARGET_SR)
+        if trim_silence:
+            arr, _ = vad.trim_silence(arr, TARGET_SR)
+        audio_lengths[i] = len(arr)
+        features[i] = fe(arr, sampling_rate=TARGET_SR, return_tensors="np").input_features[0]
+        labels.append(np.asarray(processor.tokenizer(sample["sentence"]).input_ids, dtype=np.int64))
+    features.flush()
+    del features
+
+    # Labels are ragged: store them flat with offsets
+    label_offsets = np.zeros(n + 1, dtype=np.int64)
+    label_offsets[1:] = np.cumsum([len(l) for l in labels])
+    np.save(os.path.join(tmp_dir, "labels.npy"),
+            np.concatenate(labels) if labels else np.zeros(0, dtype=np.int64))
+    np.save(os.path.join(tmp_dir, "label_offsets.npy"), label_offsets)
+    np.save(os.path.join(tmp_dir, "audio_lengths.npy"), audio_lengths)
+
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump({
+            "version": CACHE_VERSION,
+            "num_samples": n,
+            "h5_path": os.path.abspath(h5_path),
+            "sampling_rate": TARGET_SR,
+            "trim_silence": trim_silence,
+            "processor": json.loads(processor_fingerprint(processor)),
+        }, f, indent=2, default=str)
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+    return cache_dir
+
+
+class FeatureCacheDataset(Dataset):
+    """Reads a cache written by build_feature_cache without copying it into RAM.
+
+    input_features is memory-mapped copy-on-write, so each item is a torch view
+    onto the page cache rather than a fresh array.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self._open()
+
+    def _open(self):
+        cache_dir = self.cache_dir
+        with open(os.path.join(cache_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.input_features = np.load(os.path.join(cache_dir, "input_features.npy"), mmap_mode="c")
+        self.labels = np.load(os.path.join(cache_dir, "labels.npy"), mmap_mode="c")
+        self.label_offsets = np.load(os.path.join(cache_dir, "label_offsets.npy"))
+        self.audio_lengths = np.load(os.path.join(cache_dir, "audio_lengths.npy"))
+
+    def __getstate__(self):
+        # Pickling a memmap copies its data; spawned workers re-map instead
+        return {"cache_dir": self.cache_dir}
+
+    def __setstate__(self, state):
+        self.cache_dir = state["cache_dir"]
+        self._open()
+
+    def __len__(self):
+        return len(self.label_offsets) - 1
+
+    def label_lengths(self):
+        return np.diff(self.label_offsets)
+
+    def __getitem__(self, idx):
+        start, end = self.label_offsets[idx], self.label_offsets[idx + 1]
+        return {
+            "input_features": torch.from_numpy(self.input_features[idx]),
+            "labels": torch.from_numpy(self.labels[start:end]),
+        }
@@ -0,0 +1,103 @@
+import os
+
+import h5py
+import numpy as np
+from torch.utils.data import Dataset, get_worker_info
+
+
+class H5AudioDataset(Dataset):
+    """Index-based view over a CommonVoice h5 dump (audio / sentence / sampling_rate).
+
+    The file is opened lazily, once per process, so the dataset can be handed to
+    a DataLoader with num_workers > 0 and every worker reads its own samples.
+    Each __getitem__ reads a single clip; nothing is kept in memory besides the
+    (small) sampling_rate column.
+    """
+
+    def __init__(self, h5_path, indices=None, audio_key="audio",
+                 sentence_key="sentence", sr_key="sampling_rate"):
+        self.h5_path = h5_path
+        self.audio_key = audio_key
+        self.sentence_key = sentence_key
+        self.sr_key = sr_key
+
+        with h5py.File(h5_path, "r") as f:
+            num_rows = len(f[sentence_key])
+            self.sampling_rates = np.asarray(f[sr_key]).astype(np.int64)
+
+        if indices is None:
+            indices = np.arange(num_rows)
+        self.indices = np.asarray(indices, dtype=np.int64)
+
+        self._file = None
+        self._pid = None
+
+    def _h5(self):
+        # h5py handles must not be shared across fork(); reopen in each worker
+        if self._file is None or self._pid != os.getpid():
+            self._file = h5py.File(self.h5_path, "r")
+            self._pid = os.getpid()
+        return self._file
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, idx):
+        row = int(self.indices[idx])
+        f = self._h5()
+        sentence = f[self.sentence_key][row]
+        if isinstance(sentence, bytes):
+            sentence = sentence.decode("utf-8")
+        return {
+            "audio": {
+                "array": np.asarray(f[self.audio_key][row]),
+                "sampling_rate": int(self.sampling_rates[row]),
+            },
+            "sentence": sentence,
+        }
+
+    def __iter__(self):
+        # When iterated inside a DataLoader worker only yield that worker's shard
+        info = get_worker_info()
+        ds = self if info is None else self.shard(info.num_workers, info.id)
+        for i in range(len(ds)):
+            yield ds[i]
+
+    def shard(self, num_shards, index, contiguous=True):
+        """Return the index-th of num_shards disjoint subsets of this dataset."""
+        if not 0 <= index < num_shards:
+            raise ValueError(f"shard index {index} out of range for {num_shards} shards")
+        if contiguous:
+            indices = np.array_split(self.indices, num_shards)[index]
+        else:
+            indices = self.indices[index::num_shards]
+        return self.select(indices, absolute=True)
+
+    def select(self, indices, absolute=False):
+        """Subset by positions in this dataset (or by h5 row numbers if absolute)."""
+        indices = np.asarray(indices, dtype=np.int64)
+        if not absolute:
+            indices = self.indices[indices]
+        subset = H5AudioDataset.__new__(H5AudioDataset)
+        subset.__dict__.update(self.__getstate__())
+        subset.indices = indices
+        return subset
+
+    def close(self):
+        # Only close handles this process opened itself, not ones inherited by fork
+        if self._file is not None and self._pid == os.getpid():
+            self._file.close()
+        self._file = None
+        self._pid = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_file"] = None
+        state["_pid"] = None
+        return state
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
@@ -0,0 +1,183 @@
+import re
+import sqlite3
+from collections import namedtuple
+
+from sql_cache import normalize_transcript
+
+IntentMatch = namedtuple("IntentMatch", ["sql", "params", "slots"])
+
+# Gazetteer columns, in the order used to break ties when one value appears in several
+GAZETTEER_COLUMNS = ("author", "publisher", "department", "subject")
+# Cue words (already normalized) that say which column the following value belongs to
+CUES = {
+    "author": ("tac gia", "cua", "viet boi", "by", "author", "written by"),
+    "publisher": ("nha xuat ban", "nxb", "publisher", "published by"),
+    "department": ("khoa", "chuyen nganh", "department", "faculty"),
+    "subject": ("chu de", "ve", "subject", "about", "topic"),
+}
+
+YEAR_PATTERNS = [
+    (re.compile(r"\b(?:tu|between|from)\s*(?:nam\s*)?(\d{4})\s*(?:den|and|to)\s*(?:nam\s*)?(\d{4})\b"), "between"),
+    (re.compile(r"\b(?:sau|after|since|tu sau)\s*(?:nam\s*)?(\d{4})\b"), ">"),
+    (re.compile(r"\b(?:truoc|before)\s*(?:nam\s*)?(\d{4})\b"), "<"),
+    (re.compile(r"\b(?:nam|in|year|xuat ban)\s*(\d{4})\b"), "="),
+]
+# The phrase can't be just what's left of the cue: "sach co ten la" or "co ten
+# sach la" have no title and go to T5
+TITLE_PATTERN = re.compile(
+    r"\b(?:ten la|ten sach la|ten sach|co ten|tieu de|tua de|titled|called|named|title)\s+(?:la\s+)?"
+    r"(?!(?:sach\s+)?la$)(.+)$")
+# Free-text lookup over keywords/summary; like the title, it runs to the end of the utterance
+KEYWORD_PATTERN = re.compile(
+    r"\b(?:tu khoa|noi dung ve|noi dung|co chua|nhac den|keyword|keywords|mentioning|containing)\s+"
+    r"(?:la\s+)?(?!la$)(.+)$")
+# Full-text index created by database/fts.py
+FTS_TABLE = "books_fts"
+# An utterance with a single slot must also mention a book
+BOOK_CUES = re.compile(r"\b(?:sach|cuon|quyen|tai lieu|book|books|giao trinh)\b")
+
+
+class IntentMatcher:
+    """Rule/slot-filling fast path from a spoken question to parameterized SQL.
+
+    Recognizes filters on author, publisher, department and subject (values
+    looked up in a gazetteer built from the distinct values in the books
+    table), publication_year (exact, before, after, between) and title
+    phrases. Returns an IntentMatch with `?` placeholders, or None when the
+    utterance doesn't look like one of these so the caller falls back to T5.
+
+    When the database has the books_fts index, title and keyword phrases
+    become accent-insensitive FTS5 MATCH lookups ranked by BM25 instead of
+    LIKE scans.
+    """
+
+    def __init__(self, gazetteer, table="books", use_fts=False):
+        self.table = table
+        self.use_fts = use_fts
+        # normalized value -> (column, original value); longest first so
+        # "khoa kien truc" wins over "kien truc"
+        self.gazetteer = gazetteer
+        names = sorted(gazetteer, key=len, reverse=True)
+        self._value_re = re.compile(r"\b(" + "|".join(re.escape(n) for n in names) + r")\b") if names else None
+
+    @classmethod
+    def from_db(cls, db_path, table="books", min_length=3):
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            use_fts = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                   (FTS_TABLE,)).fetchone() is not None
+            gazetteer = {}
+            for column in GAZETTEER_COLUMNS:
+                if column not in columns:
+                    continue
+                for (value,) in conn.execute(
+                        f"SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL AND {column} != ''"):
+                    parts = [value]
+                    if column == "subject":
+                        # Subjects look like "Kiến trúc--Nhà ở"; match each heading too
+                        parts += [p for p in value.split("--") if p.strip()]
+                    for part in parts:
+                        key = normalize_transcript(part)
+                        if len(key) >= min_length and key not in gazetteer:
+                            gazetteer[key] = (column, part.strip(), part != value)
+        finally:
+            conn.close()
+        return cls(gazetteer, table=table, use_fts=use_fts)
+
+    def _cue_column(self, text, start):
+        # Longest cue wins: "published by" is a publisher cue, not "by"
+        before = " " + text[:start].rstrip()
+        best, best_len = None, 0
+        for column, cues in CUES.items():
+            for cue in cues:
+                if before.endswith(" " + cue) and len(cue) > best_len:
+                    best, best_len = column, len(cue)
+        return best
+
+    @staticmethod
+    def _fts_query(value, columns=None):
+        # Quoted terms so words like "and"/"near" aren't read as FTS operators
+        terms = " ".join(f'"{w}"' for w in value.split())
+        if columns:
+            return "{" + " ".join(columns) + "} : (" + terms + ")"
+        return terms
+
+    def _free_text(self, pattern, text, plain_words, columns, slot, conditions, params, slots):
+        # Phrase slots (title, keywords) take the rest of the utterance after their cue
+        m = pattern.search(text)
+        if not m:
+            return text
+        first_word = text[:m.start(1)].count(" ")
+        last_word = first_word + len(m.group(1).split())
+        value = " ".join(plain_words[first_word:last_word])
+        if self.use_fts:
+            conditions.append(f"{FTS_TABLE} MATCH ?")
+            params.append(self._fts_query(m.group(1), columns))
+        else:
+            conditions.append("(" + " OR ".join(f"{c} LIKE ?" for c in columns) + ")"
+                              if len(columns) > 1 else f"{columns[0]} LIKE ?")
+            params.extend(f"%{value}%" for _ in columns)
+        slots[slot] = value
+        return text[:m.start()]
+
+    def match(self, text):
+        # Folded text for matching; the unfolded words (same positions) give
+        # literals that compare against the stored Vietnamese text
+        plain_words = normalize_transcript(text, fold=False).split()
+        text = normalize_transcript(text)
+        conditions, params, slots = [], [], {}
+
+        # Everything after a title/keyword cue is the phrase; other slots come from before it
+        text = self._free_text(TITLE_PATTERN, text, plain_words, ("title",), "title",
+                               conditions, params, slots)
+        if "title" not in slots:
+            text = self._free_text(KEYWORD_PATTERN, text, plain_words, ("keywords", "summary"), "keywords",
+                                   conditions, params, slots)
+
+        for pattern, op in YEAR_PATTERNS:
+            m = pattern.search(text)
+            if m:
+                if op == "between":
+                    low, high = sorted(int(y) for y in m.groups())
+                    conditions.append("publication_year BETWEEN ? AND ?")
+                    params += [low, high]
+                    slots["publication_year"] = (low, high)
+                else:
+                    conditions.append(f"publication_year {op} ?")
+                    params.append(int(m.group(1)))
+                    slots["publication_year"] = (op, int(m.group(1)))
+                text = text[:m.start()] + " " + text[m.end():]
+                break
+
+        if self._value_re is not None:
+            for m in self._value_re.finditer(text):
+                column, value, partial = self.gazetteer[m.group(1)]
+                cue = self._cue_column(text, m.start())
+                if cue is not None and cue != column:
+                    # The cue points at another column; don't guess
+                    continue
+                if column in slots:
+                    continue
+                if partial:
+                    conditions.append(f"{column} LIKE ?")
+                    params.append(f"%{value}%")
+                else:
+                    conditions.append(f"{column} = ?")
+                    params.append(value)
+                slots[column] = value
+
+        if not conditions:
+            return None
+        # A bare year or a stray gazetteer word isn't enough: require a book cue
+        # unless at least two slots were filled
+        if len(slots) < 2 and not BOOK_CUES.search(text) and not {"title", "keywords"} & slots.keys():
+            return None
+        where = " AND ".join(conditions)
+        if self.use_fts and f"{FTS_TABLE} MATCH ?" in conditions:
+            sql = (f"SELECT {self.table}.* FROM {self.table} "
+                   f"JOIN {FTS_TABLE} ON {FTS_TABLE}.rowid = {self.table}.rowid "
+                   f"WHERE {where} ORDER BY {FTS_TABLE}.rank")
+        else:
+            sql = f"SELECT * FROM {self.table} WHERE " + where
+        return IntentMatch(sql, tuple(params), slots)
@@ -0,0 +1,197 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import torch
+import whisper
+from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, LogitsProcessorList
+
+import vad
+from batching import MicroBatcher
+from catalog import CatalogPool
+from constrained_sql import SQLVocabularyConstraint, read_schema, schema_prompt
+from intent import IntentMatcher
+from query_guard import QueryGuard
+from sql_cache import SQLCache
+
+STT_MODEL = "base"
+TEXT2SQL_MODEL = "suriya7/t5-base-text-to-sql"
+SAMPLE_RATE = 16000
+
+
+class SpeechToSQLPipeline:
+    """Audio -> transcript -> SQL -> rows, with both models loaded once.
+
+    This is the Pipeline.ipynb flow packaged so a long-lived process (see
+    server.py) can keep the Whisper and T5 models in memory between queries.
+    With `trim_silence`, the VAD cuts leading and trailing silence from each
+    recording before it reaches Whisper. `sql_cache_size` > 0 puts an LRU
+    transcript -> SQL cache (optionally persisted to `sql_cache_db`) in front
+    of the T5 model. With `use_intents`, common filter questions are turned
+    into parameterized SQL by intent.IntentMatcher and never reach T5.
+    Queries run on a catalog.CatalogPool of `db_pool_size` read-only
+    connections; `result_cache_size` > 0 caches their results until the
+    database changes.
+    With `query_guard`, generated SQL is plan-checked, given a LIMIT and
+    interrupted after `sql_time_budget_ms` (see query_guard.py).
+    T5 is always prompted with the live `books` columns; `constrained_sql`
+    also masks its logits to real names (see constrained_sql.py).
+    """
+
+    def __init__(self, db_path, stt_model=STT_MODEL, text2sql_model=TEXT2SQL_MODEL,
+                 device=None, max_rows=100, trim_silence=False, sql_cache_size=0, sql_cache_db=None,
+                 use_intents=True, constrained_sql=False, db_pool_size=4, result_cache_size=256,
+                 query_guard=True, sql_time_budget_ms=2000):
+        self.db_path = db_path
+        self.catalog = CatalogPool(db_path, size=db_pool_size, result_cache_size=result_cache_size)
+        self.guard = QueryGuard(max_rows=max_rows, time_budget_ms=sql_time_budget_ms) if query_guard else None
+        self.columns = read_schema(db_path)
+        self.schema = schema_prompt(self.columns)
+        self.max_rows = max_rows
+        self.trim_silence = trim_silence
+        self.sql_cache = None
+        if sql_cache_size > 0:
+            # Cached SQL is only valid for the model and prompt that produced it
+            namespace = hashlib.sha1(f"{text2sql_model}|{self.schema}|{constrained_sql}".encode()).hexdigest()[:12]
+            self.sql_cache = SQLCache(sql_cache_size, sql_cache_db, namespace=namespace)
+        self.intents = IntentMatcher.from_db(db_path) if use_intents else None
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+
+        self.stt_model = whisper.load_model(stt_model, device=self.device)
+        self.tokenizer = AutoTokenizer.from_pretrained(text2sql_model)
+        self.text2sql_model = AutoModelForSeq2SeqLM.from_pretrained(text2sql_model).to(self.device)
+        self.text2sql_model.eval()
+        self.logits_processor = None
+        if constrained_sql:
+            self.logits_processor = LogitsProcessorList([SQLVocabularyConstraint(self.tokenizer, self.columns)])
+
+        # One query at a time through each model; concurrent forward passes on
+        # CPU only fight over the same cores
+        self._stt_lock = threading.Lock()
+        self._sql_lock = threading.Lock()
+        self._stt_batcher = None
+        self._sql_batcher = None
+
+    def enable_batching(self, max_batch_size=8, max_wait_ms=20):
+        """Route transcribe()/to_sql() through micro-batchers.
+
+        Concurrent callers are grouped for up to `max_wait_ms` (or until
+        `max_batch_size` requests are waiting) and run as one padded batch
+        through the Whisper decoder and T5 generate.
+        """
+        self.disable_batching()
+        self._stt_batcher = MicroBatcher(self.transcribe_batch, max_batch_size, max_wait_ms, name="stt-batcher")
+        self._sql_batcher = MicroBatcher(self.to_sql_batch, max_batch_size, max_wait_ms, name="sql-batcher")
+
+    def disable_batching(self):
+        for batcher in (self._stt_batcher, self._sql_batcher):
+            if batcher is not None:
+                batcher.stop()
+        self._stt_batcher = None
+        self._sql_batcher = None
+
+    def warmup(self):
+        """Run both models once so the first real query doesn't pay for lazy init."""
+        self.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32))
+        self.to_sql_batch(["show all books"])
+
+    def stats(self):
+        return {"sql_cache": self.sql_cache.stats() if self.sql_cache is not None else None,
+                "catalog": self.catalog.stats(),
+                "query_guard": dict(self.guard.stats) if self.guard is not None else None}
+
+    def _prepare_audio(self, audio):
+        audio = whisper.load_audio(audio) if isinstance(audio, str) else np.asarray(audio, dtype=np.float32)
+        if self.trim_silence:
+            audio, _ = vad.trim_silence(audio, SAMPLE_RATE)
+        return audio
+
+    def transcribe(self, audio):
+        """`audio` is a file path or a float32 waveform at 16 kHz."""
+        if self._stt_batcher is not None:
+            return self._stt_batcher(audio)
+        if self.trim_silence:
+            audio = self._prepare_audio(audio)
+        with self._stt_lock:
+            result = self.stt_model.transcribe(audio, fp16=self.device == "cuda")
+        return result["text"].strip()
+
+    def transcribe_batch(self, audios):
+        """Transcribe several clips with one batched Whisper encoder/decoder pass.
+
+        Batched decoding covers a single 30 s window per clip; longer clips
+        go through the regular long-form transcribe() loop on their own.
+        """
+        audios = [self._prepare_audio(a) for a in audios]
+        texts = [None] * len(audios)
+        short = [i for i, a in enumerate(audios) if len(a) <= whisper.audio.N_SAMPLES]
+        with self._stt_lock:
+            if short:
+                mels = torch.stack([
+                    whisper.log_mel_spectrogram(whisper.pad_or_trim(audios[i]), self.stt_model.dims.n_mels)
+                    for i in short
+                ]).to(self.device)
+                options = whisper.DecodingOptions(fp16=self.device == "cuda", without_timestamps=True)
+                for i, result in zip(short, whisper.decode(self.stt_model, mels, options)):
+                    texts[i] = result.text.strip()
+            for i, audio in enumerate(audios):
+                if texts[i] is None:
+                    texts[i] = self.stt_model.transcribe(audio, fp16=self.device == "cuda")["text"].strip()
+        return texts
+
+    def to_sql(self, text):
+        if self.sql_cache is not None:
+            sql = self.sql_cache.get(text)
+            if sql is not None:
+                return sql
+        if self._sql_batcher is not None:
+            sql = self._sql_batcher(text)
+        else:
+            sql = self.to_sql_batch([text])[0]
+        if self.sql_cache is not None:
+            self.sql_cache.put(text, sql)
+        return sql
+
+    def to_sql_batch(self, texts):
+        prompts = [f"translate English to SQL: {text} | table columns = {self.schema}" for text in texts]
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True,
+                                max_length=512, truncation=True).to(self.device)
+        with self._sql_lock, torch.no_grad():
+            outputs = self.text2sql_model.generate(**inputs, max_length=128,
+                                                  logits_processor=self.logits_processor)
+        return self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+    def run_sql(self, sql, params=()):
+        # Read-only pooled connections: generated SQL must never modify the catalogue
+        return self.catalog.execute(sql, params, self.max_rows, guard=self.guard)
+
+    def query_text(self, text):
+        timings = {}
+        start = time.perf_counter()
+        match = self.intents.match(text) if self.intents is not None else None
+        if match is not None:
+            sql, params, source = match.sql, match.params, "intent"
+        else:
+            sql, params, source = self.to_sql(text), (), "t5"
+        timings["text2sql"] = time.perf_counter() - start
+
+        result = {"transcript": text, "sql": sql, "params": list(params), "source": source,
+                  "columns": [], "rows": [], "error": None}
+        start = time.perf_counter()
+        try:
+            result["columns"], result["rows"] = self.run_sql(sql, params)
+        except sqlite3.Error as e:
+            result["error"] = str(e)
+        timings["sql"] = time.perf_counter() - start
+        result["timings"] = timings
+        return result
+
+    def query(self, audio):
+        start = time.perf_counter()
+        text = self.transcribe(audio)
+        stt_time = time.perf_counter() - start
+        result = self.query_text(text)
+        result["timings"]["stt"] = stt_time
+        return result
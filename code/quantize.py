@@ -0,0 +1,69 @@
+"""Dynamic int8 quantization of the fine-tuned Whisper checkpoint for CPU inference.
+
+    python quantize.py whisper-vi-finetuned/checkpoint-2000 whisper-vi-int8
+
+The exported directory loads with WhisperTranscriber.from_pretrained() like
+the fp32 checkpoint does.
+"""
+import argparse
+import json
+import os
+
+import torch
+from transformers import GenerationConfig, WhisperConfig, WhisperForConditionalGeneration
+
+QUANTIZED_WEIGHTS = "quantized_int8.pt"
+QUANTIZATION_INFO = "quantization.json"
+
+
+def quantize_dynamic_int8(model):
+    """Replace every nn.Linear with a dynamically quantized int8 version.
+
+    Linear layers hold almost all of Whisper's weights and FLOPs; weights are
+    stored as int8 and activations are quantized on the fly, which needs no
+    calibration data.
+    """
+    return torch.ao.quantization.quantize_dynamic(model.eval(), {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def is_quantized_checkpoint(path):
+    return os.path.exists(os.path.join(path, QUANTIZATION_INFO))
+
+
+def export_quantized(checkpoint_path, output_dir):
+    model = WhisperForConditionalGeneration.from_pretrained(checkpoint_path).float()
+    quantized = quantize_dynamic_int8(model)
+
+    os.makedirs(output_dir, exist_ok=True)
+    model.config.save_pretrained(output_dir)
+    model.generation_config.save_pretrained(output_dir)
+    torch.save(quantized.state_dict(), os.path.join(output_dir, QUANTIZED_WEIGHTS))
+    with open(os.path.join(output_dir, QUANTIZATION_INFO), "w") as f:
+        json.dump({"method": "dynamic", "dtype": "qint8", "modules": ["Linear"],
+                   "source": os.path.abspath(checkpoint_path),
+                   "torch": torch.__version__}, f, indent=2)
+    return output_dir
+
+
+def load_quantized(path):
+    config = WhisperConfig.from_pretrained(path)
+    # Rebuild the same module structure, then load the packed int8 weights
+    model = quantize_dynamic_int8(WhisperForConditionalGeneration(config))
+    # Packed quantized params are not plain tensors, so weights_only loading can't read them
+    state_dict = torch.load(os.path.join(path, QUANTIZED_WEIGHTS), map_location="cpu", weights_only=False)
+    model.load_state_dict(state_dict)
+    model.generation_config = GenerationConfig.from_pretrained(path)
+    return model.eval()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("checkpoint", help="fine-tuned fp32 checkpoint directory")
+    parser.add_argument("output_dir")
+    args = parser.parse_args()
+    export_quantized(args.checkpoint, args.output_dir)
+    print(f"✓ Saved int8 model to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
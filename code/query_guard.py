@@ -0,0 +1,187 @@
+import logging
+import re
+import sqlite3
+import time
+
+from sql_cache import fold_diacritics
+
+logger = logging.getLogger(__name__)
+
+# Full-text index created by database/fts.py
+FTS_TABLE = "books_fts"
+STATEMENT_START = re.compile(r"^\s*\(?\s*(select|with|values)\b", re.IGNORECASE)
+TRAILING_LIMIT = re.compile(r"\blimit\s+(?:\d+|\?)(?:\s*(?:,|\boffset\b)\s*(?:\d+|\?))?\s*$", re.IGNORECASE)
+# `col LIKE '%text%'`, optionally qualified; wildcards inside the text are left alone
+CONTAINS_LIKE = re.compile(r"(?:\b(\w+)\.)?\b(\w+)\s+LIKE\s+'%([^'%_]+)%'", re.IGNORECASE)
+TABLE_REF = re.compile(r"\b(?:from|join)\s+(\w+)(?:\s+(?:as\s+)?(\w+))?|,\s*(\w+)(?:\s+(?:as\s+)?(\w+))?",
+                       re.IGNORECASE)
+# A pattern that starts with a wildcard can't use an index, so it always scans
+LEADING_WILDCARD = re.compile(r"\b(?:LIKE\s+'%|GLOB\s+'\*)", re.IGNORECASE)
+SCAN = re.compile(r"^SCAN (\w+)")
+NOT_ALIASES = {"where", "on", "join", "inner", "left", "right", "cross", "natural", "outer", "using", "group",
+               "order", "limit", "having", "union", "except", "intersect", "window", "as", "full"}
+
+
+class QueryRejected(sqlite3.DatabaseError):
+    """The statement is not a query, or its plan is too expensive to run"""
+
+
+class QueryTimeout(sqlite3.OperationalError):
+    """The query ran past its time budget and was interrupted"""
+
+
+class QueryGuard:
+    """Cost checks around generated SQL before and while it runs on the catalogue.
+
+    Only SELECT/WITH statements are accepted. EXPLAIN QUERY PLAN is read
+    first. If a table with at least `large_table_rows` rows is fully scanned,
+    `col LIKE '%text%'` filters on books_fts columns are rewritten into FTS5
+    MATCH lookups (when the index exists). A large-table scan left over with
+    a leading-wildcard LIKE/GLOB in the query (no FTS index, or a column it
+    doesn't cover) raises QueryRejected unless `reject_wildcard_scans` is
+    off, and so does a plan with more than `max_full_scans` full scans of
+    large tables (cross joins, correlated scans). Queries without a trailing LIMIT get
+    `LIMIT max_rows`. A progress handler interrupts anything running longer
+    than `time_budget_ms` (QueryTimeout). Queries slower than `slow_ms` are
+    logged with their plan.
+    """
+
+    def __init__(self, max_rows=100, time_budget_ms=2000, large_table_rows=10000, max_full_scans=1,
+                 slow_ms=250, rewrite_like=True, reject_wildcard_scans=True, progress_steps=1000):
+        self.max_rows = max_rows
+        self.time_budget_ms = time_budget_ms
+        self.large_table_rows = large_table_rows
+        self.max_full_scans = max_full_scans
+        self.slow_ms = slow_ms
+        self.rewrite_like = rewrite_like
+        self.reject_wildcard_scans = reject_wildcard_scans
+        self.progress_steps = progress_steps
+        # Row counts per table; approximate is enough to tell small tables from large ones
+        self._row_counts = {}
+        self._fts_columns = None
+        self.stats = {"queries": 0, "rewritten": 0, "limited": 0, "rejected": 0, "timeouts": 0, "slow": 0}
+
+    def plan(self, conn, sql, params=()):
+        return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+    def _row_count(self, conn, table):
+        if table not in self._row_counts:
+            exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                  (table,)).fetchone()
+            self._row_counts[table] = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] if exists else 0
+        return self._row_counts[table]
+
+    def _aliases(self, sql):
+        aliases = {}
+        for m in TABLE_REF.finditer(sql):
+            table, alias = (m.group(1), m.group(2)) if m.group(1) else (m.group(3), m.group(4))
+            aliases[table] = table
+            if alias and alias.lower() not in NOT_ALIASES:
+                aliases[alias] = table
+        return aliases
+
+    def full_scans(self, conn, sql, plan):
+        """(table, plan line) for every full scan of a large table"""
+        aliases = self._aliases(sql)
+        scans = []
+        for detail in plan:
+            m = SCAN.match(detail)
+            if not m or "VIRTUAL TABLE" in detail or detail.startswith("SCAN CONSTANT ROW"):
+                continue
+            table = aliases.get(m.group(1), m.group(1))
+            if self._row_count(conn, table) >= self.large_table_rows:
+                scans.append((table, detail))
+        return scans
+
+    def _fts(self, conn):
+        if self._fts_columns is None:
+            self._fts_columns = {row[1] for row in conn.execute(f"PRAGMA table_info({FTS_TABLE})")}
+        return self._fts_columns
+
+    def rewrite_contains(self, conn, sql):
+        """Replace `col LIKE '%text%'` on indexed text columns with an FTS5 phrase-prefix lookup"""
+        columns = self._fts(conn)
+        if not columns:
+            return sql
+
+        def replace(m):
+            qualifier, column, text = m.groups()
+            if column not in columns:
+                return m.group(0)
+            # The index holds diacritic-folded text (see database/fts.py)
+            phrase = fold_diacritics(text.strip().lower()).replace('"', '""')
+            if not phrase:
+                return m.group(0)
+            query = f'{{{column}}} : "{phrase}" *'.replace("'", "''")
+            rowid = f"{qualifier}.rowid" if qualifier else "rowid"
+            return f"{rowid} IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH '{query}')"
+
+        return CONTAINS_LIKE.sub(replace, sql)
+
+    def prepare(self, conn, sql, params=(), max_rows=None):
+        """Checked, possibly rewritten SQL and its plan; raises QueryRejected"""
+        sql = sql.strip().rstrip(";").strip()
+        if not STATEMENT_START.match(sql):
+            self.stats["rejected"] += 1
+            raise QueryRejected("only SELECT queries are allowed")
+        plan = self.plan(conn, sql, params)
+        scans = self.full_scans(conn, sql, plan)
+        if scans and self.rewrite_like:
+            rewritten = self.rewrite_contains(conn, sql)
+            if rewritten != sql:
+                try:
+                    new_plan = self.plan(conn, rewritten, params)
+                except sqlite3.Error:
+                    # e.g. an unqualified rowid that became ambiguous in a join
+                    new_plan = None
+                if new_plan is not None:
+                    sql, plan = rewritten, new_plan
+                    scans = self.full_scans(conn, sql, plan)
+                    self.stats["rewritten"] += 1
+        if scans and self.reject_wildcard_scans and LEADING_WILDCARD.search(sql):
+            self.stats["rejected"] += 1
+            tables = ", ".join(sorted({t for t, _ in scans}))
+            raise QueryRejected(f"leading-wildcard pattern needs a full scan of a large table ({tables})")
+        if len(scans) > self.max_full_scans:
+            self.stats["rejected"] += 1
+            tables = ", ".join(sorted({t for t, _ in scans}))
+            raise QueryRejected(f"query plan has {len(scans)} full scans of large tables ({tables})")
+
+        limit = max_rows or self.max_rows
+        if limit and not TRAILING_LIMIT.search(sql):
+            # On its own line so a trailing -- comment can't swallow it
+            sql = f"{sql}\nLIMIT {int(limit)}"
+            self.stats["limited"] += 1
+        return sql, plan
+
+    def execute(self, conn, sql, params=(), max_rows=None):
+        """prepare() then run under the time budget; returns (columns, rows)"""
+        self.stats["queries"] += 1
+        sql, plan = self.prepare(conn, sql, params, max_rows)
+        start = time.perf_counter()
+        deadline = start + self.time_budget_ms / 1000 if self.time_budget_ms else None
+        if deadline is not None:
+            conn.set_progress_handler(lambda: time.perf_counter() > deadline, self.progress_steps)
+        try:
+            cursor = conn.execute(sql, params)
+            columns = [d[0] for d in cursor.description or ()]
+            rows = cursor.fetchall() if max_rows is None else cursor.fetchmany(max_rows)
+            cursor.close()
+        except sqlite3.OperationalError as e:
+            if deadline is not None and time.perf_counter() > deadline and "interrupt" in str(e):
+                self.stats["timeouts"] += 1
+                self._log_slow(sql, plan, time.perf_counter() - start, "timed out")
+                raise QueryTimeout(f"query exceeded its {self.time_budget_ms} ms budget") from e
+            raise
+        finally:
+            if deadline is not None:
+                conn.set_progress_handler(None, 0)
+        elapsed = time.perf_counter() - start
+        if self.slow_ms is not None and elapsed * 1000 >= self.slow_ms:
+            self.stats["slow"] += 1
+            self._log_slow(sql, plan, elapsed, "slow query")
+        return columns, rows
+
+    def _log_slow(self, sql, plan, elapsed, reason):
+        logger.warning("%s (%.0f ms): %s\n  plan:\n    %s", reason, elapsed * 1000, " ".join(sql.split()),
+                       "\n    ".join(plan))
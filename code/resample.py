@@ -0,0 +1,133 @@
+import math
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import h5py
+import numpy as np
+from scipy.signal import resample_poly
+
+from feature_cache import file_sha256
+from h5_dataset import H5AudioDataset
+
+TARGET_SR = 16000
+
+_worker_dataset = None
+
+
+def resample_group(clips, orig_sr, target_sr=TARGET_SR, normalize=True):
+    """Resample clips that share one source rate in a single vectorized call.
+
+    The clips are zero-padded into one (batch, max_len) matrix and run through
+    a polyphase filter along axis 1; since the filter already treats the signal
+    as zero outside its bounds, trimming each row back to its own length gives
+    the same result as resampling the clips one by one.
+    """
+    lengths = np.array([len(c) for c in clips])
+    batch = np.zeros((len(clips), lengths.max()), dtype=np.float32)
+    for i, clip in enumerate(clips):
+        batch[i, :len(clip)] = clip
+
+    if orig_sr != target_sr:
+        g = math.gcd(orig_sr, target_sr)
+        batch = resample_poly(batch, target_sr // g, orig_sr // g, axis=1).astype(np.float32)
+        lengths = -(-lengths * target_sr // orig_sr)  # ceil, matches resample_poly
+
+    if normalize:
+        # Peak-normalize to [-1, 1], ignoring the padded tail of each row
+        valid = np.arange(batch.shape[1]) < lengths[:, None]
+        peaks = np.max(np.abs(batch) * valid, axis=1)
+        peaks[peaks == 0] = 1.0
+        batch /= peaks[:, None]
+
+    return [batch[i, :n] for i, n in enumerate(lengths)]
+
+
+def _init_worker(h5_path):
+    global _worker_dataset
+    _worker_dataset = H5AudioDataset(h5_path)
+
+
+def _resample_rows(rows, orig_sr, target_sr, normalize):
+    ds = _worker_dataset.select(rows, absolute=True)
+    clips = [ds[i]["audio"]["array"] for i in range(len(ds))]
+    return rows, resample_group(clips, orig_sr, target_sr, normalize)
+
+
+def _resample_attrs(src_path, target_sr, normalize):
+    return {"source_sha256": file_sha256(src_path), "target_sr": int(target_sr), "normalize": bool(normalize)}
+
+
+def is_up_to_date(dst_path, attrs):
+    """True if `dst_path` was fully written by resample_h5 from the same source and settings."""
+    if not os.path.exists(dst_path):
+        return False
+    try:
+        with h5py.File(dst_path, "r") as f:
+            return all(k in f.attrs and f.attrs[k] == v for k, v in attrs.items())
+    except OSError:
+        return False
+
+
+def resample_h5(src_path, dst_path, target_sr=TARGET_SR, batch_size=32,
+                num_workers=None, normalize=True, progress_callback=None, overwrite=False):
+    """Write a copy of a CommonVoice h5 dump with every clip as float32 at target_sr.
+
+    Clips are grouped by source sampling rate (and sorted by length inside each
+    group to keep padding small), then handed out in batches to a process pool.
+    Workers open the source file themselves, so only row numbers and the
+    resampled output cross process boundaries. The output has the same
+    audio/sentence/sampling_rate layout and row order as the input, so it can
+    be read back with H5AudioDataset.
+
+    The sha256 of the source and the resample settings are stored as file
+    attributes; if `dst_path` already carries matching ones it is returned
+    untouched (unless `overwrite`). Keeping the file byte-for-byte the same
+    keeps the feature cache, which is keyed on its hash, valid across runs.
+    The output is written to a temporary file and renamed when complete.
+    """
+    attrs = _resample_attrs(src_path, target_sr, normalize)
+    if not overwrite and is_up_to_date(dst_path, attrs):
+        return dst_path
+
+    src = H5AudioDataset(src_path)
+    num_rows = len(src)
+    lengths = np.zeros(num_rows, dtype=np.int64)
+    with h5py.File(src_path, "r") as f:
+        audio = f[src.audio_key]
+        for row in range(num_rows):
+            lengths[row] = len(audio[row])
+        sentences = f[src.sentence_key][:]
+
+    groups = defaultdict(list)
+    for row in np.argsort(lengths, kind="stable"):
+        groups[int(src.sampling_rates[row])].append(int(row))
+
+    jobs = []
+    for orig_sr, rows in groups.items():
+        for start in range(0, len(rows), batch_size):
+            jobs.append((rows[start:start + batch_size], orig_sr))
+
+    num_workers = num_workers or os.cpu_count()
+    done = 0
+    tmp_path = f"{dst_path}.tmp"
+    with h5py.File(tmp_path, "w") as out:
+        out_audio = out.create_dataset(src.audio_key, (num_rows,), dtype=h5py.vlen_dtype(np.float32),
+                                       track_times=False)
+        out.create_dataset(src.sentence_key, data=sentences, track_times=False)
+        out.create_dataset(src.sr_key, data=np.full(num_rows, target_sr, dtype=np.int64), track_times=False)
+
+        with ProcessPoolExecutor(num_workers, initializer=_init_worker, initargs=(src_path,)) as pool:
+            futures = [pool.submit(_resample_rows, rows, orig_sr, target_sr, normalize)
+                       for rows, orig_sr in jobs]
+            for future in as_completed(futures):
+                rows, clips = future.result()
+                for row, clip in zip(rows, clips):
+                    out_audio[row] = clip
+                done += len(rows)
+                if progress_callback is not None:
+                    progress_callback(done, num_rows)
+
+        out.attrs.update(attrs)
+    os.replace(tmp_path, dst_path)
+    return dst_path
@@ -0,0 +1,187 @@
+"""Long-lived speech-to-SQL service.
+
+Loads Whisper and the T5 text-to-SQL model once, warms them up, then answers
+HTTP requests over TCP or a Unix socket:
+
+    GET  /health                      -> {"status": "ok"}
+    GET  /stats                       -> cache hit/miss statistics
+    POST /query   (body: audio file)  -> transcript, sql, columns, rows
+    POST /sql     (body: {"text": ...}) -> same, skipping speech recognition
+
+    python server.py --db ../database/data_fix.db --port 8000
+    python server.py --db ../database/data_fix.db --unix /tmp/asr.sock
+"""
+import argparse
+import json
+import os
+import socketserver
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pipeline import STT_MODEL, TEXT2SQL_MODEL, SpeechToSQLPipeline
+
+MAX_BODY_MB = 25
+
+
+class RequestError(Exception):
+    """Something wrong with the request itself; answered with `status` instead of 500"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class PipelineHandler(BaseHTTPRequestHandler):
+    pipeline = None
+    max_body_bytes = MAX_BODY_MB * 2 ** 20
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            raise RequestError(400, "invalid Content-Length")
+        if length < 0:
+            raise RequestError(400, "invalid Content-Length")
+        if length > self.max_body_bytes:
+            # The body stays unread, so the connection can't be reused
+            self.close_connection = True
+            raise RequestError(413, f"body larger than {self.max_body_bytes} bytes")
+        return self.rfile.read(length)
+
+    def _read_json(self):
+        try:
+            payload = json.loads(self._read_body() or b"{}")
+        except ValueError as e:
+            raise RequestError(400, f"invalid JSON: {e}")
+        if not isinstance(payload, dict):
+            raise RequestError(400, "body must be a JSON object")
+        return payload
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/stats":
+            self._send_json(200, self.pipeline.stats())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        try:
+            if self.path == "/query":
+                self._send_json(200, self._query_audio(self._read_body()))
+            elif self.path == "/sql":
+                text = self._read_json().get("text", "")
+                if not isinstance(text, str) or not text.strip():
+                    raise RequestError(400, "missing 'text'")
+                self._send_json(200, self.pipeline.query_text(text))
+            else:
+                self._send_json(404, {"error": "not found"})
+        except RequestError as e:
+            self._send_json(e.status, {"error": str(e)})
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+
+    def _query_audio(self, data):
+        if not data:
+            raise RequestError(400, "empty audio body")
+        # Whisper decodes through ffmpeg, which wants a file
+        suffix = os.path.splitext(self.headers.get("X-Filename", ""))[1] or ".wav"
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+            f.write(data)
+            path = f.name
+        try:
+            return self.pipeline.query(path)
+        finally:
+            os.remove(path)
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        super().server_bind()
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="SQLite catalogue with the books table")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--stt-model", default=STT_MODEL)
+    parser.add_argument("--text2sql-model", default=TEXT2SQL_MODEL)
+    parser.add_argument("--trim-silence", action="store_true",
+                        help="cut leading/trailing silence with the VAD before transcription")
+    parser.add_argument("--sql-cache-size", type=int, default=1024,
+                        help="entries in the transcript -> SQL LRU cache (0 disables it)")
+    parser.add_argument("--sql-cache-db", help="SQLite file that persists the SQL cache across restarts")
+    parser.add_argument("--no-intents", action="store_true",
+                        help="always use T5, skipping the rule-based intent fast path")
+    parser.add_argument("--constrained-sql", action="store_true",
+                        help="mask T5's output to real keywords, tables and column names")
+    parser.add_argument("--db-pool-size", type=int, default=4,
+                        help="read-only catalogue connections shared by request threads")
+    parser.add_argument("--result-cache-size", type=int, default=256,
+                        help="cached query results, dropped when the database changes (0 disables it)")
+    parser.add_argument("--no-query-guard", action="store_true",
+                        help="run generated SQL as is, without plan checks, LIMIT or time budget")
+    parser.add_argument("--sql-time-budget-ms", type=float, default=2000,
+                        help="interrupt a query after this long")
+    parser.add_argument("--max-body-mb", type=float, default=MAX_BODY_MB,
+                        help="reject request bodies larger than this with 413")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="micro-batch up to this many concurrent requests per model call")
+    parser.add_argument("--batch-wait-ms", type=float, default=20,
+                        help="how long to wait for a batch to fill")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    pipeline = SpeechToSQLPipeline(args.db, stt_model=args.stt_model, text2sql_model=args.text2sql_model,
+                                   trim_silence=args.trim_silence, sql_cache_size=args.sql_cache_size,
+                                   sql_cache_db=args.sql_cache_db, use_intents=not args.no_intents,
+                                   constrained_sql=args.constrained_sql, db_pool_size=args.db_pool_size,
+                                   result_cache_size=args.result_cache_size, query_guard=not args.no_query_guard,
+                                   sql_time_budget_ms=args.sql_time_budget_ms)
+    print(f"✓ Models loaded in {time.perf_counter() - start:.1f}s")
+    start = time.perf_counter()
+    pipeline.warmup()
+    print(f"✓ Warm-up done in {time.perf_counter() - start:.1f}s")
+    if args.batch_size > 1:
+        pipeline.enable_batching(args.batch_size, args.batch_wait_ms)
+        print(f"✓ Micro-batching: up to {args.batch_size} requests / {args.batch_wait_ms:g} ms")
+
+    PipelineHandler.pipeline = pipeline
+    PipelineHandler.max_body_bytes = int(args.max_body_mb * 2 ** 20)
+    if args.unix:
+        server = ThreadingUnixHTTPServer(args.unix, PipelineHandler)
+        print(f"🚀 Listening on unix:{args.unix}")
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), PipelineHandler)
+        print(f"🚀 Listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
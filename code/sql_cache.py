@@ -0,0 +1,234 @@
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+# Spoken numbers the ASR tends to write out; multi-digit values are assembled
+# by _words_to_numbers below
+NUMBER_WORDS = {
+    # Vietnamese
+    "không": 0, "một": 1, "mốt": 1, "hai": 2, "ba": 3, "bốn": 4, "tư": 4, "năm": 5, "lăm": 5,
+    "sáu": 6, "bảy": 7, "bẩy": 7, "tám": 8, "chín": 9, "mười": 10, "mươi": 10,
+    "trăm": 100, "nghìn": 1000, "ngàn": 1000, "triệu": 1000000,
+    # English
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13,
+    "fourteen": 14, "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18,
+    "nineteen": 19, "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60,
+    "seventy": 70, "eighty": 80, "ninety": 90, "hundred": 100, "thousand": 1000, "million": 1000000,
+}
+# "lẻ"/"linh" mark an empty tens place: "một trăm lẻ năm" = 105
+ZERO_TENS = {"lẻ", "linh"}
+# "năm" (five/year), "tư" (four/private) and "không" (zero/not) only count as
+# numbers next to another number word; "năm" is stricter still, see
+# _words_to_numbers
+AMBIGUOUS = {"năm", "tư", "không"}
+PLACE_WORDS = {"mươi", "trăm", "nghìn", "ngàn", "triệu"}
+# Part of every cache key; bump it when normalize_transcript changes so entries
+# persisted under the old normalization are never returned
+NORMALIZE_VERSION = 4
+
+
+def _words_to_numbers(words):
+    """Replace runs of number words with digits.
+
+    Structured numbers are summed by place ("ba trăm năm mươi" = 350, "hai
+    nghìn không trăm hai mươi ba" = 2023). When a word lands on a place that
+    is already filled, the number read so far is closed and the next one is
+    appended to it, so digits read one by one are concatenated ("hai không
+    hai ba" = 2023, "nineteen ninety five" = 1995).
+
+    "năm" is read as 5 only after "lẻ" or "linh", or before a place word
+    ("năm mươi", "năm trăm"); anywhere else it is the word "year". A final 5
+    in the units place is spoken "lăm", so "mười năm" stays "10 năm" and "hai
+    mươi năm" stays "20 năm" instead of colliding with 15 and 25.
+    """
+    out, pieces = [], []
+    # last: place filled by the previous word - None, "digit" (may still become
+    # tens/hundreds), "unit", "ten", "hundred", "zero_tens" or "scale"
+    total, group, pending, last = 0, 0, 0, None
+
+    def close_piece():
+        nonlocal total, group, pending, last
+        if last is not None:
+            pieces.append(str(total + group))
+        total, group, pending, last = 0, 0, 0, None
+
+    def flush():
+        close_piece()
+        if pieces:
+            out.append("".join(pieces))
+            pieces.clear()
+
+    for i, word in enumerate(words):
+        # "năm mươi", "tư trăm": a place word right after makes it a number
+        before_place = i + 1 < len(words) and words[i + 1] in PLACE_WORDS
+        if word == "năm":
+            in_number = before_place or last == "zero_tens"
+        else:
+            in_number = last is not None or bool(pieces) or before_place
+        if word in ZERO_TENS and last in ("hundred", "scale"):
+            last = "zero_tens"
+            continue
+        value = NUMBER_WORDS.get(word)
+        if value is None or (word in AMBIGUOUS and not in_number):
+            flush()
+            out.append(word)
+            continue
+
+        if value >= 1000:
+            # A bare "nghìn"/"thousand" counts as one thousand
+            total += (group if last not in (None, "scale") else 1) * value
+            group, last = 0, "scale"
+        elif value == 100:
+            if last == "digit":
+                # "không trăm" keeps the hundreds at 0
+                group += pending * 99
+            elif last in ("unit", "ten"):
+                group += group % 100 * 99
+            else:
+                group += 100
+            last = "hundred"
+        elif word == "mươi" and last == "digit":
+            # "hai mươi" = 20, "năm mươi" = 50
+            group += pending * 9
+            last = "ten"
+        elif value >= 10:
+            if last in ("digit", "unit", "ten"):
+                close_piece()
+            group += value
+            last = "ten" if value % 10 == 0 else "unit"
+        else:
+            if last in ("digit", "unit"):
+                close_piece()
+            group += value
+            pending = value
+            last = "unit" if last in ("ten", "zero_tens") else "digit"
+    flush()
+    return out
+
+
+def fold_diacritics(text):
+    text = text.replace("đ", "d").replace("Đ", "D")
+    decomposed = unicodedata.normalize("NFD", text)
+    return "".join(c for c in decomposed if unicodedata.category(c) != "Mn")
+
+
+def normalize_transcript(text, fold=True):
+    """Canonical form of a spoken query, used as the cache key.
+
+    Lowercases, turns number words into digits, strips diacritics and
+    punctuation and collapses whitespace, so "Sách xuất bản năm hai nghìn hai
+    mươi." and "sach xuat ban nam 2020" share one entry. With fold=False the
+    diacritics are kept; the words line up one-to-one with the folded form.
+    """
+    text = unicodedata.normalize("NFC", text).lower()
+    words = re.findall(r"\w+", text)
+    words = _words_to_numbers(words)
+    return " ".join(fold_diacritics(w) if fold else w for w in words)
+
+
+class SQLCache:
+    """Transcript -> SQL cache: a bounded in-memory LRU with an optional SQLite tier.
+
+    Lookups normalize the transcript first (see normalize_transcript). Misses
+    in memory fall through to the SQLite file, if one is configured, and hits
+    there are promoted back into the LRU. `namespace` is prepended to every key,
+    so entries produced with a different model or prompt never match.
+    Thread-safe.
+    """
+
+    def __init__(self, max_entries=1024, db_path=None, namespace=""):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.namespace = namespace
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS sql_cache (
+                    key TEXT PRIMARY KEY,
+                    sql TEXT NOT NULL,
+                    hits INTEGER DEFAULT 0,
+                    updated_at REAL
+                )
+            """)
+            self._conn.commit()
+
+    def key(self, transcript):
+        return f"{self.namespace}|n{NORMALIZE_VERSION}|{normalize_transcript(transcript)}"
+
+    def get(self, transcript):
+        key = self.key(transcript)
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return self._lru[key]
+            if self._conn is not None:
+                row = self._conn.execute("SELECT sql FROM sql_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._conn.execute("UPDATE sql_cache SET hits = hits + 1 WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self._remember(key, row[0])
+                    self.hits += 1
+                    self.persistent_hits += 1
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, transcript, sql):
+        key = self.key(transcript)
+        with self._lock:
+            self._remember(key, sql)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT INTO sql_cache (key, sql, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET sql = excluded.sql, updated_at = excluded.updated_at",
+                    (key, sql, time.time()))
+                self._conn.commit()
+
+    def _remember(self, key, sql):
+        self._lru[key] = sql
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def get_or_compute(self, transcript, compute):
+        sql = self.get(transcript)
+        if sql is None:
+            sql = compute(transcript)
+            self.put(transcript, sql)
+        return sql
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM sql_cache")
+                self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._lru),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,131 @@
+import asyncio
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def pcm16_to_float(frame):
+    """Little-endian int16 PCM bytes (e.g. from a microphone or socket) -> float32."""
+    return np.frombuffer(frame, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def _merge_overlap(committed_words, new_words, max_overlap=12):
+    """Drop the words of `new_words` that repeat the tail of `committed_words`.
+
+    Consecutive windows share `overlap_s` seconds of audio, so the start of a
+    new hypothesis usually repeats the last few committed words.
+    """
+    for n in range(min(max_overlap, len(committed_words), len(new_words)), 0, -1):
+        tail = [w.lower().strip(".,?!") for w in committed_words[-n:]]
+        head = [w.lower().strip(".,?!") for w in new_words[:n]]
+        if tail == head:
+            return new_words[n:]
+    return new_words
+
+
+class StreamingTranscriber:
+    """Incremental transcription over audio that arrives in chunks.
+
+    Audio is buffered; every `step_s` seconds of new audio the current window
+    is re-decoded and a "partial" event is emitted with the transcript so far.
+    When the window reaches `window_s` seconds its text is committed as a
+    "final" event and only the last `overlap_s` seconds are kept as context for
+    the next window (words repeated across the overlap are dropped).
+
+    `transcribe_fn` maps a float32 16 kHz waveform to text, e.g.
+    WhisperTranscriber.transcribe or SpeechToSQLPipeline.transcribe.
+    `sql_fn`, if given, maps transcript text to SQL and adds a preview to
+    every event.
+
+    Events are dicts: {"type", "text", "segment", "start", "end"[, "sql"]},
+    where "text" is the whole transcript so far and "segment" the text of the
+    current window; times are in seconds from the start of the stream.
+    """
+
+    def __init__(self, transcribe_fn, window_s=10.0, step_s=1.0, overlap_s=1.5,
+                 sample_rate=SAMPLE_RATE, sql_fn=None):
+        if not 0 <= overlap_s < window_s:
+            raise ValueError("overlap_s must be smaller than window_s")
+        self.transcribe_fn = transcribe_fn
+        self.sql_fn = sql_fn
+        self.sample_rate = sample_rate
+        self.window = int(window_s * sample_rate)
+        self.step = int(step_s * sample_rate)
+        self.overlap = int(overlap_s * sample_rate)
+        self.reset()
+
+    def reset(self):
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._buffer_start = 0  # sample offset of the buffer in the stream
+        self._since_decode = 0
+        self._committed = []
+
+    def _event(self, kind, segment_words):
+        text = " ".join(self._committed + segment_words)
+        event = {
+            "type": kind,
+            "text": text,
+            "segment": " ".join(segment_words),
+            "start": self._buffer_start / self.sample_rate,
+            "end": (self._buffer_start + len(self._buffer)) / self.sample_rate,
+        }
+        if self.sql_fn is not None and text:
+            event["sql"] = self.sql_fn(text)
+        return event
+
+    def _decode(self):
+        self._since_decode = 0
+        words = self.transcribe_fn(self._buffer).split()
+        return _merge_overlap(self._committed, words)
+
+    def feed(self, chunk):
+        """Add a chunk (float32 array or int16 PCM bytes); return the events it triggers."""
+        if isinstance(chunk, (bytes, bytearray, memoryview)):
+            chunk = pcm16_to_float(chunk)
+        self._buffer = np.concatenate([self._buffer, np.asarray(chunk, dtype=np.float32)])
+        self._since_decode += len(chunk)
+
+        events = []
+        while len(self._buffer) >= self.window:
+            # Commit the full window, keep the overlap as context for the next one
+            rest = self._buffer[self.window:]
+            self._buffer = self._buffer[:self.window]
+            words = self._decode()
+            events.append(self._event("final", words))
+            self._committed.extend(words)
+            keep = self._buffer[self.window - self.overlap:]
+            self._buffer_start += self.window - self.overlap
+            self._buffer = np.concatenate([keep, rest])
+            self._since_decode = len(rest)
+
+        if self._since_decode >= self.step and len(self._buffer) > self.overlap:
+            events.append(self._event("partial", self._decode()))
+        return events
+
+    def finish(self):
+        """Flush the remaining audio as a final event and reset for the next stream."""
+        events = []
+        if len(self._buffer) > self.overlap or (self._buffer_start == 0 and len(self._buffer)):
+            words = self._decode()
+            events.append(self._event("final", words))
+            self._committed.extend(words)
+        self.reset()
+        return events
+
+    def stream(self, chunks):
+        """Generator: feed an iterable of chunks, yielding events as they happen."""
+        for chunk in chunks:
+            yield from self.feed(chunk)
+        yield from self.finish()
+
+    async def astream(self, chunks):
+        """Async generator over an async iterable of chunks.
+
+        Decoding runs in a worker thread so the event loop keeps receiving audio.
+        """
+        async for chunk in chunks:
+            for event in await asyncio.to_thread(self.feed, chunk):
+                yield event
+        for event in await asyncio.to_thread(self.finish):
+            yield event
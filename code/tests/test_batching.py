@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from batching import MicroBatcher
+
+
+@pytest.fixture
+def batches():
+    return []
+
+
+def make_batcher(batches, **kwargs):
+    def process(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+    return MicroBatcher(process, **kwargs)
+
+
+def test_results_come_back_in_request_order(batches):
+    batcher = make_batcher(batches, max_batch_size=4, max_wait_ms=50)
+    futures = [batcher.submit(i) for i in range(10)]
+    assert [f.result(timeout=5) for f in futures] == [i * 10 for i in range(10)]
+    batcher.stop()
+    assert [item for batch in batches for item in batch] == list(range(10))
+
+
+def test_batch_never_exceeds_max_batch_size(batches):
+    gate = threading.Event()
+
+    def process(items):
+        gate.wait(5)
+        batches.append(list(items))
+        return items
+
+    batcher = MicroBatcher(process, max_batch_size=3, max_wait_ms=1000)
+    # The first batch blocks in process_batch while the rest pile up in the queue
+    futures = [batcher.submit(i) for i in range(12)]
+    gate.set()
+    for f in futures:
+        f.result(timeout=5)
+    batcher.stop()
+    assert max(len(b) for b in batches) == 3
+    assert sum(len(b) for b in batches) == 12
+
+
+def test_max_wait_flushes_partial_batch(batches):
+    batcher = make_batcher(batches, max_batch_size=100, max_wait_ms=30)
+    start = time.monotonic()
+    futures = [batcher.submit(i) for i in range(3)]
+    assert [f.result(timeout=5) for f in futures] == [0, 10, 20]
+    # Far below max_batch_size, so only the deadline can have released it
+    assert time.monotonic() - start < 2
+    batcher.stop()
+    assert batches == [[0, 1, 2]]
+
+
+def test_exception_reaches_every_waiter():
+    def process(items):
+        raise ValueError("model failed")
+
+    batcher = MicroBatcher(process, max_batch_size=4, max_wait_ms=50)
+    futures = [batcher.submit(i) for i in range(4)]
+    for f in futures:
+        with pytest.raises(ValueError, match="model failed"):
+            f.result(timeout=5)
+    # The worker keeps running after a failed batch
+    batcher.process_batch = lambda items: items
+    assert batcher.submit(7).result(timeout=5) == 7
+    batcher.stop()
+
+
+def test_wrong_result_count_fails_the_batch():
+    batcher = MicroBatcher(lambda items: items[:1], max_batch_size=2, max_wait_ms=200)
+    futures = [batcher.submit(i) for i in range(2)]
+    for f in futures:
+        with pytest.raises(RuntimeError, match="2 items"):
+            f.result(timeout=5)
+    batcher.stop()
+
+
+def test_submit_after_stop_fails_fast(batches):
+    batcher = make_batcher(batches)
+    assert batcher(1) == 10
+    batcher.stop()
+    start = time.monotonic()
+    with pytest.raises(RuntimeError, match="stopped"):
+        batcher.submit(2)
+    assert time.monotonic() - start < 1
+    # stop() is idempotent
+    batcher.stop()
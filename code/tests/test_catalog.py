@@ -0,0 +1,55 @@
+import sqlite3
+
+import pytest
+
+from catalog import CatalogPool
+
+QUERY = "SELECT title FROM books ORDER BY id"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "books.db")
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE books (id INTEGER PRIMARY KEY, title TEXT)")
+    conn.executemany("INSERT INTO books (title) VALUES (?)", [("Sách 1",), ("Sách 2",)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def pool(db_path):
+    pool = CatalogPool(db_path, size=2)
+    yield pool
+    pool.close()
+
+
+def test_repeated_query_is_served_from_cache(pool):
+    first = pool.execute(QUERY)
+    assert pool.execute(QUERY) == first
+    stats = pool.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 1, 0)
+
+
+def test_commit_from_another_connection_invalidates_cache(pool, db_path):
+    columns, rows = pool.execute(QUERY)
+    assert rows == [("Sách 1",), ("Sách 2",)]
+
+    writer = sqlite3.connect(db_path)
+    writer.execute("INSERT INTO books (title) VALUES ('Sách 3')")
+    writer.commit()
+    writer.close()
+
+    columns, rows = pool.execute(QUERY)
+    assert columns == ["title"]
+    assert rows == [("Sách 1",), ("Sách 2",), ("Sách 3",)]
+    stats = pool.stats()
+    assert stats["invalidations"] == 1
+    assert stats["hits"] == 0
+
+
+def test_pool_is_read_only(pool):
+    with pytest.raises(sqlite3.OperationalError):
+        pool.execute("INSERT INTO books (title) VALUES ('x')")
@@ -0,0 +1,42 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from constrained_sql import read_schema, table_columns
+
+# migrate_books.py lives in database/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "database"))
+from migrate_books import DERIVED_COLUMNS, migrate
+
+
+@pytest.fixture
+def migrated(tmp_path):
+    path = str(tmp_path / "books.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE books (id INTEGER, title TEXT, author TEXT, publisher TEXT, publication_year INTEGER, "
+                 "pages TEXT, price TEXT, availability TEXT, subject TEXT, department TEXT)")
+    conn.execute("INSERT INTO books (id, title, pages, price, availability) VALUES (1, 'Sách 1', '352 tr.', '450000', '0/1')")
+    conn.commit()
+    migrate(conn)
+    yield path, conn
+    conn.close()
+
+
+def test_generated_columns_are_part_of_the_schema(migrated):
+    path, conn = migrated
+    columns = table_columns(conn)
+    assert columns[:3] == ["id", "title", "author"]
+    assert columns[-len(DERIVED_COLUMNS):] == list(DERIVED_COLUMNS)
+    assert read_schema(path) == columns
+
+
+def test_fts_hidden_columns_are_skipped():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE VIRTUAL TABLE books_fts USING fts5(title, author)")
+    assert table_columns(conn, "books_fts") == ["title", "author"]
+    conn.close()
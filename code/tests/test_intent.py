@@ -0,0 +1,118 @@
+import sqlite3
+
+import pytest
+
+from intent import IntentMatcher
+
+BOOKS = [
+    ("Kiến trúc nhà ở", "Nguyễn Văn A", "NXB Xây dựng", "Khoa Kiến trúc", "Kiến trúc--Nhà ở",
+     "nhà ở, thiết kế", "Thiết kế nhà ở gia đình", 2015),
+    ("Lập trình Python", "Trần Thị B", "NXB Giáo dục", "Khoa Công nghệ thông tin", "Tin học--Lập trình",
+     "python", "Giáo trình lập trình cơ bản", 2020),
+    ("Kinh tế vi mô", "Nguyễn Văn A", "NXB Giáo dục", "Khoa Kinh tế", "Kinh tế học",
+     "kinh tế", "Nhập môn kinh tế vi mô", 2008),
+]
+
+
+def make_db(path, fts=False):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE books (title TEXT, author TEXT, publisher TEXT, department TEXT, subject TEXT, "
+                 "keywords TEXT, summary TEXT, publication_year INTEGER)")
+    conn.executemany("INSERT INTO books VALUES (?, ?, ?, ?, ?, ?, ?, ?)", BOOKS)
+    if fts:
+        # Same layout as database/fts.py (no đ in the test data, so no folding needed)
+        conn.execute("CREATE VIRTUAL TABLE books_fts USING fts5(title, author, keywords, subject, summary, "
+                     "content='books', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2')")
+        conn.execute("INSERT INTO books_fts(rowid, title, author, keywords, subject, summary) "
+                     "SELECT rowid, title, author, keywords, subject, summary FROM books")
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def db(tmp_path):
+    return make_db(str(tmp_path / "books.db"))
+
+
+def titles(db_path, match):
+    conn = sqlite3.connect(db_path)
+    try:
+        return sorted(row[0] for row in conn.execute(match.sql, match.params))
+    finally:
+        conn.close()
+
+
+def test_author_from_gazetteer(db):
+    match = IntentMatcher.from_db(db).match("sách của tác giả Nguyễn Văn A")
+    assert match.sql == "SELECT * FROM books WHERE author = ?"
+    assert match.params == ("Nguyễn Văn A",)
+    assert titles(db, match) == ["Kinh tế vi mô", "Kiến trúc nhà ở"]
+
+
+@pytest.mark.parametrize("text, slot, expected", [
+    ("sách xuất bản năm 2015", ("=", 2015), ["Kiến trúc nhà ở"]),
+    ("sách xuất bản sau năm 2010", (">", 2010), ["Kiến trúc nhà ở", "Lập trình Python"]),
+    ("sách xuất bản trước năm 2010", ("<", 2010), ["Kinh tế vi mô"]),
+    ("sách từ năm 2016 đến năm 2005", (2005, 2016), ["Kinh tế vi mô", "Kiến trúc nhà ở"]),
+    # Spoken years are normalized to digits first
+    ("sách xuất bản năm hai nghìn mười lăm", ("=", 2015), ["Kiến trúc nhà ở"]),
+])
+def test_publication_year(db, text, slot, expected):
+    match = IntentMatcher.from_db(db).match(text)
+    assert match.slots == {"publication_year": slot}
+    assert titles(db, match) == expected
+
+
+def test_two_slots_combine(db):
+    match = IntentMatcher.from_db(db).match("sách của Nguyễn Văn A xuất bản năm 2015")
+    assert match.slots == {"publication_year": ("=", 2015), "author": "Nguyễn Văn A"}
+    assert titles(db, match) == ["Kiến trúc nhà ở"]
+
+
+def test_subject_heading_matches_partially(db):
+    match = IntentMatcher.from_db(db).match("sách về nhà ở")
+    assert match.sql == "SELECT * FROM books WHERE subject LIKE ?"
+    assert match.params == ("%Nhà ở%",)
+
+
+def test_title_phrase_keeps_diacritics(db):
+    match = IntentMatcher.from_db(db).match("sách có tên là lập trình python")
+    assert match.slots == {"title": "lập trình python"}
+    assert titles(db, match) == ["Lập trình Python"]
+
+
+def test_keyword_phrase_searches_keywords_and_summary(db):
+    match = IntentMatcher.from_db(db).match("tài liệu có từ khóa python")
+    assert match.sql == "SELECT * FROM books WHERE (keywords LIKE ? OR summary LIKE ?)"
+    assert titles(db, match) == ["Lập trình Python"]
+
+
+@pytest.mark.parametrize("text", ["sách có tên là", "sách có tên sách là", "tài liệu có từ khóa là"])
+def test_cue_without_a_phrase_falls_back_to_t5(db, text):
+    assert IntentMatcher.from_db(db).match(text) is None
+
+
+def test_cue_without_a_phrase_keeps_other_slots(db):
+    match = IntentMatcher.from_db(db).match("sách xuất bản năm 2015 có tên là")
+    assert "title" not in match.slots
+    assert "%là%" not in match.params
+
+
+def test_cue_for_another_column_is_not_guessed(db):
+    assert IntentMatcher.from_db(db).match("sách của nhà xuất bản Nguyễn Văn A") is None
+
+
+@pytest.mark.parametrize("text", ["xin chào", "năm 2015", "thời tiết hôm nay thế nào"])
+def test_falls_back_to_t5(db, text):
+    assert IntentMatcher.from_db(db).match(text) is None
+
+
+def test_fts_title_lookup_is_accent_insensitive(tmp_path):
+    db = make_db(str(tmp_path / "books.db"), fts=True)
+    matcher = IntentMatcher.from_db(db)
+    assert matcher.use_fts
+    match = matcher.match("sách có tên kien truc nha o")
+    assert "books_fts MATCH ?" in match.sql
+    assert match.params == ('{title} : ("kien" "truc" "nha" "o")',)
+    assert titles(db, match) == ["Kiến trúc nhà ở"]
@@ -0,0 +1,124 @@
+import sqlite3
+
+import pytest
+
+from query_guard import QueryGuard, QueryRejected, QueryTimeout
+
+NUM_BOOKS = 12000
+RUN_FOREVER = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c"
+
+
+@pytest.fixture(scope="module")
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE books (title TEXT, author TEXT, publication_year INTEGER)")
+    conn.executemany("INSERT INTO books VALUES (?, ?, ?)",
+                     [(f"Sách {i}", f"Tác giả {i % 50}", 1990 + i % 30) for i in range(NUM_BOOKS)])
+    conn.execute("CREATE TABLE shelves (name TEXT)")
+    conn.executemany("INSERT INTO shelves VALUES (?)", [("A",), ("B",)])
+    # Same layout as database/fts.py
+    conn.execute("CREATE VIRTUAL TABLE books_fts USING fts5(title, author, content='books', content_rowid='rowid', "
+                 "tokenize='unicode61 remove_diacritics 2')")
+    conn.execute("INSERT INTO books_fts(rowid, title, author) SELECT rowid, title, author FROM books")
+    conn.execute("ANALYZE")
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("sql", [
+    "DELETE FROM books",
+    "UPDATE books SET title = ''",
+    "PRAGMA table_info(books)",
+    "DROP TABLE books",
+])
+def test_only_queries_are_accepted(conn, sql):
+    with pytest.raises(QueryRejected):
+        QueryGuard().prepare(conn, sql)
+
+
+def test_limit_is_added_once(conn):
+    guard = QueryGuard(max_rows=10)
+    sql, _ = guard.prepare(conn, "SELECT * FROM books -- tất cả")
+    assert sql.endswith("\nLIMIT 10")
+    assert len(conn.execute(sql).fetchall()) == 10
+
+    for query, params in (("SELECT * FROM books LIMIT 5;", ()), ("SELECT * FROM books LIMIT ? OFFSET ?", (5, 10)),
+                          ("SELECT * FROM books LIMIT 5, 10", ())):
+        sql, _ = guard.prepare(conn, query, params)
+        assert "\nLIMIT" not in sql
+    assert guard.stats["limited"] == 1
+
+
+def test_max_rows_argument_overrides_default(conn):
+    sql, _ = QueryGuard(max_rows=100).prepare(conn, "SELECT title FROM books", max_rows=3)
+    assert sql.endswith("LIMIT 3")
+
+
+def test_small_table_scans_are_fine(conn):
+    _, plan = QueryGuard().prepare(conn, "SELECT * FROM shelves a, shelves b")
+    assert any(line.startswith("SCAN") for line in plan)
+
+
+def test_cross_join_of_large_tables_is_rejected(conn):
+    guard = QueryGuard(large_table_rows=10000)
+    with pytest.raises(QueryRejected, match="2 full scans"):
+        guard.prepare(conn, "SELECT * FROM books a, books b")
+    assert guard.stats["rejected"] == 1
+
+
+def test_contains_like_becomes_fts_lookup(conn):
+    guard = QueryGuard(large_table_rows=10000)
+    sql, plan = guard.prepare(conn, "SELECT title FROM books WHERE title LIKE '%Sách 1199%'")
+    assert "books_fts MATCH '{title} : \"sach 1199\" *'" in sql
+    assert not any(line.startswith("SCAN books") and "VIRTUAL" not in line for line in plan)
+    assert guard.stats["rewritten"] == 1
+    titles = {row[0] for row in conn.execute(sql)}
+    assert titles == {f"Sách {i}" for i in range(NUM_BOOKS) if str(i).startswith("1199")}
+
+
+def test_like_on_unindexed_column_is_left_alone(conn):
+    sql = "SELECT * FROM books WHERE publication_year LIKE '%99%'"
+    guard = QueryGuard(max_rows=None, reject_wildcard_scans=False)
+    assert guard.prepare(conn, sql)[0] == sql
+    assert guard.stats["rewritten"] == 0
+
+
+def test_unindexed_leading_wildcard_scan_is_rejected(conn):
+    guard = QueryGuard()
+    with pytest.raises(QueryRejected, match="leading-wildcard"):
+        guard.prepare(conn, "SELECT * FROM books WHERE publication_year LIKE '%99%'")
+    # Without books_fts even indexable columns can't be rewritten
+    plain = sqlite3.connect(":memory:")
+    plain.execute("CREATE TABLE books (title TEXT, summary TEXT)")
+    plain.executemany("INSERT INTO books VALUES (?, ?)", [(f"Sách {i}", "x") for i in range(NUM_BOOKS)])
+    with pytest.raises(QueryRejected, match="leading-wildcard"):
+        QueryGuard().prepare(plain, "SELECT title FROM books WHERE summary LIKE '%x%'")
+    plain.close()
+    assert guard.stats["rejected"] == 1
+    # A prefix pattern, or a small table, is still allowed through
+    guard.prepare(conn, "SELECT * FROM books WHERE title LIKE 'Sách 1%'")
+    guard.prepare(conn, "SELECT * FROM shelves WHERE name LIKE '%A%'")
+
+
+def test_execute_returns_columns_and_rows(conn):
+    columns, rows = QueryGuard(max_rows=5).execute(conn, "SELECT title, author FROM books WHERE publication_year = ?",
+                                                   (1995,))
+    assert columns == ["title", "author"]
+    assert len(rows) == 5
+
+
+def test_runaway_query_times_out(conn):
+    guard = QueryGuard(time_budget_ms=50, progress_steps=100, slow_ms=None)
+    with pytest.raises(QueryTimeout):
+        guard.execute(conn, RUN_FOREVER)
+    assert guard.stats["timeouts"] == 1
+    # The progress handler is removed afterwards
+    assert conn.execute("SELECT count(*) FROM books").fetchone()[0] == NUM_BOOKS
+
+
+def test_slow_queries_are_logged_with_plan(conn, caplog):
+    guard = QueryGuard(slow_ms=0)
+    with caplog.at_level("WARNING", logger="query_guard"):
+        guard.execute(conn, "SELECT count(*) FROM books")
+    assert guard.stats["slow"] == 1
+    assert "plan:" in caplog.text and "SCAN books" in caplog.text
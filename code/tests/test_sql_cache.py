@@ -0,0 +1,92 @@
+import pytest
+
+from sql_cache import SQLCache, normalize_transcript
+
+
+@pytest.mark.parametrize("text, expected", [
+    # Digits read one by one are concatenated, not summed
+    ("hai không hai ba", "2023"),
+    ("hai không ba hai", "2032"),
+    ("one nine nine five", "1995"),
+    ("one nine five nine", "1959"),
+    ("nineteen ninety five", "1995"),
+    ("twenty twenty three", "2023"),
+    # Place-value numbers
+    ("hai nghìn không trăm hai mươi ba", "2023"),
+    ("ba trăm năm mươi", "350"),
+    ("năm mươi", "50"),
+    ("hai mươi lăm", "25"),
+    ("mười lăm", "15"),
+    ("hai mươi mốt", "21"),
+    ("hai mươi tư", "24"),
+    ("two thousand twenty three", "2023"),
+    ("hai triệu ba trăm nghìn", "2300000"),
+    # "lẻ"/"linh" leave the tens place empty
+    ("ba trăm lẻ năm", "305"),
+    ("một trăm linh năm", "105"),
+    ("một nghìn lẻ năm", "1005"),
+])
+def test_number_words(text, expected):
+    assert normalize_transcript(text) == expected
+
+
+def test_ambiguous_words_stay_words():
+    assert normalize_transcript("Sách xuất bản năm hai nghìn hai mươi.") == "sach xuat ban nam 2020"
+    assert normalize_transcript("không có sách lẻ") == "khong co sach le"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("mười năm", "10 nam"),
+    ("hai năm", "2 nam"),
+    ("một trăm năm cô đơn", "100 nam co don"),
+    ("trăm năm cô đơn", "100 nam co don"),
+    ("hai mươi năm", "20 nam"),
+    ("năm mươi năm", "50 nam"),
+    ("sách hai mươi năm trước", "sach 20 nam truoc"),
+    ("ba mươi năm cô đơn", "30 nam co don"),
+    ("năm trăm", "500"),
+])
+def test_nam_as_year(text, expected):
+    assert normalize_transcript(text) == expected
+
+
+def test_nam_as_year_does_not_share_keys():
+    assert normalize_transcript("mười năm") != normalize_transcript("mười lăm")
+    assert normalize_transcript("hai mươi năm") != normalize_transcript("hai mươi lăm")
+    assert normalize_transcript("một trăm năm cô đơn") != normalize_transcript("một trăm lẻ năm cô đơn")
+    cache = SQLCache(16)
+    cache.put("mười lăm", "SELECT 15")
+    assert cache.get("mười năm") is None
+
+
+def test_fold_false_keeps_diacritics():
+    assert normalize_transcript("Sách năm hai không hai ba", fold=False) == "sách năm 2023"
+
+
+def test_different_years_get_different_keys():
+    cache = SQLCache(16)
+    cache.put("sách năm hai không hai ba", "SELECT 2023")
+    assert cache.get("sách năm hai không ba hai") is None
+    assert cache.get("sach nam 2023") == "SELECT 2023"
+
+
+def test_lru_eviction():
+    cache = SQLCache(2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.stats()["entries"] == 2
+
+
+def test_persistent_tier(tmp_path):
+    db = str(tmp_path / "cache.db")
+    cache = SQLCache(4, db, namespace="m")
+    cache.put("sách của Nguyễn Du", "SELECT 1")
+    cache.close()
+    reopened = SQLCache(4, db, namespace="m")
+    assert reopened.get("sach cua nguyen du") == "SELECT 1"
+    assert reopened.stats()["persistent_hits"] == 1
+    assert SQLCache(4, db, namespace="other").get("sach cua nguyen du") is None
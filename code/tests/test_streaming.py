@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from streaming import StreamingTranscriber, _merge_overlap
+
+# 10 samples per second keeps the fake audio readable: every second of audio
+# holds one constant value k, which the fake model "hears" as the word wk
+RATE = 10
+
+
+def speech(first, last):
+    return np.repeat(np.arange(first, last + 1, dtype=np.float32), RATE)
+
+
+def fake_transcribe(audio):
+    return " ".join(f"w{int(v)}" for v in audio[::RATE])
+
+
+def make_streamer(**kwargs):
+    options = dict(window_s=4, step_s=1, overlap_s=1, sample_rate=RATE)
+    options.update(kwargs)
+    return StreamingTranscriber(fake_transcribe, **options)
+
+
+def seconds(audio):
+    return [audio[i:i + RATE] for i in range(0, len(audio), RATE)]
+
+
+def test_merge_overlap_drops_repeated_words():
+    assert _merge_overlap(["Xin", "chào."], ["chào", "bạn"]) == ["bạn"]
+    assert _merge_overlap(["a", "b", "c"], ["b", "c", "d"]) == ["d"]
+    assert _merge_overlap(["a", "b"], ["c", "d"]) == ["c", "d"]
+    assert _merge_overlap([], ["a"]) == ["a"]
+
+
+def test_overlapping_windows_are_merged_without_repeats():
+    events = list(make_streamer().stream(seconds(speech(1, 10))))
+    finals = [e for e in events if e["type"] == "final"]
+    assert [e["segment"] for e in finals] == ["w1 w2 w3 w4", "w5 w6 w7", "w8 w9 w10"]
+    assert [(e["start"], e["end"]) for e in finals] == [(0, 4), (3, 7), (6, 10)]
+    assert finals[-1]["text"] == " ".join(f"w{i}" for i in range(1, 11))
+
+
+def test_partials_grow_within_a_window():
+    streamer = make_streamer()
+    partials = [e["text"] for chunk in seconds(speech(1, 3)) for e in streamer.feed(chunk)]
+    # The first second is no longer than the overlap, so it is not decoded alone
+    assert partials == ["w1 w2", "w1 w2 w3"]
+
+
+def test_finish_flushes_the_remaining_audio():
+    streamer = make_streamer()
+    events = [e for chunk in seconds(speech(1, 6)) for e in streamer.feed(chunk)]
+    assert [e["type"] for e in events if e["type"] == "final"] == ["final"]
+    flushed = streamer.finish()
+    assert len(flushed) == 1
+    assert flushed[0]["type"] == "final"
+    assert flushed[0]["segment"] == "w5 w6"
+    assert flushed[0]["text"] == "w1 w2 w3 w4 w5 w6"
+    # finish() resets the streamer for the next stream
+    assert streamer.finish() == []
+
+
+def test_overlap_only_tail_is_not_decoded_again():
+    streamer = make_streamer()
+    list(streamer.stream(seconds(speech(1, 10))))
+    streamer.feed(speech(1, 4))
+    # Only the kept overlap is left after the window is committed
+    assert streamer.finish() == []
+
+
+def test_empty_and_short_input():
+    assert list(make_streamer().stream([])) == []
+    events = list(make_streamer().stream([speech(7, 7)[:5]]))
+    assert [(e["type"], e["text"]) for e in events] == [("final", "w7")]
+
+
+def test_pcm16_chunks_and_sql_preview():
+    streamer = StreamingTranscriber(lambda audio: f"{len(audio)} samples", window_s=1, step_s=0.5, overlap_s=0,
+                                    sample_rate=RATE, sql_fn=lambda text: f"-- {text}")
+    events = streamer.feed(np.zeros(5, dtype="<i2").tobytes())
+    assert [(e["type"], e["text"], e["sql"]) for e in events] == [("partial", "5 samples", "-- 5 samples")]
+
+
+def test_overlap_must_be_shorter_than_window():
+    with pytest.raises(ValueError):
+        StreamingTranscriber(fake_transcribe, window_s=2, overlap_s=2)
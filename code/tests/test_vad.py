@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+import vad
+
+SR = vad.SAMPLE_RATE
+
+
+def noise(seconds, rng):
+    return (rng.standard_normal(int(seconds * SR)) * 0.001).astype(np.float32)
+
+
+def voiced(seconds, rng, f0=150):
+    # Harmonic tone: loud and spectrally peaked, unlike the noise floor
+    t = np.arange(int(seconds * SR)) / SR
+    tone = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 8)) * 0.3
+    return (tone + rng.standard_normal(len(t)) * 0.001).astype(np.float32)
+
+
+def recording(*parts, seed=0):
+    """("speech" | "silence", seconds) parts joined into one waveform"""
+    rng = np.random.default_rng(seed)
+    return np.concatenate([voiced(s, rng) if kind == "speech" else noise(s, rng) for kind, s in parts])
+
+
+def assert_segments(segments, expected, tol=0.15):
+    assert len(segments) == len(expected)
+    for seg, (start, end) in zip(segments, expected):
+        assert seg.start == pytest.approx(start, abs=tol)
+        assert seg.end == pytest.approx(end, abs=tol)
+
+
+def test_short_pause_is_bridged_and_long_pause_splits():
+    audio = recording(("silence", 1), ("speech", 2), ("silence", 0.2), ("speech", 1),
+                      ("silence", 1.5), ("speech", 1.5), ("silence", 1))
+    # Speech at 1-4.2 s (one 0.2 s pause) and 5.7-7.2 s, padded by 100 ms
+    assert_segments(vad.detect_speech(audio), [(0.9, 4.3), (5.6, 7.3)])
+
+
+def test_bursts_shorter_than_min_speech_are_dropped():
+    audio = recording(("silence", 1), ("speech", 0.08), ("silence", 1))
+    assert vad.detect_speech(audio) == []
+
+
+@pytest.mark.parametrize("audio", [np.zeros(0, dtype=np.float32), recording(("silence", 2))])
+def test_no_speech(audio):
+    assert vad.detect_speech(audio) == []
+    trimmed, offset = vad.trim_silence(audio)
+    assert trimmed is audio and offset == 0.0
+
+
+def test_trim_silence_cuts_both_ends():
+    audio = recording(("silence", 1), ("speech", 2), ("silence", 1.5), ("speech", 1), ("silence", 1))
+    trimmed, offset = vad.trim_silence(audio)
+    assert offset == pytest.approx(0.9, abs=0.15)
+    # Inner silence is kept; only the edges go
+    assert len(trimmed) / SR == pytest.approx(4.7, abs=0.3)
+    start = int(round(offset * SR))
+    np.testing.assert_array_equal(trimmed, audio[start:start + len(trimmed)])
+
+
+def test_split_on_pauses_merges_while_chunks_fit():
+    audio = recording(("silence", 0.5), ("speech", 2), ("silence", 1), ("speech", 2),
+                      ("silence", 1), ("speech", 2), ("silence", 0.5))
+    chunks = vad.split_on_pauses(audio, max_segment_s=6)
+    # The first two segments fit in 6 s together, the third does not
+    assert_segments(chunks, [(0.4, 5.6), (6.4, 8.6)])
+    assert all(c.end - c.start <= 6 for c in chunks)
+
+
+def test_split_on_pauses_cuts_long_speech_evenly():
+    audio = recording(("silence", 0.5), ("speech", 70), ("silence", 0.5))
+    chunks = vad.split_on_pauses(audio)
+    assert len(chunks) == 3
+    assert all(c.end - c.start <= 30 for c in chunks)
+    lengths = [c.end - c.start for c in chunks]
+    assert max(lengths) - min(lengths) < 1e-6
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert prev.end == nxt.start
+    assert chunks[-1].end <= len(audio) / SR
@@ -0,0 +1,113 @@
+import numpy as np
+import torch
+import torchaudio
+from transformers import WhisperForConditionalGeneration, WhisperProcessor
+
+import vad
+from quantize import is_quantized_checkpoint, load_quantized
+
+SAMPLE_RATE = 16000
+PROCESSOR_NAME = "openai/whisper-small"
+
+
+def load_audio(path):
+    """Load a file as a mono 16 kHz waveform tensor."""
+    waveform, sample_rate = torchaudio.load(path)
+    if waveform.shape[0] > 1:
+        waveform = waveform.mean(dim=0, keepdim=True)
+    if sample_rate != SAMPLE_RATE:
+        resampler = torchaudio.transforms.Resample(orig_freq=sample_rate, new_freq=SAMPLE_RATE)
+        waveform = resampler(waveform)
+    return waveform.squeeze()
+
+
+class WhisperTranscriber:
+    """Inference wrapper around the fine-tuned whisper-vi checkpoint.
+
+    Same steps as the notebook's inference cells (load_audio -> processor ->
+    model.generate -> batch_decode), reusable from scripts and services.
+    With `trim_silence`, leading/trailing silence is cut by the VAD before
+    decoding so Whisper doesn't hallucinate on it. Directories written by
+    quantize.export_quantized load as the int8 CPU model.
+
+    With an `assistant_model` (e.g. openai/whisper-tiny or base, which share
+    the tokenizer), decoding is speculative: the draft proposes a few tokens
+    and the fine-tuned model checks them in a single forward pass. Both
+    decode greedily, so the text is the same as without the assistant.
+    """
+
+    def __init__(self, model, processor, device=None, trim_silence=False, assistant_model=None):
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.model = model.to(self.device).eval()
+        self.processor = processor
+        self.trim_silence = trim_silence
+        self.assistant_model = None
+        if assistant_model is not None:
+            self.assistant_model = assistant_model.to(self.device, dtype=self.model.dtype).eval()
+
+    @classmethod
+    def from_pretrained(cls, checkpoint_path, processor_name=PROCESSOR_NAME, language="vi",
+                        device=None, trim_silence=False, assistant=None, num_assistant_tokens=None):
+        if is_quantized_checkpoint(checkpoint_path):
+            # Dynamically quantized kernels only run on CPU
+            model = load_quantized(checkpoint_path)
+            device = "cpu"
+        else:
+            model = WhisperForConditionalGeneration.from_pretrained(checkpoint_path)
+        assistant_model = None
+        if assistant:
+            assistant_model = WhisperForConditionalGeneration.from_pretrained(assistant)
+            if num_assistant_tokens:
+                assistant_model.generation_config.num_assistant_tokens = num_assistant_tokens
+        for m in (model, assistant_model):
+            if m is not None:
+                m.generation_config.language = language
+                m.generation_config.task = "transcribe"
+                m.generation_config.forced_decoder_ids = None
+        processor = WhisperProcessor.from_pretrained(processor_name)
+        return cls(model, processor, device=device, trim_silence=trim_silence, assistant_model=assistant_model)
+
+    def _as_array(self, audio):
+        if isinstance(audio, str):
+            audio = load_audio(audio)
+        if isinstance(audio, torch.Tensor):
+            audio = audio.numpy()
+        return np.asarray(audio, dtype=np.float32)
+
+    def generate(self, audios):
+        """Decoder token ids (prompt tokens included) for 16 kHz waveforms or file paths, each up to 30 s."""
+        arrays = [self._as_array(a) for a in audios]
+        if self.trim_silence:
+            arrays = [vad.trim_silence(a, SAMPLE_RATE)[0] for a in arrays]
+        inputs = self.processor(arrays, sampling_rate=SAMPLE_RATE, return_tensors="pt")
+        input_features = inputs.input_features.to(self.device, dtype=self.model.dtype)
+        with torch.no_grad():
+            if self.assistant_model is None:
+                return list(self.model.generate(input_features))
+            # Assisted generation runs one sequence at a time
+            return [self.model.generate(input_features[i:i + 1], assistant_model=self.assistant_model,
+                                        do_sample=False, num_beams=1)[0]
+                    for i in range(len(arrays))]
+
+    def transcribe_batch(self, audios):
+        """Transcribe 16 kHz waveforms (or file paths), each up to 30 s, in one generate call."""
+        pred_ids = self.generate(audios)
+        return [t.strip() for t in self.processor.batch_decode(pred_ids, skip_special_tokens=True)]
+
+    def transcribe(self, audio):
+        return self.transcribe_batch([audio])[0]
+
+    def transcribe_segments(self, audio, max_segment_s=30.0, batch_size=8):
+        """Transcribe a recording of any length, split at pauses by the VAD.
+
+        Returns [{"start", "end", "text"}] with times in seconds; silence
+        between segments is never sent to the model. Segments are decoded
+        `batch_size` at a time, so memory doesn't grow with the recording.
+        """
+        audio = self._as_array(audio)
+        segments = vad.split_on_pauses(audio, SAMPLE_RATE, max_segment_s=max_segment_s)
+        clips = [audio[int(s.start * SAMPLE_RATE):int(np.ceil(s.end * SAMPLE_RATE))] for s in segments]
+        texts = []
+        for i in range(0, len(clips), batch_size):
+            texts.extend(self.transcribe_batch(clips[i:i + batch_size]))
+        return [{"start": s.start, "end": s.end, "text": t} for s, t in zip(segments, texts)]
@@ -0,0 +1,122 @@
+from collections import namedtuple
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+SpeechSegment = namedtuple("SpeechSegment", ["start", "end"])  # seconds
+
+
+def _frames(audio, frame_len, hop_len):
+    if len(audio) < frame_len:
+        audio = np.pad(audio, (0, frame_len - len(audio)))
+    num_frames = 1 + (len(audio) - frame_len) // hop_len
+    return np.lib.stride_tricks.as_strided(
+        audio, shape=(num_frames, frame_len),
+        strides=(audio.strides[0] * hop_len, audio.strides[0]), writeable=False)
+
+
+def _runs(mask):
+    """(start, end) frame index pairs of the True runs in a boolean array."""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+def speech_frames(audio, sample_rate=SAMPLE_RATE, frame_ms=30, hop_ms=10,
+                  energy_margin_db=12.0, peak_gap_db=10.0, dynamic_range_db=45.0,
+                  flatness_threshold=0.45):
+    """Per-frame speech decision from log energy and spectral flatness.
+
+    A frame counts as speech when its spectrum is not flat like broadband
+    noise and its energy is `energy_margin_db` above the noise floor (5th
+    percentile of frame energies). The threshold is kept between
+    `dynamic_range_db` and `peak_gap_db` below the loudest frame, so
+    recordings that are almost all speech (no real floor) still work.
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    frame_len = int(sample_rate * frame_ms / 1000)
+    hop_len = int(sample_rate * hop_ms / 1000)
+    frames = _frames(audio, frame_len, hop_len) * np.hanning(frame_len).astype(np.float32)
+
+    energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    peak = energy_db.max()
+    threshold = min(np.percentile(energy_db, 5) + energy_margin_db, peak - peak_gap_db)
+    threshold = max(threshold, peak - dynamic_range_db)
+
+    power = np.abs(np.fft.rfft(frames, axis=1)) ** 2 + 1e-10
+    flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+
+    return (energy_db > threshold) & (flatness < flatness_threshold), hop_len
+
+
+def detect_speech(audio, sample_rate=SAMPLE_RATE, min_speech_ms=150, min_silence_ms=300,
+                  pad_ms=100, **frame_kwargs):
+    """Speech segments of a waveform as a list of SpeechSegment(start, end) in seconds.
+
+    Pauses shorter than `min_silence_ms` are bridged, bursts shorter than
+    `min_speech_ms` are dropped and every segment is padded by `pad_ms` so
+    word onsets and tails are not clipped.
+    """
+    if len(audio) == 0:
+        return []
+    mask, hop_len = speech_frames(audio, sample_rate, **frame_kwargs)
+    hop_s = hop_len / sample_rate
+
+    runs = _runs(mask)
+    min_gap = min_silence_ms / 1000 / hop_s
+    merged = []
+    for start, end in runs:
+        if merged and start - merged[-1][1] < min_gap:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+
+    duration = len(audio) / sample_rate
+    pad = pad_ms / 1000
+    segments = []
+    for start, end in merged:
+        if (end - start) * hop_s < min_speech_ms / 1000:
+            continue
+        seg_start = float(max(0.0, start * hop_s - pad))
+        seg_end = float(min(duration, end * hop_s + pad))
+        if segments and seg_start <= segments[-1].end:
+            segments[-1] = SpeechSegment(segments[-1].start, seg_end)
+        else:
+            segments.append(SpeechSegment(seg_start, seg_end))
+    return segments
+
+
+def trim_silence(audio, sample_rate=SAMPLE_RATE, **kwargs):
+    """Cut leading and trailing silence. Returns (trimmed_audio, offset_seconds).
+
+    Audio with no detected speech is returned unchanged.
+    """
+    segments = detect_speech(audio, sample_rate, **kwargs)
+    if not segments:
+        return audio, 0.0
+    start = int(segments[0].start * sample_rate)
+    end = int(np.ceil(segments[-1].end * sample_rate))
+    return audio[start:end], start / sample_rate
+
+
+def split_on_pauses(audio, sample_rate=SAMPLE_RATE, max_segment_s=30.0, **kwargs):
+    """Group speech into chunks of at most `max_segment_s`, cutting only at pauses.
+
+    Consecutive speech segments are merged while the chunk still fits in
+    `max_segment_s` (Whisper's 30 s window by default); a single segment that
+    is longer than that is split evenly. Silence between chunks is dropped.
+    """
+    chunks = []
+    for seg in detect_speech(audio, sample_rate, **kwargs):
+        if chunks and seg.end - chunks[-1].start <= max_segment_s:
+            chunks[-1] = SpeechSegment(chunks[-1].start, seg.end)
+            continue
+        length = seg.end - seg.start
+        pieces = int(np.ceil(length / max_segment_s))
+        step = length / pieces
+        for i in range(pieces):
+            chunks.append(SpeechSegment(seg.start + i * step, seg.start + (i + 1) * step))
+    if chunks:
+        # Even splits can overshoot the last sample by float rounding
+        chunks[-1] = SpeechSegment(chunks[-1].start, min(chunks[-1].end, len(audio) / sample_rate))
+    return chunks
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Chỉ mục toàn văn FTS5 cho bảng books.
+
+    python fts.py data_fix.db              # tạo bảng books_fts + trigger
+    python fts.py data_fix.db --rebuild    # xây lại toàn bộ chỉ mục
+    python fts.py data_fix.db -q "kien truc nha o"
+"""
+import argparse
+import re
+import sqlite3
+
+FTS_TABLE = "books_fts"
+# Cột được đánh chỉ mục và trọng số BM25 tương ứng: khớp ở title quan trọng hơn summary
+FTS_COLUMNS = ("title", "author", "keywords", "subject", "summary")
+FTS_WEIGHTS = (10.0, 4.0, 3.0, 3.0, 1.0)
+# remove_diacritics 2 bỏ dấu thanh và dấu mũ, nhưng "đ" là một chữ cái riêng nên phải tự đổi sang "d"
+TOKENIZER = "unicode61 remove_diacritics 2"
+
+
+def fold_sql(expr):
+    """Biểu thức SQL đổi đ/Đ thành d/D, dùng trong trigger."""
+    return f"replace(replace({expr}, 'đ', 'd'), 'Đ', 'D')"
+
+
+def fold_text(text):
+    return text.replace("đ", "d").replace("Đ", "D")
+
+
+def has_fts(conn, table=FTS_TABLE):
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+    return row is not None
+
+
+def match_expression(text, columns=None, prefix=False):
+    """Chuỗi MATCH an toàn cho FTS5 từ câu người dùng nói.
+
+    Mỗi từ được đặt trong dấu nháy kép (nên dấu câu hay từ khóa FTS như
+    AND/NEAR không phá cú pháp) và nối bằng AND ngầm định. `columns` giới
+    hạn tìm kiếm trong các cột đó; `prefix` cho phép từ cuối khớp tiền tố.
+    """
+    words = re.findall(r"\w+", fold_text(text).lower())
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    if prefix:
+        terms[-1] += "*"
+    expr = " ".join(terms)
+    if columns:
+        expr = "{" + " ".join(columns) + "} : (" + expr + ")"
+    return expr
+
+
+def create_fts(conn, rebuild=False):
+    """Tạo bảng FTS5 (external content trỏ về books) và trigger đồng bộ.
+
+    Chỉ mục lưu bản đã đổi đ->d còn nội dung đọc thẳng từ books, nên
+    highlight()/snippet() vẫn trả về tiếng Việt có dấu. Nếu books không có
+    INTEGER PRIMARY KEY thì VACUUM có thể đánh số lại rowid: khi đó chạy lại
+    với rebuild=True (migrate_books.py tạo khóa chính để tránh việc này).
+    """
+    cols = ", ".join(FTS_COLUMNS)
+    new_vals = ", ".join(fold_sql(f"new.{c}") for c in FTS_COLUMNS)
+    old_vals = ", ".join(fold_sql(f"old.{c}") for c in FTS_COLUMNS)
+    delete_old = (f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {cols}) "
+                  f"VALUES ('delete', old.rowid, {old_vals});")
+    insert_new = f"INSERT INTO {FTS_TABLE}(rowid, {cols}) VALUES (new.rowid, {new_vals});"
+
+    with conn:
+        if rebuild:
+            drop_fts(conn)
+        exists = has_fts(conn)
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                {cols}, content='books', content_rowid='rowid', tokenize='{TOKENIZER}'
+            )
+        """)
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN {insert_new} END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN {delete_old} END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE ON books "
+                     f"BEGIN {delete_old} {insert_new} END")
+        if not exists:
+            # Không dùng lệnh 'rebuild' của FTS5: nó đọc books nguyên dạng, chưa đổi đ->d
+            conn.execute(f"INSERT INTO {FTS_TABLE}(rowid, {cols}) "
+                         f"SELECT rowid, {', '.join(fold_sql(c) for c in FTS_COLUMNS)} FROM books")
+        # Lưu trọng số vào cấu hình của bảng để mọi truy vấn "ORDER BY rank" đều dùng chúng
+        conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', ?)",
+                     (f"bm25({', '.join(str(w) for w in FTS_WEIGHTS)})",))
+        conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+
+def drop_fts(conn):
+    for trigger in ("books_fts_ai", "books_fts_ad", "books_fts_au"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def search_books(conn, text, limit=20, columns=None, prefix=False):
+    """Tìm sách theo BM25, trả về (tên cột, danh sách dòng) như cursor thông thường."""
+    expr = match_expression(text, columns, prefix)
+    if expr is None:
+        return [], []
+    cursor = conn.execute(f"""
+        SELECT books.* FROM {FTS_TABLE}
+        JOIN books ON books.rowid = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH ?
+        ORDER BY {FTS_TABLE}.rank
+        LIMIT ?
+    """, (expr, limit))
+    return [d[0] for d in cursor.description], cursor.fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("db", help="file SQLite có bảng books")
+    parser.add_argument("--rebuild", action="store_true", help="xóa và xây lại chỉ mục")
+    parser.add_argument("--drop", action="store_true", help="xóa chỉ mục và trigger")
+    parser.add_argument("-q", "--query", help="thử tìm kiếm sau khi tạo chỉ mục")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.drop:
+            with conn:
+                drop_fts(conn)
+            print(f"✓ Đã xóa {FTS_TABLE} khỏi {args.db}")
+            return
+        create_fts(conn, rebuild=args.rebuild)
+        count = conn.execute(f"SELECT COUNT(*) FROM {FTS_TABLE}_docsize").fetchone()[0]
+        print(f"✓ {FTS_TABLE}: {count} sách đã được đánh chỉ mục trong {args.db}")
+
+        if args.query:
+            columns, rows = search_books(conn, args.query, args.limit)
+            print(f"\n🔎 {len(rows)} kết quả cho: {args.query}")
+            title = columns.index("title") if "title" in columns else 0
+            for i, row in enumerate(rows, 1):
+                print(f"   {i}. {row[title]}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
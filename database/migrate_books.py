@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Xây lại bảng books với khóa chính, cột số và chỉ mục.
+
+    python migrate_books.py data_fix.db
+    python migrate_books.py data_fix.db --backup data_fix.bak.db
+
+- id trở thành INTEGER PRIMARY KEY (giữ nguyên id cũ nếu không trùng, nếu
+  không thì đánh số lại).
+- Thêm các cột số tính từ cột chữ: price_vnd ("450000"), page_count
+  ("352 tr."), available/total ("0/1"). Đây là cột GENERATED STORED nên
+  luôn khớp với cột gốc, kể cả khi script khác INSERT/UPDATE về sau.
+- Tạo chỉ mục cho các cột hay lọc rồi chạy ANALYZE để query planner chọn
+  được chỉ mục.
+- Nếu có chỉ mục toàn văn books_fts (fts.py) thì tạo lại sau khi đổi bảng.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+
+from fts import create_fts, drop_fts, has_fts
+
+# Giá "0"/"1" là giá trị giữ chỗ khi thư viện không ghi giá, không phải giá thật
+_PRICE = "CAST(replace(replace(replace(price, '.', ''), ',', ''), ' ', '') AS INTEGER)"
+_SLASH = "instr(availability, '/')"
+DERIVED_COLUMNS = {
+    "price_vnd": f"CASE WHEN {_PRICE} >= 1000 THEN {_PRICE} END",
+    # CAST lấy phần số ở đầu chuỗi: "352 tr." -> 352
+    "page_count": "NULLIF(CAST(pages AS INTEGER), 0)",
+    "available": f"CASE WHEN {_SLASH} > 0 THEN CAST(substr(availability, 1, {_SLASH} - 1) AS INTEGER) END",
+    "total": f"CASE WHEN {_SLASH} > 0 THEN CAST(substr(availability, {_SLASH} + 1) AS INTEGER) END",
+}
+INDEXED_COLUMNS = ("author", "publisher", "publication_year", "subject", "department", "price_vnd", "page_count")
+
+
+def table_columns(conn, table="books"):
+    """[(tên cột, kiểu khai báo)] theo thứ tự trong bảng, bỏ qua cột generated."""
+    return [(row[1], row[2]) for row in conn.execute(f"PRAGMA table_xinfo({table})") if row[6] == 0]
+
+
+def migrate(conn):
+    """Đổi bảng books trong một transaction; trả về số dòng đã chuyển."""
+    columns = [(name, decl) for name, decl in table_columns(conn)
+               if name != "id" and name not in DERIVED_COLUMNS]
+    names = [name for name, _ in columns]
+    has_id = any(row[1] == "id" for row in conn.execute("PRAGMA table_info(books)"))
+    keep_ids = False
+    if has_id:
+        total, distinct = conn.execute("SELECT COUNT(*), COUNT(DISTINCT id) FROM books").fetchone()
+        keep_ids = total == distinct
+
+    column_defs = ["id INTEGER PRIMARY KEY"]
+    column_defs += [f'"{name}" {decl or ""}'.rstrip() for name, decl in columns]
+    column_defs += [f"{name} INTEGER GENERATED ALWAYS AS ({expr}) STORED" for name, expr in DERIVED_COLUMNS.items()]
+
+    conn.isolation_level = None
+    conn.execute("BEGIN")
+    try:
+        with_fts = has_fts(conn)
+        if with_fts:
+            # Trigger của FTS tham chiếu tới books nên phải bỏ trước khi đổi bảng
+            drop_fts(conn)
+        conn.execute("DROP TABLE IF EXISTS books_new")
+        conn.execute("CREATE TABLE books_new (\n    " + ",\n    ".join(column_defs) + "\n)")
+        quoted = ", ".join(f'"{n}"' for n in names)
+        id_expr = "id" if keep_ids else "NULL"
+        order = "id" if has_id else "rowid"
+        conn.execute(f"INSERT INTO books_new (id, {quoted}) SELECT {id_expr}, {quoted} FROM books ORDER BY {order}")
+        count = conn.execute("SELECT COUNT(*) FROM books_new").fetchone()[0]
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'books' "
+                                    "AND sql IS NOT NULL").fetchall():
+            conn.execute(f'DROP INDEX "{name}"')
+        conn.execute("DROP TABLE books")
+        conn.execute("ALTER TABLE books_new RENAME TO books")
+        for name in INDEXED_COLUMNS:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_books_{name} ON books({name})")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.isolation_level = ""
+
+    if with_fts:
+        create_fts(conn)
+    conn.execute("ANALYZE")
+    conn.commit()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("db", help="file SQLite có bảng books")
+    parser.add_argument("--backup", help="sao lưu file trước khi đổi")
+    parser.add_argument("--fts", action="store_true", help="tạo chỉ mục toàn văn books_fts nếu chưa có")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ Không tìm thấy database: {args.db}")
+        return
+    if args.backup:
+        shutil.copyfile(args.db, args.backup)
+        print(f"✓ Đã sao lưu sang {args.backup}")
+
+    conn = sqlite3.connect(args.db)
+    try:
+        count = migrate(conn)
+        if args.fts and not has_fts(conn):
+            create_fts(conn)
+        print(f"✓ Đã chuyển {count} sách sang bảng books mới")
+        print(f"✓ Cột số: {', '.join(DERIVED_COLUMNS)}")
+        print(f"✓ Chỉ mục: {', '.join(INDEXED_COLUMNS)}")
+
+        stats = conn.execute("SELECT COUNT(price_vnd), COUNT(page_count), COUNT(total) FROM books").fetchone()
+        print(f"\n📊 Có giá: {stats[0]}/{count} - có số trang: {stats[1]}/{count} - có tình trạng: {stats[2]}/{count}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Concurrent, polite crawler for the Duy Tan e-library.
+
+    python async_crawler.py --pages 1-50 --db duytan_books.db
+    python async_crawler.py --pages 1-5 --base-url http://127.0.0.1:8765 --rate 50
+
+Requests go through one aiohttp connection pool bounded by --concurrency,
+and every host has its own token bucket (--rate requests/s, --burst), so
+throughput is configurable without hammering the library. Failed requests
+(connection errors, 429, 5xx) are retried with exponential backoff and full
+jitter, honouring Retry-After. HTML parsing (craw.parse_book_html) runs in a
+process pool while the event loop keeps fetching. Use stub_server.py as a
+local stand-in for the site.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from craw import BASE_URL, DuyTanLibraryScraper, listing_page_url, parse_book_html, parse_listing_html
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+
+class TokenBucket:
+    """`rate` requests per second on average, with bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncBookCrawler:
+    def __init__(self, base_url=BASE_URL, concurrency=8, rate=2.0, burst=2, max_retries=4,
+                 backoff_base=1.0, backoff_max=60.0, timeout=30, parse_workers=None):
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.parse_workers = parse_workers
+        self._buckets = {}
+        self.stats = {"requests": 0, "retries": 0, "failed": 0, "parsed": 0}
+
+    def _bucket(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rate, self.burst)
+        return self._buckets[host]
+
+    def _backoff(self, attempt, retry_after=None):
+        # Full jitter: uniform in [0, min(max, base * 2^attempt)]
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    async def fetch(self, session, url):
+        """GET `url` politely; returns the body bytes, or None after the last retry."""
+        for attempt in range(self.max_retries + 1):
+            await self._bucket(url).acquire()
+            retry_after = None
+            try:
+                self.stats["requests"] += 1
+                async with session.get(url) as response:
+                    if response.status in RETRY_STATUSES:
+                        header = response.headers.get('Retry-After')
+                        if header and header.isdigit():
+                            retry_after = min(float(header), self.backoff_max)
+                        raise aiohttp.ClientResponseError(response.request_info, response.history,
+                                                          status=response.status, message=response.reason)
+                    response.raise_for_status()
+                    return await response.read()
+            except aiohttp.ClientResponseError as e:
+                if e.status not in RETRY_STATUSES:
+                    print(f"✗ {url}: HTTP {e.status}")
+                    break
+                error = f"HTTP {e.status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = str(e) or type(e).__name__
+            if attempt < self.max_retries:
+                self.stats["retries"] += 1
+                delay = self._backoff(attempt, retry_after)
+                print(f"⚠️ {url}: {error}, thử lại sau {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+        self.stats["failed"] += 1
+        return None
+
+    def _session(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.concurrency)
+        return aiohttp.ClientSession(connector=connector, headers={'User-Agent': USER_AGENT},
+                                     timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+    async def _run_workers(self, items, handle):
+        queue = asyncio.Queue()
+        for item in items:
+            queue.put_nowait(item)
+
+        async def worker():
+            while True:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await handle(item)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, max(1, queue.qsize())))))
+
+    async def crawl_listing(self, pages):
+        """Book detail URLs from the given listing pages, in page order."""
+        results = {}
+        async with self._session() as session:
+            loop = asyncio.get_running_loop()
+
+            async def handle(page):
+                content = await self.fetch(session, listing_page_url(page, self.base_url))
+                if content is not None:
+                    results[page] = await loop.run_in_executor(None, parse_listing_html, content, self.base_url)
+
+            await self._run_workers(pages, handle)
+        urls, seen = [], set()
+        for page in sorted(results):
+            for url in results[page]:
+                if url not in seen:
+                    seen.add(url)
+                    urls.append(url)
+        return urls
+
+    async def crawl_books(self, book_urls, on_book=None):
+        """Fetch and parse every book page; `on_book(book_info)` is called as each one is parsed."""
+        books = []
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(self.parse_workers) as pool:
+            async with self._session() as session:
+
+                async def handle(url):
+                    content = await self.fetch(session, url)
+                    if content is None:
+                        return
+                    try:
+                        book_info = await loop.run_in_executor(pool, parse_book_html, content, url, self.base_url)
+                    except Exception as e:
+                        print(f"✗ Lỗi khi phân tích {url}: {str(e)}")
+                        return
+                    self.stats["parsed"] += 1
+                    books.append(book_info)
+                    if on_book is not None:
+                        on_book(book_info)
+
+                await self._run_workers(book_urls, handle)
+        return books
+
+    def run(self, pages, on_book=None):
+        async def main():
+            urls = await self.crawl_listing(pages)
+            print(f"✅ Đã thu thập {len(urls)} URL sách từ {len(pages)} trang")
+            return await self.crawl_books(urls, on_book)
+        return asyncio.run(main())
+
+
+def parse_pages(spec):
+    """Page spec such as "1-50,60,70-72" -> list of page numbers"""
+    pages = []
+    for part in spec.split(','):
+        if '-' in part:
+            low, high = part.split('-')
+            pages.extend(range(int(low), int(high) + 1))
+        elif part:
+            pages.append(int(part))
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default="1", help="listing pages to crawl, e.g. 1-50,60")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--concurrency", type=int, default=8, help="max open connections")
+    parser.add_argument("--rate", type=float, default=2.0, help="requests per second per host")
+    parser.add_argument("--burst", type=int, default=2, help="token bucket size per host")
+    parser.add_argument("--retries", type=int, default=4)
+    parser.add_argument("--parse-workers", type=int, help="parser processes (default: CPU count)")
+    parser.add_argument("--db", help="upsert books into this SQLite database")
+    parser.add_argument("--json", help="also write the books to this JSON file")
+    args = parser.parse_args()
+
+    crawler = AsyncBookCrawler(args.base_url, concurrency=args.concurrency, rate=args.rate, burst=args.burst,
+                               max_retries=args.retries, parse_workers=args.parse_workers)
+    start = time.perf_counter()
+    books = crawler.run(parse_pages(args.pages))
+    elapsed = time.perf_counter() - start
+    print(f"🎉 {len(books)} sách trong {elapsed:.1f}s ({len(books) / elapsed:.2f} sách/s) - {crawler.stats}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(books, f, ensure_ascii=False, indent=2)
+        print(f"✓ Đã lưu {len(books)} sách vào {args.json}")
+    if args.db:
+        DuyTanLibraryScraper().save_to_sqlite(books, args.db)
+
+
+if __name__ == "__main__":
+    main()
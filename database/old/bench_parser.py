@@ -0,0 +1,241 @@
+"""Throughput benchmark for book_parser against the former BeautifulSoup parser.
+
+    python bench_parser.py                              # fixtures/pages, 20 rounds
+    python bench_parser.py --cache page_cache --rounds 3
+    python bench_parser.py --make-fixtures --db ../data_fix.db --json duytan_books.json
+
+Every page is parsed by both implementations first, and any field that
+differs is reported. Then each parser runs --rounds times over the whole
+corpus and pages/s is printed. --cache benchmarks on the raw pages kept by
+page_cache.py. --make-fixtures renders detail and listing pages from a books
+table and a scraper JSON dump using stub_server.py's layout.
+
+The checked-in fixtures are synthetic: fixtures/pages/10001-10002 are
+hand-written, the rest are rendered by stub_server.py, whose detail pages
+carry the same li.title the new parser looks for first. Agreement and
+pages/s measured on them say nothing about pages from the real site; run
+with --cache on pages fetched by page_cache.py for that.
+"""
+import argparse
+import json
+import os
+import re
+import time
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+from book_parser import BASE_URL, parse_book_page, parse_listing_page
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# (key, pattern) pairs searched one by one over the page text by the old parser
+BS4_PATTERNS = [
+    ('author', r'Tác giả:\s*([^\n\r]+)'),
+    ('publisher', r'Nhà xuất bản:\s*([^\n\r]+)'),
+    ('publication_year', r'Năm xuất bản:\s*(\d{4})'),
+    ('pages', r'Số trang:\s*([^\n\r]+)'),
+    ('dimensions', r'Kích thước:\s*([^\n\r]+)'),
+    ('registration_number', r'Số đăng ký cá biệt:\s*([^\n\r]+)'),
+    ('isbn', r'ISBN:\s*([^\n\r]+)'),
+    ('dewey_code', r'Mã Dewey:\s*([^\n\r]+)'),
+    ('price', r'Đơn giá:\s*([^\n\r]+)'),
+    ('storage_location', r'Vị trí lưu trữ:\s*([^\n\r]+)'),
+    ('language', r'Ngôn ngữ:\s*([^\n\r]+)'),
+    ('document_type', r'Loại tài liệu:\s*([^\n\r]+)'),
+    ('availability', r'Đang rỗi/ Tổng sách:\s*([^\n\r]+)'),
+    ('keywords', r'Từ khóa:\s*([^\n\r]+)'),
+    ('subject', r'Chủ đề:\s*([^\n\r]+)'),
+    ('department', r'Chuyên ngành:\s*([^\n\r]+)'),
+]
+
+
+def parse_book_html_bs4(content, book_url, base_url=BASE_URL):
+    """The parser craw.py and craw_books.py used before book_parser, kept as the baseline"""
+    soup = BeautifulSoup(content, 'html.parser')
+    book_info = {}
+    page_text = soup.get_text()
+
+    title_element = soup.find('li', class_='title')
+    if title_element and title_element.get_text().strip():
+        book_info['title'] = title_element.get_text().strip()
+
+    if 'title' not in book_info:
+        title_match = re.search(r'\.jpg\s*\n\s*(.*?)(?=Tác giả:)', page_text, re.DOTALL)
+        if title_match:
+            for line in title_match.group(1).strip().split('\n'):
+                line = line.strip()
+                if (line and len(line) > 5 and len(line) < 300 and
+                        not line.startswith('Trở về') and not line.startswith('Hiển thị') and
+                        not line.startswith('CSDL') and not line.startswith('Sách') and
+                        'Trang chủ' not in line and 'Marc' not in line and 'jpg' not in line):
+                    book_info['title'] = line
+                    break
+
+    if 'title' not in book_info:
+        main_content = soup.find('div', class_='col-md-8')
+        if main_content:
+            alt_pattern = r'jpg.*?\n\s*([^\n]+?)(?=\s*(?:Tác giả:|Nhà xuất bản:|Năm xuất bản:))'
+            alt_match = re.search(alt_pattern, main_content.get_text(), re.DOTALL)
+            if alt_match:
+                title_candidate = re.sub(r'\s+', ' ', alt_match.group(1).strip())
+                if (title_candidate and len(title_candidate) > 5 and
+                        'Trang chủ' not in title_candidate and
+                        not title_candidate.startswith('CSDL') and
+                        not title_candidate.startswith('Trở về')):
+                    book_info['title'] = title_candidate
+
+    if 'title' not in book_info:
+        content_div = soup.find('div', class_='col-md-8')
+        if content_div:
+            for p in content_div.find_all(['p', 'div', 'span']):
+                text = p.get_text().strip()
+                if (text and len(text) > 10 and len(text) < 200 and
+                        not text.startswith(('Tác giả:', 'Nhà xuất bản:', 'Năm xuất bản:',
+                                             'Số trang:', 'Kích thước:', 'ISBN:', 'Mã Dewey:',
+                                             'Trở về', 'Hiển thị', 'CSDL')) and
+                        'Trang chủ' not in text and 'upload/sach_anh' not in text):
+                    book_info['title'] = text
+                    break
+
+    img_element = soup.find('img', src=re.compile(r'sach_anh'))
+    if img_element:
+        book_info['cover_image'] = urljoin(base_url, img_element['src'])
+
+    for key, pattern in BS4_PATTERNS:
+        match = re.search(pattern, page_text)
+        if match:
+            value = match.group(1).strip()
+            book_info[key] = int(value) if key == 'publication_year' else value
+
+    summary_match = re.search(r'Tóm tắt:\s*(.*?)(?=\n\s*\n|\n\s*[A-Z]|$)', page_text, re.DOTALL)
+    if summary_match:
+        summary = re.sub(r'\s+', ' ', summary_match.group(1).strip())
+        summary = summary.split('Bạn phải đăng nhập')[0].strip()
+        if summary:
+            book_info['summary'] = summary
+
+    book_info['url'] = book_url
+    return book_info
+
+
+def parse_listing_html_bs4(content, base_url=BASE_URL):
+    soup = BeautifulSoup(content, 'html.parser')
+    book_urls = []
+    for link in soup.find_all('a', href=re.compile(r'/Sach/Detail/\d+')):
+        book_url = urljoin(base_url, link['href'])
+        if book_url not in book_urls:
+            book_urls.append(book_url)
+    return book_urls
+
+
+def load_fixtures(fixtures_dir=FIXTURES_DIR):
+    """(url, body) pairs for the saved detail and listing pages"""
+    corpus = {'pages': [], 'listings': []}
+    for kind in corpus:
+        directory = os.path.join(fixtures_dir, kind)
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            m = re.fullmatch(r'(\d+)\.html', name)
+            if not m:
+                continue
+            with open(os.path.join(directory, name), 'rb') as f:
+                body = f.read()
+            path = f'/Sach/Detail/{m.group(1)}' if kind == 'pages' else f'/Sach/Index/0/0/0/{m.group(1)}'
+            corpus[kind].append((BASE_URL + path, body))
+    return corpus['pages'], corpus['listings']
+
+
+def make_fixtures(fixtures_dir=FIXTURES_DIR, db_path=None, json_path=None):
+    """Render fixture pages from a books table and/or a scraper JSON dump"""
+    from stub_server import BookSource, render_book_page
+
+    source = BookSource(db_path=db_path)
+    if json_path:
+        with open(json_path, encoding='utf-8') as f:
+            for book in json.load(f):
+                match = re.search(r'/Sach/Detail/(\d+)', book.get('url') or '')
+                if match:
+                    book_id = int(match.group(1))
+                    source.pages[book_id] = render_book_page(book_id, book).encode('utf-8')
+        source.ids = sorted(source.pages, reverse=True)
+
+    for kind in ('pages', 'listings'):
+        os.makedirs(os.path.join(fixtures_dir, kind), exist_ok=True)
+    for book_id, body in source.pages.items():
+        with open(os.path.join(fixtures_dir, 'pages', f'{book_id}.html'), 'wb') as f:
+            f.write(body)
+    for page in range(1, source.num_pages() + 1):
+        with open(os.path.join(fixtures_dir, 'listings', f'{page}.html'), 'wb') as f:
+            f.write(source.listing(page))
+    return len(source.pages), source.num_pages()
+
+
+def compare(pages, listings):
+    """Fields where book_parser disagrees with the BeautifulSoup parser"""
+    mismatches = []
+    for url, body in pages:
+        old, new = parse_book_html_bs4(body, url), parse_book_page(body, url)
+        for key in sorted(set(old) | set(new)):
+            if old.get(key) != new.get(key):
+                mismatches.append((url, key, old.get(key), new.get(key)))
+    for url, body in listings:
+        if parse_listing_html_bs4(body) != parse_listing_page(body):
+            mismatches.append((url, 'book_urls', None, None))
+    return mismatches
+
+
+def bench(parse, pages, rounds):
+    """Pages parsed per second over `rounds` passes of the corpus"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for url, body in pages:
+            parse(body, url)
+    return rounds * len(pages) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help='directory with pages/ and listings/')
+    parser.add_argument('--cache', help='benchmark on the detail pages of this page_cache.py cache')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--make-fixtures', action='store_true', help='(re)generate the fixture pages and exit')
+    parser.add_argument('--db', help='books table for --make-fixtures')
+    parser.add_argument('--json', help='scraper JSON dump for --make-fixtures')
+    args = parser.parse_args()
+
+    if args.make_fixtures:
+        if not args.db and not args.json:
+            parser.error('--make-fixtures needs --db and/or --json')
+        n_pages, n_listings = make_fixtures(args.fixtures, args.db, args.json)
+        print(f"✓ Đã tạo {n_pages} trang sách và {n_listings} trang danh mục trong {args.fixtures}")
+        return
+
+    if args.cache:
+        from page_cache import PageCache
+        cache = PageCache(args.cache)
+        pages = [(page.url, page.body) for page in cache.iter_pages('%/Sach/Detail/%')]
+        cache.close()
+        listings = []
+        corpus = f"trang thật từ {args.cache}"
+    else:
+        pages, listings = load_fixtures(args.fixtures)
+        corpus = "trang mẫu tổng hợp"
+        print(f"⚠️ Trang mẫu tổng hợp (stub_server.py) trong {args.fixtures}, không phải trang thật của thư viện")
+    if not pages:
+        parser.error('no pages to parse')
+
+    mismatches = compare(pages, listings)
+    for url, key, old, new in mismatches[:20]:
+        print(f"✗ {url} [{key}]: bs4={old!r} lxml={new!r}")
+    print(f"{'✓' if not mismatches else '⚠️'} {len(pages)} trang, {len(mismatches)} trường khác nhau")
+
+    old_rate = bench(parse_book_html_bs4, pages, args.rounds)
+    new_rate = bench(parse_book_page, pages, args.rounds)
+    print(f"📊 BeautifulSoup: {old_rate:,.0f} trang/s ({corpus})")
+    print(f"📊 book_parser:   {new_rate:,.0f} trang/s ({new_rate / old_rate:.1f}x, {corpus})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""Single-pass lxml parser for Duy Tan e-library pages.
+
+Shared by craw.py, craw_books.py, async_crawler.py, frontier.py and
+page_cache.py. The page text is extracted once. One regex then finds every
+"Label:" occurrence in a single scan, and each value is matched at its
+label's position. The old code ran one re.search over the whole text per
+label. Output matches the former BeautifulSoup implementation; bench_parser.py
+checks this and measures pages per second.
+"""
+import re
+from urllib.parse import urljoin
+
+import lxml.html
+
+BASE_URL = "https://elib.duytan.edu.vn"
+
+# Label on the page -> (book_info key, value pattern matched right after "Label:")
+LINE_VALUE = re.compile(r'\s*([^\n\r]+)')
+FIELDS = {
+    'Tác giả': ('author', LINE_VALUE),
+    'Nhà xuất bản': ('publisher', LINE_VALUE),
+    'Năm xuất bản': ('publication_year', re.compile(r'\s*(\d{4})')),
+    'Số trang': ('pages', LINE_VALUE),
+    'Kích thước': ('dimensions', LINE_VALUE),
+    'Số đăng ký cá biệt': ('registration_number', LINE_VALUE),
+    'ISBN': ('isbn', LINE_VALUE),
+    'Mã Dewey': ('dewey_code', LINE_VALUE),
+    'Đơn giá': ('price', LINE_VALUE),
+    'Vị trí lưu trữ': ('storage_location', LINE_VALUE),
+    'Ngôn ngữ': ('language', LINE_VALUE),
+    'Loại tài liệu': ('document_type', LINE_VALUE),
+    'Đang rỗi/ Tổng sách': ('availability', LINE_VALUE),
+    'Từ khóa': ('keywords', LINE_VALUE),
+    'Chủ đề': ('subject', LINE_VALUE),
+    'Chuyên ngành': ('department', LINE_VALUE),
+    'Tóm tắt': ('summary', re.compile(r'\s*(.*?)(?=\n\s*\n|\n\s*[A-Z]|$)', re.DOTALL)),
+}
+LABEL_RE = re.compile('(' + '|'.join(re.escape(label) for label in FIELDS) + '):')
+
+TITLE_AFTER_IMAGE = re.compile(r'\.jpg\s*\n\s*(.*?)(?=Tác giả:)', re.DOTALL)
+TITLE_IN_CONTENT = re.compile(r'jpg.*?\n\s*([^\n]+?)(?=\s*(?:Tác giả:|Nhà xuất bản:|Năm xuất bản:))', re.DOTALL)
+METADATA_PREFIXES = ('Tác giả:', 'Nhà xuất bản:', 'Năm xuất bản:', 'Số trang:', 'Kích thước:', 'ISBN:', 'Mã Dewey:',
+                     'Trở về', 'Hiển thị', 'CSDL')
+
+# Visible text only, like BeautifulSoup's get_text(): no script/style bodies, no comments
+_TEXT = './/text()[not(ancestor::script) and not(ancestor::style)]'
+_CONTENT_DIV = "//div[contains(concat(' ', normalize-space(@class), ' '), ' col-md-8 ')]"
+_TITLE_LI = "//li[contains(concat(' ', normalize-space(@class), ' '), ' title ')]"
+
+
+def parse_html(content):
+    """lxml document from raw bytes (UTF-8, as the site serves) or str"""
+    if isinstance(content, bytes):
+        try:
+            content = content.decode('utf-8')
+        except UnicodeDecodeError:
+            return lxml.html.document_fromstring(content)
+    try:
+        return lxml.html.document_fromstring(content)
+    except ValueError:
+        # str with an XML encoding declaration
+        return lxml.html.document_fromstring(content.encode('utf-8'))
+
+
+def text_of(element):
+    return ''.join(element.xpath(_TEXT))
+
+
+def extract_fields(page_text):
+    """All 'Label: value' pairs in one scan; the first occurrence of each label wins"""
+    fields = {}
+    for m in LABEL_RE.finditer(page_text):
+        key, pattern = FIELDS[m.group(1)]
+        if key in fields:
+            continue
+        value = pattern.match(page_text, m.end())
+        if value:
+            fields[key] = value.group(1)
+
+    info = {}
+    for label, (key, _) in FIELDS.items():
+        if key not in fields:
+            continue
+        value = fields[key].strip()
+        if key == 'publication_year':
+            value = int(value)
+        elif key == 'summary':
+            value = re.sub(r'\s+', ' ', value)
+            value = value.split('Bạn phải đăng nhập')[0].strip()
+            if not value:
+                continue
+        info[key] = value
+    return info
+
+
+def extract_title(root, page_text):
+    """Title element first, then the text between the cover image and the first metadata line"""
+    for li in root.xpath(_TITLE_LI):
+        title = text_of(li).strip()
+        if title:
+            return title
+
+    match = TITLE_AFTER_IMAGE.search(page_text)
+    if match:
+        for line in match.group(1).strip().split('\n'):
+            line = line.strip()
+            # Bỏ qua các dòng navigation và lấy content title
+            if (line and 5 < len(line) < 300 and
+                    not line.startswith(('Trở về', 'Hiển thị', 'CSDL', 'Sách')) and
+                    'Trang chủ' not in line and 'Marc' not in line and 'jpg' not in line):
+                return line
+
+    content_divs = root.xpath(_CONTENT_DIV)
+    if content_divs:
+        match = TITLE_IN_CONTENT.search(text_of(content_divs[0]))
+        if match:
+            candidate = re.sub(r'\s+', ' ', match.group(1).strip())
+            if (candidate and len(candidate) > 5 and 'Trang chủ' not in candidate and
+                    not candidate.startswith(('CSDL', 'Trở về'))):
+                return candidate
+
+        for element in content_divs[0].iterdescendants('p', 'div', 'span'):
+            text = text_of(element).strip()
+            if (text and 10 < len(text) < 200 and not text.startswith(METADATA_PREFIXES) and
+                    'Trang chủ' not in text and 'upload/sach_anh' not in text):
+                return text
+    return None
+
+
+def parse_book_page(content, book_url, base_url=BASE_URL):
+    """Parse a book detail page (raw HTML bytes or str) into a book_info dict"""
+    root = parse_html(content)
+    page_text = text_of(root)
+
+    book_info = {}
+    title = extract_title(root, page_text)
+    if title:
+        book_info['title'] = title
+    images = root.xpath("//img[contains(@src, 'sach_anh')]/@src")
+    if images:
+        book_info['cover_image'] = urljoin(base_url, images[0])
+    book_info.update(extract_fields(page_text))
+    book_info['url'] = book_url
+    return book_info
+
+
+def parse_listing_page(content, base_url=BASE_URL):
+    """Book detail URLs linked from a /Sach/Index listing page, in page order"""
+    book_urls = []
+    for href in parse_html(content).xpath('//a/@href'):
+        if re.search(r'/Sach/Detail/\d+', href):
+            book_url = urljoin(base_url, href)
+            if book_url not in book_urls:
+                book_urls.append(book_url)
+    return book_urls
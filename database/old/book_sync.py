@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Đồng bộ tăng dần bảng books: chỉ INSERT/UPDATE/DELETE những dòng thật sự đổi.
+
+Mỗi sách được nhận diện bằng sync_key (url, nếu không có thì số đăng ký cá
+biệt) và content_hash (sha1 của nội dung). Dòng có hash không đổi thì không
+bị ghi lại, nên lần cập nhật hằng đêm chỉ chạm tới phần chênh lệch và người
+đọc không bao giờ thấy bảng trống giữa chừng.
+"""
+import hashlib
+import json
+import math
+import re
+
+# Cột do sync quản lý, không lấy từ bản ghi
+SYNC_COLUMNS = ("sync_key", "content_hash")
+SKIP_COLUMNS = ("id", "scraped_at") + SYNC_COLUMNS
+MISSING = ("", "nan", "None")
+INTEGER_FLOAT = re.compile(r"-?\d+\.0+")
+# book_key() viết bằng SQL, để điền sync_key cho các dòng có sẵn; canonical()
+# được đăng ký trên kết nối trong ensure_sync_schema
+KEY_SQL = """CASE
+    WHEN canonical(url) != '' THEN canonical(url)
+    WHEN canonical(registration_number) != '' THEN 'reg:' || canonical(registration_number)
+END"""
+
+
+def canonical(value):
+    """Dạng chuẩn của một giá trị, không phụ thuộc cách pandas đoán kiểu.
+
+    Bỏ khoảng trắng hai đầu, "nan"/"None"/ô trống thành "", và số nguyên
+    bị đọc thành float trở lại số nguyên ("55513.0" thành "55513", 2001.0
+    thành 2001).
+    """
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if math.isnan(value):
+            return ""
+        return int(value) if value.is_integer() else value
+    if isinstance(value, int):
+        return value
+    value = str(value).strip()
+    if value in MISSING:
+        return ""
+    if INTEGER_FLOAT.fullmatch(value):
+        return value.split(".")[0]
+    return value
+
+
+def book_key(record):
+    """Khóa ổn định của một sách: url, nếu không có thì số đăng ký cá biệt."""
+    url = str(canonical(record.get("url")))
+    if url:
+        return url
+    reg = str(canonical(record.get("registration_number")))
+    if reg:
+        return f"reg:{reg}"
+    return None
+
+
+def content_hash(values):
+    values = [canonical(v) for v in values]
+    data = json.dumps(values, ensure_ascii=False, default=str, separators=(",", ":"))
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def data_columns(conn, table="books"):
+    """Các cột dữ liệu của bảng (bỏ id, scraped_at, cột sync và cột generated)."""
+    return [row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})")
+            if row[6] == 0 and row[1] not in SKIP_COLUMNS]
+
+
+def ensure_sync_schema(conn, table="books"):
+    """Thêm sync_key/content_hash và UNIQUE INDEX cần cho ON CONFLICT.
+
+    Dòng chưa có sync_key (bảng cũ, hoặc nạp lại toàn bộ bằng csv_to_db)
+    được điền khóa, và với những sách bị chèn trùng chỉ giữ bản mới nhất.
+    """
+    conn.create_function("canonical", 1, canonical, deterministic=True)
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for column in SYNC_COLUMNS:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT")
+    pending = conn.execute(
+        f"SELECT 1 FROM {table} WHERE sync_key IS NULL AND ({KEY_SQL}) IS NOT NULL LIMIT 1").fetchone()
+    if pending:
+        conn.execute(f"DROP INDEX IF EXISTS idx_{table}_sync_key")
+        conn.execute(f"UPDATE {table} SET sync_key = {KEY_SQL} WHERE sync_key IS NULL")
+        conn.execute(f"""
+            DELETE FROM {table} WHERE sync_key IS NOT NULL AND rowid NOT IN (
+                SELECT MAX(rowid) FROM {table} WHERE sync_key IS NOT NULL GROUP BY sync_key
+            )
+        """)
+    conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_sync_key ON {table}(sync_key)")
+
+
+def sync_books(conn, records, snapshot=False, table="books", batch_size=1000):
+    """Ghi `records` (iterable các dict) vào bảng bằng upsert theo sync_key.
+
+    Chạy trong transaction của người gọi; người gọi tự commit. Với
+    snapshot=True, `records` là toàn bộ danh mục nên sách không còn xuất
+    hiện sẽ bị xóa; mặc định (một lần crawl một phần) không xóa gì.
+
+    Trả về dict thống kê inserted/updated/unchanged/deleted/skipped và
+    changed_keys (các sync_key đã thêm, sửa hoặc xóa) để làm mất hiệu lực
+    cache phía sau một cách chính xác.
+    """
+    ensure_sync_schema(conn, table)
+    columns = data_columns(conn, table)
+    has_scraped_at = any(row[1] == "scraped_at" for row in conn.execute(f"PRAGMA table_info({table})"))
+    if snapshot:
+        known = dict(conn.execute(f"SELECT sync_key, content_hash FROM {table} WHERE sync_key IS NOT NULL"))
+    else:
+        # Chỉ tra các khóa sắp ghi, để đồng bộ từng cuốn vẫn nhanh khi bảng lớn
+        records = list(records)
+        keys = list({key for key in map(book_key, records) if key is not None})
+        known = {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            known.update(conn.execute(
+                f"SELECT sync_key, content_hash FROM {table} WHERE sync_key IN ({', '.join('?' * len(chunk))})",
+                chunk))
+
+    insert_cols = columns + list(SYNC_COLUMNS)
+    updates = [f"{c} = excluded.{c}" for c in columns + ["content_hash"]]
+    if has_scraped_at:
+        updates.append("scraped_at = CURRENT_TIMESTAMP")
+    upsert_sql = f"""
+        INSERT INTO {table} ({', '.join(insert_cols)}) VALUES ({', '.join('?' * len(insert_cols))})
+        ON CONFLICT(sync_key) DO UPDATE SET {', '.join(updates)}
+        WHERE {table}.content_hash IS NOT excluded.content_hash
+    """
+
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0, "skipped": 0}
+    changed_keys = []
+    seen = set()
+    batch = []
+    for record in records:
+        key = book_key(record)
+        if key is None:
+            stats["skipped"] += 1
+            continue
+        values = [record.get(c, 0 if c == "publication_year" else "") for c in columns]
+        digest = content_hash(values)
+        seen.add(key)
+        if key not in known:
+            stats["inserted"] += 1
+        elif known[key] != digest:
+            stats["updated"] += 1
+        else:
+            stats["unchanged"] += 1
+            continue
+        # Cùng một khóa xuất hiện hai lần trong nguồn: bản sau thắng
+        known[key] = digest
+        changed_keys.append(key)
+        batch.append(values + [key, digest])
+        if len(batch) >= batch_size:
+            conn.executemany(upsert_sql, batch)
+            batch = []
+    if batch:
+        conn.executemany(upsert_sql, batch)
+
+    if snapshot:
+        gone = [key for key in known if key not in seen]
+        for i in range(0, len(gone), 500):
+            chunk = gone[i:i + 500]
+            conn.execute(f"DELETE FROM {table} WHERE sync_key IN ({', '.join('?' * len(chunk))})", chunk)
+        stats["deleted"] = len(gone)
+        changed_keys.extend(gone)
+
+    stats["changed_keys"] = changed_keys
+    return stats
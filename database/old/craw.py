@@ -7,9 +7,67 @@ import re
 import random
 from urllib.parse import urljoin
 
+from book_parser import BASE_URL, parse_book_page, parse_listing_page
+from book_sync import sync_books
+from page_cache import PageCache
+
+
+def parse_book_html(content, book_url, base_url=BASE_URL):
+    """Parse a book detail page (raw HTML bytes or str) into a book_info dict
+
+    Module-level and free of network/session state so it can run in a worker
+    process (see async_crawler.py). The parsing itself lives in book_parser.py.
+    """
+    return parse_book_page(content, book_url, base_url)
+
+
+def listing_page_url(page, base_url=BASE_URL):
+    """URL format: /Sach/Index/0/0/0/[page_number]; page 1 is plain /Sach/Index"""
+    if page == 1:
+        return f"{base_url}/Sach/Index"
+    return f"{base_url}/Sach/Index/0/0/0/{page}"
+
+
+def parse_listing_html(content, base_url=BASE_URL):
+    """Book detail URLs linked from a /Sach/Index listing page, in page order"""
+    return parse_listing_page(content, base_url)
+
+
+def create_books_table(conn):
+    """Create the books table the scrapers write to, if it doesn't exist"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS books (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT,
+            author TEXT,
+            publisher TEXT,
+            publication_year INTEGER,
+            pages TEXT,
+            dimensions TEXT,
+            registration_number TEXT,
+            isbn TEXT,
+            dewey_code TEXT,
+            price TEXT,
+            storage_location TEXT,
+            language TEXT,
+            document_type TEXT,
+            availability TEXT,
+            keywords TEXT,
+            subject TEXT,
+            department TEXT,
+            summary TEXT,
+            cover_image TEXT,
+            url TEXT,
+            scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
 class DuyTanLibraryScraper:
-    def __init__(self):
-        self.base_url = "https://elib.duytan.edu.vn"
+    def __init__(self, cache_dir=None):
+        self.base_url = BASE_URL
+        # Raw detail pages are kept in a PageCache and revalidated with ETag/Last-Modified
+        self.cache = PageCache(cache_dir) if cache_dir else None
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
@@ -19,173 +77,15 @@ class DuyTanLibraryScraper:
         """Extract detailed information from a book page"""
         try:
             print(f"Đang trích xuất thông tin từ: {book_url}")
-            response = self.session.get(book_url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            book_info = {}
-            
-            # Extract all text content and parse structured information
-            page_text = soup.get_text()            # Extract book title - improved method
-            # Tìm text chính xác giữa ảnh và metadata đầu tiên
-            
-            # Method 1: Tìm bằng regex pattern sau ảnh và trước "Tác giả:"
-            pattern = r'\.jpg\s*\n\s*(.*?)(?=Tác giả:)'
-            title_match = re.search(pattern, page_text, re.DOTALL)
-            
-            if title_match:
-                potential_text = title_match.group(1).strip()
-                # Tách thành dòng và tìm dòng title thật
-                lines = potential_text.split('\n')
-                for line in lines:
-                    line = line.strip()
-                    # Bỏ qua các dòng navigation và lấy content title
-                    if (line and len(line) > 5 and len(line) < 300 and
-                        not line.startswith('Trở về') and
-                        not line.startswith('Hiển thị') and
-                        not line.startswith('CSDL') and
-                        not line.startswith('Sách') and
-                        'Trang chủ' not in line and
-                        'Marc' not in line and
-                        'jpg' not in line):
-                        # Đây có thể là title thật
-                        book_info['title'] = line
-                        break
-            
-            # Method 2: Nếu vẫn chưa có, thử tìm bằng cách khác
-            if 'title' not in book_info:
-                # Tìm trong HTML structure cụ thể
-                main_content = soup.find('div', class_='col-md-8')
-                if main_content:
-                    # Lấy text và tìm phần giữa ảnh và metadata
-                    content_text = main_content.get_text()
-                    
-                    # Pattern: sau "jpg" và trước các metadata fields
-                    alt_pattern = r'jpg.*?\n\s*([^\n]+?)(?=\s*(?:Tác giả:|Nhà xuất bản:|Năm xuất bản:))'
-                    alt_match = re.search(alt_pattern, content_text, re.DOTALL)
-                    
-                    if alt_match:
-                        title_candidate = alt_match.group(1).strip()
-                        # Clean title
-                        title_candidate = re.sub(r'\s+', ' ', title_candidate)
-                        
-                        if (title_candidate and len(title_candidate) > 5 and
-                            'Trang chủ' not in title_candidate and
-                            not title_candidate.startswith('CSDL') and
-                            not title_candidate.startswith('Trở về')):
-                            book_info['title'] = title_candidate
-            
-            # Method 3: Final fallback - scan for reasonable title
-            if 'title' not in book_info:
-                content_div = soup.find('div', class_='col-md-8')
-                if content_div:
-                    paragraphs = content_div.find_all(['p', 'div', 'span'])
-                    for p in paragraphs:
-                        text = p.get_text().strip()
-                        if (text and len(text) > 10 and len(text) < 200 and
-                            not text.startswith(('Tác giả:', 'Nhà xuất bản:', 'Năm xuất bản:', 
-                                              'Số trang:', 'Kích thước:', 'ISBN:', 'Mã Dewey:',
-                                              'Trở về', 'Hiển thị', 'CSDL')) and
-                            'Trang chủ' not in text and
-                            'upload/sach_anh' not in text):
-                            book_info['title'] = text
-                            break
-            
-            # Extract book cover image
-            img_element = soup.find('img', src=re.compile(r'sach_anh'))
-            if img_element:
-                book_info['cover_image'] = urljoin(self.base_url, img_element['src'])
-            
-            # Extract author - Tác giả
-            author_match = re.search(r'Tác giả:\s*([^\n\r]+)', page_text)
-            if author_match:
-                book_info['author'] = author_match.group(1).strip()
-            
-            # Extract publisher - Nhà xuất bản
-            publisher_match = re.search(r'Nhà xuất bản:\s*([^\n\r]+)', page_text)
-            if publisher_match:
-                book_info['publisher'] = publisher_match.group(1).strip()
-            
-            # Extract publication year - Năm xuất bản
-            year_match = re.search(r'Năm xuất bản:\s*(\d{4})', page_text)
-            if year_match:
-                book_info['publication_year'] = int(year_match.group(1))
-            
-            # Extract number of pages - Số trang
-            pages_match = re.search(r'Số trang:\s*([^\n\r]+)', page_text)
-            if pages_match:
-                book_info['pages'] = pages_match.group(1).strip()
-            
-            # Extract dimensions - Kích thước
-            dimensions_match = re.search(r'Kích thước:\s*([^\n\r]+)', page_text)
-            if dimensions_match:
-                book_info['dimensions'] = dimensions_match.group(1).strip()
-            
-            # Extract registration number - Số đăng ký cá biệt
-            reg_number_match = re.search(r'Số đăng ký cá biệt:\s*([^\n\r]+)', page_text)
-            if reg_number_match:
-                book_info['registration_number'] = reg_number_match.group(1).strip()
-            
-            # Extract ISBN
-            isbn_match = re.search(r'ISBN:\s*([^\n\r]+)', page_text)
-            if isbn_match:
-                book_info['isbn'] = isbn_match.group(1).strip()
-            
-            # Extract Dewey code - Mã Dewey
-            dewey_match = re.search(r'Mã Dewey:\s*([^\n\r]+)', page_text)
-            if dewey_match:
-                book_info['dewey_code'] = dewey_match.group(1).strip()
-            
-            # Extract price - Đơn giá
-            price_match = re.search(r'Đơn giá:\s*([^\n\r]+)', page_text)
-            if price_match:
-                book_info['price'] = price_match.group(1).strip()
-            
-            # Extract storage location - Vị trí lưu trữ
-            location_match = re.search(r'Vị trí lưu trữ:\s*([^\n\r]+)', page_text)
-            if location_match:
-                book_info['storage_location'] = location_match.group(1).strip()
-            
-            # Extract language - Ngôn ngữ
-            language_match = re.search(r'Ngôn ngữ:\s*([^\n\r]+)', page_text)
-            if language_match:
-                book_info['language'] = language_match.group(1).strip()
-            
-            # Extract document type - Loại tài liệu
-            doc_type_match = re.search(r'Loại tài liệu:\s*([^\n\r]+)', page_text)
-            if doc_type_match:
-                book_info['document_type'] = doc_type_match.group(1).strip()
-            
-            # Extract availability - Đang rỗi/ Tổng sách
-            availability_match = re.search(r'Đang rỗi/ Tổng sách:\s*([^\n\r]+)', page_text)
-            if availability_match:
-                book_info['availability'] = availability_match.group(1).strip()
-            
-            # Extract keywords - Từ khóa
-            keywords_match = re.search(r'Từ khóa:\s*([^\n\r]+)', page_text)
-            if keywords_match:
-                book_info['keywords'] = keywords_match.group(1).strip()
-            
-            # Extract subject - Chủ đề
-            subject_match = re.search(r'Chủ đề:\s*([^\n\r]+)', page_text)
-            if subject_match:
-                book_info['subject'] = subject_match.group(1).strip()
-            
-            # Extract department - Chuyên ngành
-            department_match = re.search(r'Chuyên ngành:\s*([^\n\r]+)', page_text)
-            if department_match:
-                book_info['department'] = department_match.group(1).strip()
-              # Extract summary - Tóm tắt
-            summary_match = re.search(r'Tóm tắt:\s*(.*?)(?=\n\s*\n|\n\s*[A-Z]|$)', page_text, re.DOTALL)
-            if summary_match:
-                summary = summary_match.group(1).strip()
-                summary = re.sub(r'\s+', ' ', summary)
-                summary = summary.split('Bạn phải đăng nhập')[0].strip()
-                if summary:
-                    book_info['summary'] = summary
-            
-            # Add URL for reference
-            book_info['url'] = book_url
+            if self.cache is not None:
+                content, status = self.cache.fetch(self.session, book_url)
+                if status == 'not_modified':
+                    print("↺ Trang không đổi, dùng bản trong cache")
+            else:
+                response = self.session.get(book_url)
+                response.raise_for_status()
+                content = response.content
+            book_info = parse_book_html(content, book_url, self.base_url)
             
             print(f"✓ Đã trích xuất thành công: {book_info.get('title', 'Không có tiêu đề')}")
             return book_info
@@ -200,70 +100,55 @@ class DuyTanLibraryScraper:
             json.dump(books_data, f, ensure_ascii=False, indent=2)
         print(f"✓ Đã lưu {len(books_data)} sách vào {file_path}")
     
-    def save_to_sqlite(self, books_data, db_path="duytan_books.db"):
-        """Save book data to SQLite database"""
+    def save_to_sqlite(self, books_data, db_path="duytan_books.db", incremental=True):
+        """Save book data to SQLite database
+
+        By default books are upserted by url/registration number (see
+        book_sync.py), so crawling the same book again updates it instead of
+        adding a duplicate row. incremental=False appends like before.
+        """
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
         
         # Create table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS books (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT,
-                author TEXT,
-                publisher TEXT,
-                publication_year INTEGER,
-                pages TEXT,
-                dimensions TEXT,
-                registration_number TEXT,
-                isbn TEXT,
-                dewey_code TEXT,
-                price TEXT,
-                storage_location TEXT,
-                language TEXT,
-                document_type TEXT,
-                availability TEXT,
-                keywords TEXT,
-                subject TEXT,
-                department TEXT,
-                summary TEXT,
-                cover_image TEXT,
-                url TEXT,
-                scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        create_books_table(conn)
         
-        # Insert data
-        for book in books_data:
-            cursor.execute('''
-                INSERT INTO books (
-                    title, author, publisher, publication_year, pages, dimensions,
-                    registration_number, isbn, dewey_code, price, storage_location,
-                    language, document_type, availability, keywords, subject,
-                    department, summary, cover_image, url
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                book.get('title', ''),
-                book.get('author', ''),
-                book.get('publisher', ''),
-                book.get('publication_year', 0),
-                book.get('pages', ''),
-                book.get('dimensions', ''),
-                book.get('registration_number', ''),
-                book.get('isbn', ''),
-                book.get('dewey_code', ''),
-                book.get('price', ''),
-                book.get('storage_location', ''),
-                book.get('language', ''),
-                book.get('document_type', ''),
-                book.get('availability', ''),
-                book.get('keywords', ''),
-                book.get('subject', ''),
-                book.get('department', ''),
-                book.get('summary', ''),
-                book.get('cover_image', ''),
-                book.get('url', '')
-            ))
+        if incremental:
+            stats = sync_books(conn, books_data)
+            print(f"🔄 Thêm {stats['inserted']} - cập nhật {stats['updated']} - "
+                  f"không đổi {stats['unchanged']} sách")
+        else:
+            # Insert data
+            for book in books_data:
+                cursor.execute('''
+                    INSERT INTO books (
+                        title, author, publisher, publication_year, pages, dimensions,
+                        registration_number, isbn, dewey_code, price, storage_location,
+                        language, document_type, availability, keywords, subject,
+                        department, summary, cover_image, url
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    book.get('title', ''),
+                    book.get('author', ''),
+                    book.get('publisher', ''),
+                    book.get('publication_year', 0),
+                    book.get('pages', ''),
+                    book.get('dimensions', ''),
+                    book.get('registration_number', ''),
+                    book.get('isbn', ''),
+                    book.get('dewey_code', ''),
+                    book.get('price', ''),
+                    book.get('storage_location', ''),
+                    book.get('language', ''),
+                    book.get('document_type', ''),
+                    book.get('availability', ''),
+                    book.get('keywords', ''),
+                    book.get('subject', ''),
+                    book.get('department', ''),
+                    book.get('summary', ''),
+                    book.get('cover_image', ''),
+                    book.get('url', '')
+                ))
         
         conn.commit()
         conn.close()
@@ -284,11 +169,7 @@ class DuyTanLibraryScraper:
             try:
                 print(f"📖 Đang lấy trang ngẫu nhiên {random_page}... (Đã tìm được {len(book_urls)}/{num_books} sách)")
                 
-                # URL format: /Sach/Index/0/0/0/[page_number]
-                if random_page == 1:
-                    page_url = f"{self.base_url}/Sach/Index"
-                else:
-                    page_url = f"{self.base_url}/Sach/Index/0/0/0/{random_page}"
+                page_url = listing_page_url(random_page, self.base_url)
                 
                 response = self.session.get(page_url)
                 response.raise_for_status()
@@ -469,4 +350,4 @@ if __name__ == "__main__":
         else:
             print("\n❌ Có lỗi xảy ra trong quá trình craw.")
     else:
-        print("❌ Lựa chọn không hợp lệ. Vui lòng chọn 1 hoặc 2.")
\ No newline at end of file
+        print("❌ Lựa chọn không hợp lệ. Vui lòng chọn 1 hoặc 2.")
\ No newline at end of file
@@ -7,6 +7,9 @@ import re
 import random
 from urllib.parse import urljoin
 
+from book_parser import parse_book_page
+from book_sync import sync_books
+
 class DuyTanLibraryScraper:
     def __init__(self):
         self.base_url = "https://elib.duytan.edu.vn"
@@ -21,112 +24,7 @@ class DuyTanLibraryScraper:
             print(f"Đang trích xuất thông tin từ: {book_url}")
             response = self.session.get(book_url)
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            book_info = {}
-              # Extract book title - Simple method using HTML structure
-            title_element = soup.find('li', class_='title')
-            if title_element:
-                book_info['title'] = title_element.get_text().strip()
-            
-            # Extract all text content for other metadata parsing
-            page_text = soup.get_text()
-            
-            # Extract book cover image
-            img_element = soup.find('img', src=re.compile(r'sach_anh'))
-            if img_element:
-                book_info['cover_image'] = urljoin(self.base_url, img_element['src'])
-            
-            # Extract author - Tác giả
-            author_match = re.search(r'Tác giả:\s*([^\n\r]+)', page_text)
-            if author_match:
-                book_info['author'] = author_match.group(1).strip()
-            
-            # Extract publisher - Nhà xuất bản
-            publisher_match = re.search(r'Nhà xuất bản:\s*([^\n\r]+)', page_text)
-            if publisher_match:
-                book_info['publisher'] = publisher_match.group(1).strip()
-            
-            # Extract publication year - Năm xuất bản
-            year_match = re.search(r'Năm xuất bản:\s*(\d{4})', page_text)
-            if year_match:
-                book_info['publication_year'] = int(year_match.group(1))
-            
-            # Extract number of pages - Số trang
-            pages_match = re.search(r'Số trang:\s*([^\n\r]+)', page_text)
-            if pages_match:
-                book_info['pages'] = pages_match.group(1).strip()
-            
-            # Extract dimensions - Kích thước
-            dimensions_match = re.search(r'Kích thước:\s*([^\n\r]+)', page_text)
-            if dimensions_match:
-                book_info['dimensions'] = dimensions_match.group(1).strip()
-            
-            # Extract registration number - Số đăng ký cá biệt
-            reg_number_match = re.search(r'Số đăng ký cá biệt:\s*([^\n\r]+)', page_text)
-            if reg_number_match:
-                book_info['registration_number'] = reg_number_match.group(1).strip()
-            
-            # Extract ISBN
-            isbn_match = re.search(r'ISBN:\s*([^\n\r]+)', page_text)
-            if isbn_match:
-                book_info['isbn'] = isbn_match.group(1).strip()
-            
-            # Extract Dewey code - Mã Dewey
-            dewey_match = re.search(r'Mã Dewey:\s*([^\n\r]+)', page_text)
-            if dewey_match:
-                book_info['dewey_code'] = dewey_match.group(1).strip()
-            
-            # Extract price - Đơn giá
-            price_match = re.search(r'Đơn giá:\s*([^\n\r]+)', page_text)
-            if price_match:
-                book_info['price'] = price_match.group(1).strip()
-            
-            # Extract storage location - Vị trí lưu trữ
-            location_match = re.search(r'Vị trí lưu trữ:\s*([^\n\r]+)', page_text)
-            if location_match:
-                book_info['storage_location'] = location_match.group(1).strip()
-            
-            # Extract language - Ngôn ngữ
-            language_match = re.search(r'Ngôn ngữ:\s*([^\n\r]+)', page_text)
-            if language_match:
-                book_info['language'] = language_match.group(1).strip()
-            
-            # Extract document type - Loại tài liệu
-            doc_type_match = re.search(r'Loại tài liệu:\s*([^\n\r]+)', page_text)
-            if doc_type_match:
-                book_info['document_type'] = doc_type_match.group(1).strip()
-            
-            # Extract availability - Đang rỗi/ Tổng sách
-            availability_match = re.search(r'Đang rỗi/ Tổng sách:\s*([^\n\r]+)', page_text)
-            if availability_match:
-                book_info['availability'] = availability_match.group(1).strip()
-            
-            # Extract keywords - Từ khóa
-            keywords_match = re.search(r'Từ khóa:\s*([^\n\r]+)', page_text)
-            if keywords_match:
-                book_info['keywords'] = keywords_match.group(1).strip()
-            
-            # Extract subject - Chủ đề
-            subject_match = re.search(r'Chủ đề:\s*([^\n\r]+)', page_text)
-            if subject_match:
-                book_info['subject'] = subject_match.group(1).strip()
-            
-            # Extract department - Chuyên ngành
-            department_match = re.search(r'Chuyên ngành:\s*([^\n\r]+)', page_text)
-            if department_match:
-                book_info['department'] = department_match.group(1).strip()
-              # Extract summary - Tóm tắt
-            summary_match = re.search(r'Tóm tắt:\s*(.*?)(?=\n\s*\n|\n\s*[A-Z]|$)', page_text, re.DOTALL)
-            if summary_match:
-                summary = summary_match.group(1).strip()
-                summary = re.sub(r'\s+', ' ', summary)
-                summary = summary.split('Bạn phải đăng nhập')[0].strip()
-                if summary:
-                    book_info['summary'] = summary
-            
-            # Add URL for reference
-            book_info['url'] = book_url
+            book_info = parse_book_page(response.content, book_url, self.base_url)
             
             print(f"✓ Đã trích xuất thành công: {book_info.get('title', 'Không có tiêu đề')}")
             return book_info
@@ -211,8 +109,13 @@ class DuyTanLibraryScraper:
             json.dump(books_data, f, ensure_ascii=False, indent=2)
         print(f"✓ Đã lưu {len(books_data)} sách vào {file_path}")
     
-    def save_to_sqlite(self, books_data, db_path="duytan_books.db"):
-        """Save book data to SQLite database"""
+    def save_to_sqlite(self, books_data, db_path="duytan_books.db", incremental=True):
+        """Save book data to SQLite database
+
+        By default books are upserted by url/registration number (see
+        book_sync.py), so crawling the same book again updates it instead of
+        adding a duplicate row. incremental=False appends like before.
+        """
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
         
@@ -244,37 +147,42 @@ class DuyTanLibraryScraper:
             )
         ''')
         
-        # Insert data
-        for book in books_data:
-            cursor.execute('''
-                INSERT INTO books (
-                    title, author, publisher, publication_year, pages, dimensions,
-                    registration_number, isbn, dewey_code, price, storage_location,
-                    language, document_type, availability, keywords, subject,
-                    department, summary, cover_image, url
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                book.get('title', ''),
-                book.get('author', ''),
-                book.get('publisher', ''),
-                book.get('publication_year', 0),
-                book.get('pages', ''),
-                book.get('dimensions', ''),
-                book.get('registration_number', ''),
-                book.get('isbn', ''),
-                book.get('dewey_code', ''),
-                book.get('price', ''),
-                book.get('storage_location', ''),
-                book.get('language', ''),
-                book.get('document_type', ''),
-                book.get('availability', ''),
-                book.get('keywords', ''),
-                book.get('subject', ''),
-                book.get('department', ''),
-                book.get('summary', ''),
-                book.get('cover_image', ''),
-                book.get('url', '')
-            ))
+        if incremental:
+            stats = sync_books(conn, books_data)
+            print(f"🔄 Thêm {stats['inserted']} - cập nhật {stats['updated']} - "
+                  f"không đổi {stats['unchanged']} sách")
+        else:
+            # Insert data
+            for book in books_data:
+                cursor.execute('''
+                    INSERT INTO books (
+                        title, author, publisher, publication_year, pages, dimensions,
+                        registration_number, isbn, dewey_code, price, storage_location,
+                        language, document_type, availability, keywords, subject,
+                        department, summary, cover_image, url
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    book.get('title', ''),
+                    book.get('author', ''),
+                    book.get('publisher', ''),
+                    book.get('publication_year', 0),
+                    book.get('pages', ''),
+                    book.get('dimensions', ''),
+                    book.get('registration_number', ''),
+                    book.get('isbn', ''),
+                    book.get('dewey_code', ''),
+                    book.get('price', ''),
+                    book.get('storage_location', ''),
+                    book.get('language', ''),
+                    book.get('document_type', ''),
+                    book.get('availability', ''),
+                    book.get('keywords', ''),
+                    book.get('subject', ''),
+                    book.get('department', ''),
+                    book.get('summary', ''),
+                    book.get('cover_image', ''),
+                    book.get('url', '')
+                ))
         
         conn.commit()
         conn.close()
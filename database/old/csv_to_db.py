@@ -6,6 +6,8 @@ import pandas as pd
 import os
 from datetime import datetime
 
+from book_sync import sync_books
+
 class CSVToDatabase:
     def __init__(self, db_path="duytan_books.db"):
         self.db_path = db_path
@@ -46,8 +48,56 @@ class CSVToDatabase:
         conn.close()
         print(f"✓ Đã tạo bảng books trong {self.db_path}")
     
-    def csv_to_db(self, csv_path):
-        """Chuyển dữ liệu từ CSV sang SQLite database"""
+    # Cột được ghi vào bảng books, theo đúng thứ tự của câu INSERT
+    COLUMNS = [
+        'title', 'author', 'publisher', 'publication_year', 'pages', 'dimensions',
+        'registration_number', 'isbn', 'dewey_code', 'price', 'storage_location',
+        'language', 'document_type', 'availability', 'keywords', 'subject',
+        'department', 'summary', 'cover_image', 'url'
+    ]
+
+    @staticmethod
+    def _read_chunks(csv_path, chunksize):
+        """Đọc CSV theo chunk, mọi ô đều là chuỗi nguyên văn.
+
+        Để pandas tự đoán kiểu thì mỗi chunk đoán riêng: cột có ô trống trong
+        chunk này thành float ("55513.0", "nan") còn chunk khác vẫn là
+        "55513", nên giá trị ghi vào phụ thuộc chỗ cắt chunk.
+        """
+        return pd.read_csv(csv_path, encoding='utf-8', chunksize=chunksize,
+                           dtype=str, keep_default_na=False)
+
+    def _chunk_rows(self, chunk):
+        """Chuyển một chunk DataFrame thành list tuple để executemany"""
+        values = {}
+        for col in self.COLUMNS:
+            if col == 'publication_year':
+                continue
+            if col in chunk.columns:
+                values[col] = chunk[col].tolist()
+            else:
+                values[col] = [''] * len(chunk)
+
+        # Xử lý publication_year - chuyển thành integer, lỗi hoặc trống thì là 0
+        if 'publication_year' in chunk.columns:
+            years = pd.to_numeric(chunk['publication_year'], errors='coerce')
+            years = years.where(years.abs() < 10 ** 6).fillna(0).astype('int64')
+            values['publication_year'] = years.tolist()
+        else:
+            values['publication_year'] = [0] * len(chunk)
+
+        return list(zip(*(values[col] for col in self.COLUMNS)))
+
+    def csv_to_db(self, csv_path, chunksize=10000, progress_callback=None, incremental=False):
+        """Chuyển dữ liệu từ CSV sang SQLite database
+
+        CSV được đọc theo từng chunk `chunksize` dòng và ghi bằng executemany
+        trong một transaction duy nhất, nên người đọc database không bao giờ
+        thấy bảng books trống giữa chừng. `progress_callback(số dòng đã xử lý)`
+        được gọi sau mỗi chunk. Với incremental=True, CSV được coi là bản
+        chụp toàn bộ danh mục và đồng bộ bằng book_sync.sync_books thay vì
+        xóa rồi chèn lại: chỉ những sách thêm/sửa/xóa mới bị ghi.
+        """
         
         # Kiểm tra file CSV có tồn tại không
         if not os.path.exists(csv_path):
@@ -55,87 +105,92 @@ class CSVToDatabase:
             return False
         
         try:
-            # Đọc file CSV
             print(f"📖 Đang đọc file CSV: {csv_path}")
-            df = pd.read_csv(csv_path, encoding='utf-8')
-            
-            print(f"✓ Đã đọc {len(df)} dòng dữ liệu từ CSV")
-            print(f"✓ Các cột trong CSV: {list(df.columns)}")
             
             # Tạo bảng database
             self.create_books_table()
             
-            # Kết nối database
-            conn = sqlite3.connect(self.db_path)
+            # Kết nối database; tự quản lý transaction
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
             cursor = conn.cursor()
+            # WAL để người đọc vẫn thấy dữ liệu cũ trong lúc nạp; tắt fsync cho kết nối nạp này
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=OFF')
+            cursor.execute('PRAGMA temp_store=MEMORY')
             
-            # Xóa dữ liệu cũ nếu có
-            cursor.execute('DELETE FROM books')
-            print("✓ Đã xóa dữ liệu cũ trong database")
+            insert_sql = f'''
+                INSERT INTO books ({', '.join(self.COLUMNS)})
+                VALUES ({', '.join('?' * len(self.COLUMNS))})
+            '''
             
-            # Chèn dữ liệu mới
             success_count = 0
             error_count = 0
+            processed = 0
+            columns = None
             
-            for index, row in df.iterrows():
-                try:
-                    # Xử lý publication_year - chuyển thành integer
-                    pub_year = row.get('publication_year', 0)
-                    if pd.isna(pub_year) or pub_year == '':
-                        pub_year = 0
-                    else:
-                        try:
-                            pub_year = int(float(pub_year))
-                        except (ValueError, TypeError):
-                            pub_year = 0
-                    
-                    # Chèn dữ liệu
-                    cursor.execute('''
-                        INSERT INTO books (
-                            title, author, publisher, publication_year, pages, dimensions,
-                            registration_number, isbn, dewey_code, price, storage_location,
-                            language, document_type, availability, keywords, subject,
-                            department, summary, cover_image, url
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        str(row.get('title', '')),
-                        str(row.get('author', '')),
-                        str(row.get('publisher', '')),
-                        pub_year,
-                        str(row.get('pages', '')),
-                        str(row.get('dimensions', '')),
-                        str(row.get('registration_number', '')),
-                        str(row.get('isbn', '')),
-                        str(row.get('dewey_code', '')),
-                        str(row.get('price', '')),
-                        str(row.get('storage_location', '')),
-                        str(row.get('language', '')),
-                        str(row.get('document_type', '')),
-                        str(row.get('availability', '')),
-                        str(row.get('keywords', '')),
-                        str(row.get('subject', '')),
-                        str(row.get('department', '')),
-                        str(row.get('summary', '')),
-                        str(row.get('cover_image', '')),
-                        str(row.get('url', ''))
-                    ))
-                    success_count += 1
+            sync_stats = None
+            
+            def incremental_records():
+                nonlocal processed, columns
+                for chunk in self._read_chunks(csv_path, chunksize):
+                    if columns is None:
+                        columns = list(chunk.columns)
+                    for row in self._chunk_rows(chunk):
+                        yield dict(zip(self.COLUMNS, row))
+                    processed += len(chunk)
+                    if progress_callback is not None:
+                        progress_callback(processed)
+            
+            cursor.execute('BEGIN')
+            try:
+                if incremental:
+                    sync_stats = sync_books(conn, incremental_records(), snapshot=True)
+                    success_count = processed - sync_stats['skipped']
+                    error_count = sync_stats['skipped']
+                else:
+                    # Xóa dữ liệu cũ nếu có
+                    cursor.execute('DELETE FROM books')
                     
-                    # Hiển thị tiến độ
-                    if (index + 1) % 10 == 0 or index + 1 == len(df):
-                        print(f"⏳ Đã xử lý {index + 1}/{len(df)} dòng...")
-                        
-                except Exception as e:
-                    error_count += 1
-                    print(f"⚠️ Lỗi tại dòng {index + 1}: {str(e)}")
-            
-            # Lưu thay đổi
-            conn.commit()
-            conn.close()
+                    for chunk in self._read_chunks(csv_path, chunksize):
+                        if columns is None:
+                            columns = list(chunk.columns)
+                        rows = self._chunk_rows(chunk)
+                        # Savepoint cho mỗi chunk: nếu executemany lỗi giữa chừng thì
+                        # hủy các dòng đã chèn của chunk trước khi chèn lại từng dòng
+                        cursor.execute('SAVEPOINT chunk')
+                        try:
+                            cursor.executemany(insert_sql, rows)
+                            cursor.execute('RELEASE chunk')
+                            success_count += len(rows)
+                        except sqlite3.Error:
+                            cursor.execute('ROLLBACK TO chunk')
+                            cursor.execute('RELEASE chunk')
+                            # Chèn lại từng dòng để chỉ bỏ qua những dòng lỗi
+                            for offset, row in enumerate(rows):
+                                try:
+                                    cursor.execute(insert_sql, row)
+                                    success_count += 1
+                                except sqlite3.Error as e:
+                                    error_count += 1
+                                    print(f"⚠️ Lỗi tại dòng {processed + offset + 1}: {str(e)}")
+                        processed += len(rows)
+                        if progress_callback is not None:
+                            progress_callback(processed)
+                
+                cursor.execute('COMMIT')
+            except Exception:
+                cursor.execute('ROLLBACK')
+                raise
+            finally:
+                conn.close()
             
+            print(f"✓ Các cột trong CSV: {columns or []}")
             print(f"\n🎉 Hoàn thành chuyển đổi!")
             print(f"✓ Thành công: {success_count} dòng")
             print(f"❌ Lỗi: {error_count} dòng")
+            if sync_stats is not None:
+                print(f"🔄 Thêm {sync_stats['inserted']} - sửa {sync_stats['updated']} - "
+                      f"giữ nguyên {sync_stats['unchanged']} - xóa {sync_stats['deleted']} sách")
             print(f"💾 Dữ liệu đã được lưu vào: {self.db_path}")
             
             return True
@@ -237,7 +292,10 @@ def main():
     print(f"\n🚀 Bắt đầu chuyển đổi file: {selected_file}")
     
     # Thực hiện chuyển đổi
-    success = converter.csv_to_db(selected_file)
+    success = converter.csv_to_db(
+        selected_file,
+        progress_callback=lambda n: print(f"⏳ Đã xử lý {n} dòng...")
+    )
     
     if success:
         # Hiển thị thống kê
@@ -0,0 +1,228 @@
+"""Resumable, sequential crawl of the whole catalogue with an on-disk frontier.
+
+    python frontier.py --db duytan_books.db
+    python frontier.py --db duytan_books.db --max-pages 50 --delay 1.5
+    python frontier.py --db duytan_books.db --refresh      # re-check crawled pages
+
+Listing pages /Sach/Index/0/0/0/{page} are enumerated in order, starting at
+page 1, until a page has no book links. A listing page that still fails
+after --max-attempts is skipped with a warning and the next one is queued;
+two failed listing pages in a row stop the crawl with an error naming
+them. Every URL lives in the crawl_frontier
+table (state, attempts, last_fetched, etag) in the same database as books,
+and each parsed book is upserted and marked done in one transaction. Killing
+the process loses at most the page being fetched; the next run continues
+from the first pending URL.
+"""
+import argparse
+import sqlite3
+import time
+
+import requests
+
+from book_sync import sync_books
+from craw import BASE_URL, create_books_table, listing_page_url, parse_book_html, parse_listing_html
+
+PENDING, DONE, FAILED = 'pending', 'done', 'failed'
+LISTING, BOOK = 'listing', 'book'
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CrawlFrontier:
+    """URL queue persisted in SQLite: one row per listing or book page"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS crawl_frontier (
+                url TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                page INTEGER,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_fetched TIMESTAMP,
+                etag TEXT,
+                last_modified TEXT,
+                error TEXT
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_crawl_frontier_state ON crawl_frontier(state, kind)')
+        conn.commit()
+
+    def add(self, url, kind, page=None):
+        self.conn.execute('INSERT OR IGNORE INTO crawl_frontier (url, kind, page) VALUES (?, ?, ?)',
+                          (url, kind, page))
+
+    def next(self):
+        """Next pending URL: books already discovered come before the next listing page"""
+        return self.conn.execute(f'''
+            SELECT url, kind, page, attempts, etag, last_modified FROM crawl_frontier
+            WHERE state = '{PENDING}'
+            ORDER BY kind = '{LISTING}', rowid
+            LIMIT 1
+        ''').fetchone()
+
+    def mark_done(self, url, etag=None, last_modified=None):
+        self.conn.execute(f'''
+            UPDATE crawl_frontier
+            SET state = '{DONE}', attempts = attempts + 1, last_fetched = CURRENT_TIMESTAMP,
+                etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified), error = NULL
+            WHERE url = ?
+        ''', (etag, last_modified, url))
+
+    def mark_error(self, url, error, max_attempts, retry=True):
+        """Count a failed attempt; the URL stays pending until it runs out of attempts"""
+        self.conn.execute(f'''
+            UPDATE crawl_frontier
+            SET attempts = attempts + 1, last_fetched = CURRENT_TIMESTAMP, error = ?,
+                state = CASE WHEN ? AND attempts + 1 < ? THEN '{PENDING}' ELSE '{FAILED}' END
+            WHERE url = ?
+        ''', (error, retry, max_attempts, url))
+
+    def state(self, url):
+        row = self.conn.execute('SELECT state FROM crawl_frontier WHERE url = ?', (url,)).fetchone()
+        return row[0] if row else None
+
+    def refresh(self):
+        """Queue every finished URL again; known pages are revalidated with If-None-Match"""
+        self.conn.execute(f"UPDATE crawl_frontier SET state = '{PENDING}', attempts = 0 "
+                          f"WHERE state != '{PENDING}'")
+        self.conn.commit()
+
+    def counts(self):
+        return dict(((kind, state), n) for kind, state, n in self.conn.execute(
+            'SELECT kind, state, COUNT(*) FROM crawl_frontier GROUP BY kind, state'))
+
+
+class FrontierCrawler:
+    def __init__(self, db_path, base_url=BASE_URL, delay=1.0, max_attempts=3, max_pages=None, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.delay = delay
+        self.max_attempts = max_attempts
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        create_books_table(self.conn)
+        self.frontier = CrawlFrontier(self.conn)
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        })
+
+    def seed(self, start_page=1):
+        self.frontier.add(listing_page_url(start_page, self.base_url), LISTING, start_page)
+        self.conn.commit()
+
+    def fetch(self, url, etag=None, last_modified=None):
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return self.session.get(url, headers=headers, timeout=self.timeout)
+
+    def process(self, url, kind, page, etag, last_modified):
+        """Fetch and handle one URL; returns a short status string for the log"""
+        try:
+            response = self.fetch(url, etag, last_modified)
+        except requests.RequestException as e:
+            self.frontier.mark_error(url, str(e), self.max_attempts)
+            return f"lỗi mạng: {e}"
+
+        if response.status_code == 304:
+            self.frontier.mark_done(url)
+            return "không đổi (304)"
+        if kind == LISTING and response.status_code == 404:
+            # Past the last listing page
+            self.frontier.mark_done(url)
+            return "hết danh mục"
+        if response.status_code != 200:
+            retry = response.status_code in RETRY_STATUSES
+            self.frontier.mark_error(url, f"HTTP {response.status_code}", self.max_attempts, retry)
+            return f"HTTP {response.status_code}"
+
+        new_etag = response.headers.get('ETag')
+        new_last_modified = response.headers.get('Last-Modified')
+        if kind == LISTING:
+            book_urls = parse_listing_html(response.content, self.base_url)
+            for book_url in book_urls:
+                self.frontier.add(book_url, BOOK)
+            if book_urls and (self.max_pages is None or page < self.max_pages):
+                self.frontier.add(listing_page_url(page + 1, self.base_url), LISTING, page + 1)
+            self.frontier.mark_done(url, new_etag, new_last_modified)
+            return f"{len(book_urls)} sách"
+
+        try:
+            book_info = parse_book_html(response.content, url, self.base_url)
+        except Exception as e:
+            self.frontier.mark_error(url, f"parse: {e}", self.max_attempts, retry=False)
+            return f"lỗi phân tích: {e}"
+        stats = sync_books(self.conn, [book_info])
+        self.frontier.mark_done(url, new_etag, new_last_modified)
+        action = 'thêm' if stats['inserted'] else 'cập nhật' if stats['updated'] else 'không đổi'
+        return f"{action}: {book_info.get('title', 'Không có tiêu đề')}"
+
+    def run(self, max_urls=None):
+        """Crawl until the frontier is empty (or `max_urls` URLs were processed)"""
+        processed = 0
+        while max_urls is None or processed < max_urls:
+            item = self.frontier.next()
+            if item is None:
+                break
+            url, kind, page, attempts, etag, last_modified = item
+            status = self.process(url, kind, page, etag, last_modified)
+            # The book row and its frontier state are committed together
+            self.conn.commit()
+            processed += 1
+            label = f"trang {page}" if kind == LISTING else "sách"
+            print(f"{'📖' if kind == LISTING else '📚'} [{processed}] {label} {url} - {status}")
+            if kind == LISTING and self.frontier.state(url) == FAILED:
+                self.skip_listing(url, page)
+            if self.delay:
+                time.sleep(self.delay)
+        return processed
+
+    def skip_listing(self, url, page):
+        """Queue the page after a listing page that ran out of attempts, unless the one before failed too"""
+        previous = listing_page_url(page - 1, self.base_url)
+        if page > 1 and self.frontier.state(previous) == FAILED:
+            raise RuntimeError(f"Trang danh mục {page - 1} và {page} đều lỗi sau {self.max_attempts} lần thử "
+                               f"({previous}, {url}); dừng thu thập")
+        print(f"⚠️ Bỏ qua trang danh mục {page} ({url}) sau {self.max_attempts} lần thử")
+        if self.max_pages is None or page < self.max_pages:
+            self.frontier.add(listing_page_url(page + 1, self.base_url), LISTING, page + 1)
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='duytan_books.db', help='database for books and the crawl frontier')
+    parser.add_argument('--base-url', default=BASE_URL)
+    parser.add_argument('--start-page', type=int, default=1)
+    parser.add_argument('--max-pages', type=int, help='stop enumerating after this listing page')
+    parser.add_argument('--max-urls', type=int, help='stop after this many requests (resume later)')
+    parser.add_argument('--delay', type=float, default=1.0, help='seconds between requests')
+    parser.add_argument('--max-attempts', type=int, default=3)
+    parser.add_argument('--refresh', action='store_true', help='queue every crawled page again')
+    args = parser.parse_args()
+
+    crawler = FrontierCrawler(args.db, args.base_url, delay=args.delay, max_attempts=args.max_attempts,
+                              max_pages=args.max_pages)
+    try:
+        crawler.seed(args.start_page)
+        if args.refresh:
+            crawler.frontier.refresh()
+        processed = crawler.run(args.max_urls)
+        print(f"\n🎉 Đã xử lý {processed} URL")
+        for (kind, state), n in sorted(crawler.frontier.counts().items()):
+            print(f"   - {kind} {state}: {n}")
+    finally:
+        crawler.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""Content-addressed, gzip-compressed cache of raw HTML pages.
+
+    python page_cache.py stats --cache page_cache
+    python page_cache.py reparse --cache page_cache --db duytan_books.db
+
+Each body is stored once under objects/<sha256[:2]>/<sha256>.gz. index.db
+maps every URL to its current body plus the ETag/Last-Modified validators.
+fetch() revalidates with If-None-Match/If-Modified-Since, so unchanged pages
+cost a 304 instead of a download. `reparse` runs craw.parse_book_html over
+every cached detail page without touching the network, so a parser fix only
+needs an offline re-parse.
+"""
+import argparse
+import gzip
+import hashlib
+import os
+import sqlite3
+import time
+from collections import namedtuple
+
+CachedPage = namedtuple('CachedPage', ['url', 'body', 'sha256', 'etag', 'last_modified', 'fetched_at'])
+
+
+class PageCache:
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(root, 'index.db'), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL,
+                validated_at REAL
+            )
+        ''')
+        self.conn.commit()
+        self.stats = {'new': 0, 'changed': 0, 'unchanged': 0, 'not_modified': 0}
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], f'{digest}.gz')
+
+    def _write_object(self, body):
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f'{path}.{os.getpid()}.tmp'
+            with gzip.open(tmp, 'wb', compresslevel=6) as f:
+                f.write(body)
+            os.replace(tmp, path)
+        return digest
+
+    def read_object(self, digest):
+        with gzip.open(self._object_path(digest), 'rb') as f:
+            return f.read()
+
+    def get(self, url):
+        row = self.conn.execute('SELECT sha256, etag, last_modified, fetched_at FROM pages WHERE url = ?',
+                                (url,)).fetchone()
+        if row is None:
+            return None
+        digest, etag, last_modified, fetched_at = row
+        return CachedPage(url, self.read_object(digest), digest, etag, last_modified, fetched_at)
+
+    def put(self, url, body, etag=None, last_modified=None):
+        """Store `body` for `url`; returns 'new', 'changed' or 'unchanged'"""
+        digest = self._write_object(body)
+        old = self.conn.execute('SELECT sha256 FROM pages WHERE url = ?', (url,)).fetchone()
+        now = time.time()
+        self.conn.execute('''
+            INSERT INTO pages (url, sha256, etag, last_modified, fetched_at, validated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET sha256 = excluded.sha256, etag = excluded.etag,
+                last_modified = excluded.last_modified, fetched_at = excluded.fetched_at,
+                validated_at = excluded.validated_at
+        ''', (url, digest, etag, last_modified, now, now))
+        self.conn.commit()
+        status = 'new' if old is None else 'unchanged' if old[0] == digest else 'changed'
+        self.stats[status] += 1
+        return status
+
+    def fetch(self, session, url, timeout=30):
+        """GET `url` through the cache with a conditional request.
+
+        Returns (body, status) where status is 'not_modified' (304, body
+        from the cache), 'new', 'changed' or 'unchanged'. HTTP errors are
+        raised like response.raise_for_status().
+        """
+        cached = self.get(url)
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers['If-None-Match'] = cached.etag
+            if cached.last_modified:
+                headers['If-Modified-Since'] = cached.last_modified
+        response = session.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and cached is not None:
+            self.conn.execute('UPDATE pages SET validated_at = ? WHERE url = ?', (time.time(), url))
+            self.conn.commit()
+            self.stats['not_modified'] += 1
+            return cached.body, 'not_modified'
+        response.raise_for_status()
+        status = self.put(url, response.content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return response.content, status
+
+    def urls(self, like=None):
+        if like:
+            return [u for (u,) in self.conn.execute('SELECT url FROM pages WHERE url LIKE ? ORDER BY url', (like,))]
+        return [u for (u,) in self.conn.execute('SELECT url FROM pages ORDER BY url')]
+
+    def iter_pages(self, like=None):
+        for url in self.urls(like):
+            page = self.get(url)
+            if page is not None:
+                yield page
+
+    def summary(self):
+        pages, objects = self.conn.execute('SELECT COUNT(*), COUNT(DISTINCT sha256) FROM pages').fetchone()
+        size = 0
+        for dirpath, _, files in os.walk(os.path.join(self.root, 'objects')):
+            size += sum(os.path.getsize(os.path.join(dirpath, f)) for f in files)
+        return {'pages': pages, 'objects': objects, 'compressed_mb': size / 2 ** 20}
+
+    def close(self):
+        self.conn.close()
+
+
+def reparse(cache, db_path, base_url=None, batch_size=1000):
+    """Re-run the book parser over every cached detail page and upsert the results"""
+    # Imported here because craw.py imports this module
+    from craw import BASE_URL, DuyTanLibraryScraper, parse_book_html
+
+    scraper = DuyTanLibraryScraper()
+    books, count, errors = [], 0, 0
+    for page in cache.iter_pages('%/Sach/Detail/%'):
+        try:
+            books.append(parse_book_html(page.body, page.url, base_url or BASE_URL))
+        except Exception as e:
+            errors += 1
+            print(f"✗ Lỗi khi phân tích {page.url}: {str(e)}")
+        if len(books) >= batch_size:
+            scraper.save_to_sqlite(books, db_path)
+            count += len(books)
+            books = []
+    if books:
+        scraper.save_to_sqlite(books, db_path)
+        count += len(books)
+    return count, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['stats', 'reparse'])
+    parser.add_argument('--cache', default='page_cache', help='cache directory')
+    parser.add_argument('--db', default='duytan_books.db', help='books database for reparse')
+    args = parser.parse_args()
+
+    cache = PageCache(args.cache)
+    try:
+        if args.command == 'stats':
+            s = cache.summary()
+            print(f"📦 {args.cache}: {s['pages']} trang, {s['objects']} bản nội dung, {s['compressed_mb']:.1f} MB nén")
+        else:
+            start = time.perf_counter()
+            count, errors = reparse(cache, args.db)
+            print(f"🎉 Đã phân tích lại {count} trang từ cache ({errors} lỗi) trong {time.perf_counter() - start:.1f}s")
+    finally:
+        cache.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""Local stand-in for elib.duytan.edu.vn, for testing the crawlers offline.
+
+    python stub_server.py --db ../data_fix.db --port 8765
+    python stub_server.py --pages-dir saved_pages --latency-ms 200 --error-rate 0.1
+
+Serves /Sach/Index and /Sach/Index/0/0/0/<page> listing pages and
+/Sach/Detail/<id> book pages. Book pages come from --pages-dir (saved HTML
+named <id>.html) or are rendered from the rows of a books table (--db).
+Responses carry an ETag and honour If-None-Match. --latency-ms and
+--error-rate (random 503s with Retry-After) exercise the crawler's
+concurrency and retry logic.
+"""
+import argparse
+import hashlib
+import html
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PER_PAGE = 20
+# Labels in the order they appear on a detail page
+LABELS = [
+    ('author', 'Tác giả'), ('publisher', 'Nhà xuất bản'), ('publication_year', 'Năm xuất bản'),
+    ('pages', 'Số trang'), ('dimensions', 'Kích thước'), ('registration_number', 'Số đăng ký cá biệt'),
+    ('isbn', 'ISBN'), ('dewey_code', 'Mã Dewey'), ('price', 'Đơn giá'), ('storage_location', 'Vị trí lưu trữ'),
+    ('language', 'Ngôn ngữ'), ('document_type', 'Loại tài liệu'), ('availability', 'Đang rỗi/ Tổng sách'),
+    ('keywords', 'Từ khóa'), ('subject', 'Chủ đề'), ('department', 'Chuyên ngành'),
+]
+
+
+def render_book_page(book_id, book):
+    """Detail page laid out like the real site: cover, title, then one 'Label: value' line per field"""
+    esc = lambda v: html.escape(str(v))
+    fields = "\n".join(
+        f'<div class="info"><b>{label}:</b> {esc(book[key])}</div>'
+        for key, label in LABELS if book.get(key) not in (None, '')
+    )
+    summary = ''
+    if book.get('summary'):
+        summary = f'<div class="summary"><b>Tóm tắt:</b> {esc(book["summary"])}</div>\n'
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>CSDL SÁCH - Thư viện Duy Tân</title></head>
+<body>
+<div class="nav"><a href="/">Trang chủ</a> / <a href="/Sach/Index">CSDL SÁCH</a></div>
+<div class="row">
+<div class="col-md-4">
+<img src="/upload/sach_anh/{book_id}.jpg" alt="cover">
+</div>
+<div class="col-md-8">
+<a class="cover" href="/upload/sach_anh/{book_id}.jpg">upload/sach_anh/{book_id}.jpg</a>
+<ul class="info"><li class="title">{esc(book.get('title', ''))}</li></ul>
+{fields}
+{summary}<p>Bạn phải đăng nhập để mượn sách.</p>
+<a href="/Sach/Index">Trở về</a>
+</div>
+</div>
+</body></html>
+"""
+
+
+def render_listing_page(book_ids, page, num_pages):
+    links = "\n".join(f'<li><a href="/Sach/Detail/{i}">Sách {i}</a></li>' for i in book_ids)
+    next_link = f'<a class="next" href="/Sach/Index/0/0/0/{page + 1}">Trang sau</a>' if page < num_pages else ''
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>CSDL SÁCH</title></head>
+<body><ul class="books">
+{links}
+</ul>
+<div class="pager">Trang {page}/{num_pages} {next_link}</div>
+</body></html>
+"""
+
+
+class BookSource:
+    """Book pages keyed by id, either saved HTML files or rows of a books table"""
+
+    def __init__(self, db_path=None, pages_dir=None):
+        self.pages = {}
+        if pages_dir:
+            for name in os.listdir(pages_dir):
+                m = re.fullmatch(r'(\d+)\.html?', name)
+                if m:
+                    with open(os.path.join(pages_dir, name), 'rb') as f:
+                        self.pages[int(m.group(1))] = f.read()
+        if db_path:
+            conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+            conn.row_factory = sqlite3.Row
+            for row in conn.execute('SELECT rowid AS _rowid, * FROM books'):
+                book = dict(row)
+                match = re.search(r'/Sach/Detail/(\d+)', book.get('url') or '')
+                book_id = int(match.group(1)) if match else book['_rowid']
+                self.pages.setdefault(book_id, render_book_page(book_id, book).encode('utf-8'))
+            conn.close()
+        # Newest first, like the real listing
+        self.ids = sorted(self.pages, reverse=True)
+
+    def num_pages(self):
+        return max(1, -(-len(self.ids) // PER_PAGE))
+
+    def listing(self, page):
+        if not 1 <= page <= self.num_pages():
+            return None
+        ids = self.ids[(page - 1) * PER_PAGE:page * PER_PAGE]
+        return render_listing_page(ids, page, self.num_pages()).encode('utf-8')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    source = None
+    latency = 0.0
+    error_rate = 0.0
+    requests = 0
+    _lock = threading.Lock()
+
+    def do_GET(self):
+        with self._lock:
+            StubHandler.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_rate and random.random() < self.error_rate:
+            self.send_response(503)
+            self.send_header('Retry-After', '1')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = None
+        path = self.path.split('?')[0].rstrip('/')
+        if path == '/Sach/Index':
+            body = self.source.listing(1)
+        elif m := re.fullmatch(r'/Sach/Index/0/0/0/(\d+)', path):
+            body = self.source.listing(int(m.group(1)))
+        elif m := re.fullmatch(r'/Sach/Detail/(\d+)', path):
+            body = self.source.pages.get(int(m.group(1)))
+        if body is None:
+            self.send_error(404)
+            return
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(source, host='127.0.0.1', port=8765, latency_ms=0, error_rate=0.0):
+    """Start the server in a background thread; returns the server (call shutdown() to stop)"""
+    handler = type('Handler', (StubHandler,), {
+        'source': source, 'latency': latency_ms / 1000, 'error_rate': error_rate,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', help='render book pages from this books table')
+    parser.add_argument('--pages-dir', help='directory of saved detail pages named <id>.html')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    args = parser.parse_args()
+    if not args.db and not args.pages_dir:
+        parser.error('need --db or --pages-dir')
+
+    source = BookSource(args.db, args.pages_dir)
+    server = serve(source, args.host, args.port, args.latency_ms, args.error_rate)
+    print(f"🌐 Stub server: http://{args.host}:{args.port} - {len(source.ids)} sách, {source.num_pages()} trang")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# Các script trong database/old import lẫn nhau như module cấp cao nhất
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def stub_site():
+    """stub_server.py trên một cổng trống, với ba sách mẫu; trả về (base_url, source)"""
+    from stub_server import BookSource, render_book_page, serve
+
+    source = BookSource()
+    for book_id in (101, 102, 103):
+        source.pages[book_id] = render_book_page(book_id, {
+            'title': f'Sách {book_id}', 'author': 'Nguyễn Văn A', 'registration_number': f'R{book_id}',
+        }).encode('utf-8')
+    source.ids = sorted(source.pages, reverse=True)
+    server = serve(source, port=0)
+    yield f"http://127.0.0.1:{server.server_address[1]}", source
+    server.shutdown()
+    server.server_close()
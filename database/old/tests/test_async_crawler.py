@@ -0,0 +1,67 @@
+import asyncio
+import random
+import time
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from async_crawler import AsyncBookCrawler, TokenBucket
+from stub_server import render_book_page, serve
+
+
+def test_token_bucket_spaces_requests_after_the_burst():
+    async def take(bucket, n):
+        start = time.monotonic()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # The first `burst` tokens are free, then one every 1/rate seconds
+    assert asyncio.run(take(TokenBucket(rate=20, burst=5), 5)) < 0.04
+    assert asyncio.run(take(TokenBucket(rate=20, burst=1), 5)) >= 0.18
+
+
+def test_backoff_is_capped_and_honours_retry_after():
+    crawler = AsyncBookCrawler(backoff_base=1.0, backoff_max=4.0)
+    for attempt in range(8):
+        assert 0 <= crawler._backoff(attempt) <= min(4.0, 2 ** attempt)
+    assert crawler._backoff(0, retry_after=3.0) >= 3.0
+
+
+def test_failing_server_gives_up_after_max_retries(stub_site):
+    base_url, source = stub_site
+    server = serve(source, port=0, error_rate=1.0)
+    try:
+        crawler = AsyncBookCrawler(f"http://127.0.0.1:{server.server_address[1]}", rate=1000, burst=10,
+                                   max_retries=3, backoff_base=0.001, backoff_max=0.01)
+        assert crawler.run([1]) == []
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert crawler.stats == {"requests": 4, "retries": 3, "failed": 1, "parsed": 0}
+
+
+def test_crawl_retries_through_503s(stub_site):
+    base_url, source = stub_site
+    # 25 books over two listing pages; page 2 repeats five books from page 1
+    for book_id in range(200, 222):
+        source.pages[book_id] = render_book_page(book_id, {"title": f"Sách {book_id}"}).encode("utf-8")
+    unique = sorted(source.pages, reverse=True)
+    source.ids = unique + unique[:5]
+    random.seed(7)
+    server = serve(source, port=0, error_rate=0.3)
+    try:
+        crawler = AsyncBookCrawler(f"http://127.0.0.1:{server.server_address[1]}", concurrency=4, rate=1000,
+                                   burst=10, max_retries=20, backoff_base=0.001, backoff_max=0.01, parse_workers=2)
+        urls = asyncio.run(crawler.crawl_listing([1, 2]))
+        books = asyncio.run(crawler.crawl_books(urls))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert urls == [f"http://127.0.0.1:{server.server_address[1]}/Sach/Detail/{i}" for i in unique]
+    assert sorted(b["title"] for b in books) == sorted(f"Sách {i}" for i in unique)
+    assert crawler.stats["failed"] == 0
+    assert crawler.stats["retries"] > 0
+    assert crawler.stats["requests"] == 2 + len(unique) + crawler.stats["retries"]
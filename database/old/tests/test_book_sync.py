@@ -0,0 +1,131 @@
+import csv
+import sqlite3
+
+import pytest
+
+from book_sync import book_key, content_hash, sync_books
+from craw import create_books_table
+from csv_to_db import CSVToDatabase
+
+
+def book(n, **fields):
+    record = {"title": f"Sách {n}", "author": "Nguyễn Văn A", "publication_year": 2000 + n,
+              "url": f"https://elib.duytan.edu.vn/Sach/Detail/{n}"}
+    record.update(fields)
+    return record
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    create_books_table(conn)
+    yield conn
+    conn.close()
+
+
+def rows(conn):
+    return conn.execute("SELECT sync_key, title, publication_year FROM books ORDER BY sync_key").fetchall()
+
+
+def test_book_key_prefers_url_then_registration_number():
+    assert book_key({"url": " https://x/1 ", "registration_number": "R1"}) == "https://x/1"
+    assert book_key({"url": "nan", "registration_number": "R1"}) == "reg:R1"
+    assert book_key({"url": "", "registration_number": None}) is None
+
+
+def test_values_are_canonicalised_before_keying_and_hashing():
+    assert book_key({"url": None, "registration_number": " 55513.0 "}) == "reg:55513"
+    assert book_key({"url": float("nan"), "registration_number": 55513.0}) == "reg:55513"
+    assert content_hash(["55513.0", "nan", "None", 2001.0]) == content_hash(["55513", "", None, 2001])
+    assert content_hash(["55513.5"]) != content_hash(["55513"])
+
+
+def test_content_hash_is_stable_and_order_sensitive():
+    assert content_hash(["a", 1, None]) == content_hash(["a", 1, None])
+    assert content_hash(["a", 1, None]) != content_hash(["a", 2, None])
+    assert content_hash(["Kiến trúc", ""]) != content_hash(["", "Kiến trúc"])
+
+
+def test_insert_then_unchanged_rows_are_not_rewritten(conn):
+    stats = sync_books(conn, [book(1), book(2)])
+    assert (stats["inserted"], stats["updated"], stats["unchanged"]) == (2, 0, 0)
+    conn.execute("UPDATE books SET scraped_at = '2000-01-01'")
+
+    stats = sync_books(conn, [book(1), book(2)])
+    assert (stats["inserted"], stats["updated"], stats["unchanged"]) == (0, 0, 2)
+    assert stats["changed_keys"] == []
+    # Dòng không đổi thì không bị ghi lại
+    assert conn.execute("SELECT COUNT(*) FROM books WHERE scraped_at = '2000-01-01'").fetchone()[0] == 2
+
+
+def test_changed_record_is_updated_in_place(conn):
+    sync_books(conn, [book(1), book(2)])
+    rowid = conn.execute("SELECT id FROM books WHERE title = 'Sách 1'").fetchone()[0]
+
+    stats = sync_books(conn, [book(1, title="Sách 1 (tái bản)"), book(2)])
+    assert (stats["inserted"], stats["updated"], stats["unchanged"]) == (0, 1, 1)
+    assert stats["changed_keys"] == [book(1)["url"]]
+    assert conn.execute("SELECT id FROM books WHERE title = 'Sách 1 (tái bản)'").fetchone()[0] == rowid
+    assert conn.execute("SELECT COUNT(*) FROM books").fetchone()[0] == 2
+
+
+def test_partial_sync_keeps_missing_books_and_snapshot_deletes_them(conn):
+    sync_books(conn, [book(1), book(2), book(3)])
+
+    stats = sync_books(conn, [book(1)])
+    assert stats["deleted"] == 0
+    assert len(rows(conn)) == 3
+
+    stats = sync_books(conn, [book(1), book(3)], snapshot=True)
+    assert stats["deleted"] == 1
+    assert stats["changed_keys"] == [book(2)["url"]]
+    assert [r[1] for r in rows(conn)] == ["Sách 1", "Sách 3"]
+
+
+def test_records_without_key_are_skipped(conn):
+    stats = sync_books(conn, [book(1, url=""), book(2)])
+    assert stats["skipped"] == 1
+    assert stats["inserted"] == 1
+
+
+def test_duplicate_key_in_source_last_one_wins(conn):
+    stats = sync_books(conn, [book(1), book(1, title="Sách 1 mới")])
+    assert conn.execute("SELECT title FROM books").fetchall() == [("Sách 1 mới",)]
+    assert stats["inserted"] == 1
+
+
+def test_existing_rows_get_keys_and_duplicates_are_collapsed(conn):
+    # Bảng nạp bằng csv_to_db: chưa có sync_key, một sách bị chèn hai lần
+    conn.executemany("INSERT INTO books (title, url, registration_number) VALUES (?, ?, ?)", [
+        ("Bản cũ", book(1)["url"], None),
+        ("Bản mới", book(1)["url"], None),
+        ("Không có url", "", "R42"),
+    ])
+    stats = sync_books(conn, [book(1)])
+    assert stats["updated"] == 1
+    assert conn.execute("SELECT title, sync_key FROM books ORDER BY id").fetchall() == [
+        ("Sách 1", book(1)["url"]),
+        ("Không có url", "reg:R42"),
+    ]
+
+
+def test_reimporting_csv_with_other_chunksize_changes_nothing(tmp_path):
+    # Ô trống rải rác: trước đây pandas đoán kiểu theo từng chunk
+    csv_path = tmp_path / "books.csv"
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["title", "registration_number", "publication_year", "price", "url"])
+        for n in range(7):
+            writer.writerow([f"Sách {n}", "" if n == 3 else 55510 + n, "" if n == 5 else 2000 + n,
+                             "" if n % 2 else 120000, "" if n in (1, 4) else f"https://x/{n}"])
+    converter = CSVToDatabase(str(tmp_path / "books.db"))
+    assert converter.csv_to_db(str(csv_path), chunksize=2, incremental=True)
+
+    conn = sqlite3.connect(converter.db_path)
+    records = [dict(zip(converter.COLUMNS, row))
+               for chunk in converter._read_chunks(str(csv_path), 3)
+               for row in converter._chunk_rows(chunk)]
+    stats = sync_books(conn, records, snapshot=True)
+    conn.close()
+    assert (stats["inserted"], stats["updated"], stats["deleted"]) == (0, 0, 0)
+    assert stats["unchanged"] == 7
@@ -0,0 +1,67 @@
+import sqlite3
+
+from craw import listing_page_url
+from frontier import BOOK, DONE, LISTING, PENDING, CrawlFrontier, FrontierCrawler
+
+
+def open_frontier(path):
+    conn = sqlite3.connect(path)
+    return conn, CrawlFrontier(conn)
+
+
+def test_reopened_frontier_skips_done_and_requeues_in_flight(tmp_path):
+    path = str(tmp_path / "crawl.db")
+    conn, frontier = open_frontier(path)
+    for n in range(1, 5):
+        frontier.add(f"https://x/Sach/Detail/{n}", BOOK)
+    conn.commit()
+    for _ in range(2):
+        url = frontier.next()[0]
+        frontier.mark_done(url)
+        conn.commit()
+    # Đang xử lý dở khi tiến trình bị dừng: đã đánh dấu nhưng chưa commit
+    in_flight = frontier.next()[0]
+    frontier.mark_done(in_flight)
+    conn.close()
+
+    conn, frontier = open_frontier(path)
+    assert frontier.state("https://x/Sach/Detail/1") == DONE
+    assert frontier.state("https://x/Sach/Detail/2") == DONE
+    assert frontier.state(in_flight) == PENDING
+    handed_out = []
+    while (item := frontier.next()) is not None:
+        handed_out.append(item[0])
+        frontier.mark_done(item[0])
+        conn.commit()
+    conn.close()
+    assert handed_out == [in_flight, "https://x/Sach/Detail/4"]
+
+
+def test_crawl_resumes_without_refetching(tmp_path, stub_site):
+    base_url, _ = stub_site
+    path = str(tmp_path / "crawl.db")
+    fetched = []
+
+    def start():
+        crawler = FrontierCrawler(path, base_url=base_url, delay=0)
+        fetch = crawler.fetch
+        crawler.fetch = lambda url, *args: fetched.append(url) or fetch(url, *args)
+        return crawler
+
+    crawler = start()
+    crawler.seed()
+    # Trang danh mục 1 và sách đầu tiên, rồi dừng
+    assert crawler.run(max_urls=2) == 2
+    crawler.close()
+
+    crawler = start()
+    crawler.seed()
+    crawler.run()
+    counts = crawler.frontier.counts()
+    books = crawler.conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+    crawler.close()
+
+    assert len(fetched) == len(set(fetched))
+    assert listing_page_url(1, base_url) in fetched
+    assert counts == {(BOOK, DONE): 3, (LISTING, DONE): 2}
+    assert books == 3
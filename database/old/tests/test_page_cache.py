@@ -0,0 +1,44 @@
+import gzip
+import hashlib
+import os
+
+import requests
+
+from page_cache import PageCache
+
+
+def test_etag_revalidation_and_changed_body(tmp_path, stub_site):
+    base_url, source = stub_site
+    url = f"{base_url}/Sach/Detail/101"
+    cache = PageCache(str(tmp_path / "cache"))
+    session = requests.Session()
+    sent = []
+    session.hooks["response"].append(lambda r, *args, **kwargs: sent.append(r.request.headers))
+
+    body, status = cache.fetch(session, url)
+    assert status == "new"
+    assert "If-None-Match" not in sent[0]
+    page = cache.get(url)
+    assert page.sha256 == hashlib.sha256(body).hexdigest()
+    assert page.etag
+    path = cache._object_path(page.sha256)
+    assert path.endswith(".gz")
+    with gzip.open(path, "rb") as f:
+        assert f.read() == body
+
+    again, status = cache.fetch(session, url)
+    assert status == "not_modified"
+    assert again == body
+    assert sent[-1]["If-None-Match"] == page.etag
+
+    source.pages[101] = body.replace("Sách 101".encode("utf-8"), "Sách 101 (tái bản)".encode("utf-8"))
+    changed, status = cache.fetch(session, url)
+    assert status == "changed"
+    assert changed == source.pages[101]
+    new_page = cache.get(url)
+    assert new_page.sha256 == hashlib.sha256(changed).hexdigest() != page.sha256
+    assert new_page.etag != page.etag
+    assert new_page.body == changed
+    assert os.path.exists(cache._object_path(new_page.sha256))
+    assert cache.stats == {"new": 1, "changed": 1, "unchanged": 0, "not_modified": 1}
+    cache.close()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# fts.py và migrate_books.py import nhau như module cấp cao nhất
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,69 @@
+import sqlite3
+
+import pytest
+
+from fts import FTS_TABLE, create_fts, drop_fts, has_fts, match_expression, search_books
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE books (id INTEGER PRIMARY KEY, title TEXT, author TEXT, keywords TEXT, "
+                  "subject TEXT, summary TEXT)")
+    conn.execute("INSERT INTO books (title, author) VALUES ('Đường lối cách mạng Việt Nam', 'Đỗ Mười')")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def titles(conn, text, **kwargs):
+    columns, rows = search_books(conn, text, **kwargs)
+    return [row[columns.index("title")] for row in rows]
+
+
+def test_existing_rows_are_indexed_and_d_is_folded(conn):
+    create_fts(conn)
+    assert has_fts(conn)
+    assert titles(conn, "duong loi") == ["Đường lối cách mạng Việt Nam"]
+    assert titles(conn, "Đường") == ["Đường lối cách mạng Việt Nam"]
+    assert titles(conn, "do muoi", columns=["author"]) == ["Đường lối cách mạng Việt Nam"]
+    assert titles(conn, "do muoi", columns=["title"]) == []
+
+
+def test_triggers_keep_the_index_in_sync(conn):
+    create_fts(conn)
+    conn.execute("INSERT INTO books (title, summary) VALUES ('Kiến trúc nhà ở', 'Thiết kế ĐÔ THỊ')")
+    assert titles(conn, "kien truc") == ["Kiến trúc nhà ở"]
+    assert titles(conn, "do thi") == ["Kiến trúc nhà ở"]
+
+    conn.execute("UPDATE books SET title = 'Đường sắt đô thị' WHERE title = 'Kiến trúc nhà ở'")
+    assert titles(conn, "kien truc") == []
+    assert titles(conn, "duong sat") == ["Đường sắt đô thị"]
+
+    conn.execute("DELETE FROM books WHERE title = 'Đường sắt đô thị'")
+    assert titles(conn, "duong sat") == []
+    assert titles(conn, "duong") == ["Đường lối cách mạng Việt Nam"]
+    assert conn.execute(f"SELECT COUNT(*) FROM {FTS_TABLE}_docsize").fetchone()[0] == 1
+
+
+def test_prefix_and_title_weighting(conn):
+    conn.execute("INSERT INTO books (title, summary) VALUES ('Giáo trình kinh tế', 'Đường lối phát triển')")
+    create_fts(conn)
+    assert titles(conn, "duong l", prefix=True) == ["Đường lối cách mạng Việt Nam", "Giáo trình kinh tế"]
+
+
+def test_match_expression_quotes_every_word():
+    # Chỉ đổi đ->d; dấu còn lại do tokenizer remove_diacritics bỏ
+    assert match_expression("đường AND near") == '"dường" "and" "near"'
+    assert match_expression("Kiến trúc", columns=["title"], prefix=True) == '{title} : ("kiến" "trúc"*)'
+    assert match_expression("?!") is None
+
+
+def test_drop_and_rebuild(conn):
+    create_fts(conn)
+    drop_fts(conn)
+    assert not has_fts(conn)
+    # Không còn trigger: ghi vào books vẫn chạy
+    conn.execute("INSERT INTO books (title) VALUES ('Đạo đức học')")
+    create_fts(conn, rebuild=True)
+    assert titles(conn, "dao duc") == ["Đạo đức học"]
@@ -0,0 +1,81 @@
+import sqlite3
+
+import pytest
+
+from fts import create_fts, has_fts, search_books
+from migrate_books import DERIVED_COLUMNS, INDEXED_COLUMNS, migrate
+
+# Giống bảng books trong data_fix.db: id không phải khóa chính, mọi thứ là TEXT
+SCHEMA = """CREATE TABLE books (
+    "id" INTEGER, "title" TEXT, "author" TEXT, "publisher" TEXT, "publication_year" INTEGER, "pages" TEXT,
+    "price" TEXT, "availability" TEXT, "keywords" TEXT, "subject" TEXT, "department" TEXT, "summary" TEXT
+)"""
+ROWS = [
+    # id, title, pages, price, availability
+    (7, "Kiến trúc nhà ở", "352 tr.", "450.000", "2/5"),
+    (3, "Đường lối cách mạng", "", "1", "0/1"),
+    (12, "Giáo trình kinh tế", "0 tr.", "85,000", ""),
+]
+
+
+def make_db(rows=ROWS):
+    conn = sqlite3.connect(":memory:")
+    conn.execute(SCHEMA)
+    conn.executemany("INSERT INTO books (id, title, pages, price, availability) VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    return conn
+
+
+def test_ids_and_rows_are_kept():
+    conn = make_db()
+    assert migrate(conn) == 3
+    assert conn.execute("SELECT id, title FROM books ORDER BY id").fetchall() == [
+        (3, "Đường lối cách mạng"), (7, "Kiến trúc nhà ở"), (12, "Giáo trình kinh tế")]
+    # id giờ là INTEGER PRIMARY KEY, tức là rowid
+    assert conn.execute("SELECT COUNT(*) FROM books WHERE id = rowid").fetchone()[0] == 3
+    conn.close()
+
+
+def test_duplicate_ids_are_renumbered():
+    conn = make_db(ROWS + [(7, "Trùng id", "", "", "")])
+    assert migrate(conn) == 4
+    assert [r[0] for r in conn.execute("SELECT id FROM books ORDER BY id")] == [1, 2, 3, 4]
+    conn.close()
+
+
+def test_derived_columns():
+    conn = make_db()
+    migrate(conn)
+    rows = conn.execute(f"SELECT title, {', '.join(DERIVED_COLUMNS)} FROM books ORDER BY id").fetchall()
+    assert rows == [
+        # price_vnd, page_count, available, total; giá "1" chỉ là giá trị giữ chỗ
+        ("Đường lối cách mạng", None, None, 0, 1),
+        ("Kiến trúc nhà ở", 450000, 352, 2, 5),
+        ("Giáo trình kinh tế", 85000, None, None, None),
+    ]
+    # Cột generated theo kịp các lần ghi sau này
+    conn.execute("UPDATE books SET availability = '1/5', price = '500000' WHERE id = 7")
+    assert conn.execute("SELECT price_vnd, available, total FROM books WHERE id = 7").fetchone() == (500000, 1, 5)
+    conn.close()
+
+
+def test_indexes_are_created_and_used():
+    conn = make_db()
+    migrate(conn)
+    indexes = {row[1] for row in conn.execute("PRAGMA index_list(books)")}
+    assert indexes == {f"idx_books_{name}" for name in INDEXED_COLUMNS}
+    plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN SELECT * FROM books WHERE price_vnd = 450000"))
+    assert "idx_books_price_vnd" in plan
+    conn.close()
+
+
+def test_fts_index_is_recreated():
+    conn = make_db()
+    create_fts(conn)
+    migrate(conn)
+    assert has_fts(conn)
+    columns, rows = search_books(conn, "duong loi")
+    assert [row[columns.index("id")] for row in rows] == [3]
+    conn.execute("INSERT INTO books (title) VALUES ('Đường sắt')")
+    assert len(search_books(conn, "duong")[1]) == 2
+    conn.close()